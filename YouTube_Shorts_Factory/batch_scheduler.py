@@ -0,0 +1,377 @@
+"""
+Template-affine batch scheduling.
+A batch is planned up front (source, reaction, music per job) and enqueued;
+queue workers prefer jobs that share their last reaction template (affinity
+claims in job_queue), so those run back to back on one worker. Each worker keeps
+the template decoded and already scaled to its layout zone in a TemplateCache,
+so the template is decoded once per worker instead of once per job.
+"""
+
+import os
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from render_layout import fit_size
+from frame_transform import TransformChain
+from read_ahead import read_ahead
+
+
+# ==================== PLANNING ====================
+def plan_batch(num, pick_source, pick_reaction, pick_music, pick_commentary):
+    """Resolve every job's assets before rendering anything"""
+    jobs = []
+    for i in range(num):
+        jobs.append({
+            "index": i,
+            "source": pick_source(),
+            "reaction": pick_reaction(),
+            "music": pick_music(),
+            "commentary": pick_commentary(),
+        })
+    return jobs
+
+
+def group_by_template(jobs):
+    """OrderedDict reaction path -> jobs using it (first-seen order)"""
+    groups = OrderedDict()
+    for job in jobs:
+        groups.setdefault(job["reaction"], []).append(job)
+    return groups
+
+
+# ==================== TEMPLATE CACHE ====================
+def available_memory_mb():
+    """Memory the OS can hand out right now (MemAvailable), or None where it can't be read"""
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def cache_budget_mb(budget_mb, ram_share, workers=1):
+    """budget_mb, lowered to each worker's part of `ram_share` of the memory available now"""
+    available = available_memory_mb()
+    if available is None:
+        return budget_mb
+    share = available * ram_share / max(1, workers)
+    if share < budget_mb:
+        print(f"🗂️ Template cache lowered to {share:.0f} MB per worker ({available:.0f} MB available, "
+              f"{workers} worker(s))")
+        return share
+    return budget_mb
+
+
+STATIC_TOLERANCE = 3  # Max per-channel change from the first frame for a template row to count as static
+MIN_STATIC_ROWS = 8   # Shorter static runs between dynamic rows are copied anyway (fewer, larger copies)
+
+
+def _dynamic_bands(static):
+    """[(y0, y1)] runs of rows that are not static, with short static gaps merged in"""
+    bands = []
+    for y in np.flatnonzero(~static):
+        if bands and y - bands[-1][1] < MIN_STATIC_ROWS:
+            bands[-1][1] = y + 1
+        else:
+            bands.append([int(y), int(y) + 1])
+    return [tuple(band) for band in bands]
+
+
+class _BandPainter:
+    """
+    Draws template rows [r0, r1) of a cached entry into `target` at (x, y):
+    the first frame once, then only the dynamic bands for each frame.
+    """
+
+    def __init__(self, entry, target, x, y, rows):
+        r0, r1 = rows
+        first = entry["first"]
+        target[y + r0:y + r1, x:x + first.shape[1]] = first[r0:r1]
+        self.dynamic = entry["dynamic"]
+        self.copies = []  # (rows in the packed dynamic frame, destination rows)
+        for (b0, b1), offset in zip(entry["bands"], entry["band_offsets"]):
+            a, b = max(b0, r0), min(b1, r1)
+            if a < b:
+                self.copies.append((offset + a - b0, offset + b - b0, target[y + a:y + b, x:x + first.shape[1]]))
+
+    def __call__(self, index):
+        frame = self.dynamic[index]
+        for k0, k1, view in self.copies:
+            view[...] = frame[k0:k1]
+
+
+class TemplateCache:
+    """
+    Decoded + layout-scaled template frames kept in memory across jobs.
+    Templates that would not fit in `budget_mb` are not cached (callers fall
+    back to decoding them per job). The budget is capped at what `templates`
+    templates of max_duration take at the visible size of the first one cached
+    (that figure alone when budget_mb is None). Only the part of a template that lands
+    on the canvas is kept, and rows that never change across the clip
+    (captions, borders, the empty part of a zone) are stored once: each frame
+    keeps just its dynamic row bands, and only those are redrawn per frame.
+    When a new template doesn't fit, the least recently used ones are evicted
+    (their shared audio reader is closed: don't keep a clip past its job).
+    """
+
+    def __init__(self, budget_mb=None, max_duration=58, templates=1):
+        self.budget_bytes = None if budget_mb is None else int(budget_mb * 1024 * 1024)
+        self.sized = False  # Capped by the layout yet
+        self.max_duration = max_duration
+        self.templates = templates
+        self.too_large = set()  # Entry keys already reported as not fitting
+        self.entries = {}
+        self.used_bytes = 0
+        self.decode_seconds = {}
+        self.hits = {}
+        self.evictions = 0
+        self.skipped = {}  # path -> {"off_canvas", "static"}: shares of the scaled template never redrawn per frame
+
+    def _entry(self, path, zone_w, zone_h, fit, fps, placement):
+        key = (path, zone_w, zone_h, fit, fps, placement)
+        entry = self.entries.get(key)
+        if entry is None:
+            if key in self.too_large:
+                return None
+            entry = self._decode(path, zone_w, zone_h, fit, fps, placement)
+            if entry is None:
+                return None
+            self.entries[key] = entry
+        else:
+            self.hits[path] = self.hits.get(path, 0) + 1
+            self.entries[key] = self.entries.pop(key)  # Most recently used last
+        return entry
+
+    def _evict(self, needed):
+        """Drop least recently used entries until `needed` more bytes fit (or the cache is empty)"""
+        while self.entries and self.used_bytes + needed > self.budget_bytes:
+            key = next(iter(self.entries))
+            entry = self.entries.pop(key)
+            if entry["audio"] is not None:
+                entry["audio"].close()
+            self.used_bytes -= entry["bytes"]
+            self.evictions += 1
+            print(f"🗂️ Evicted template {key[0]} from the cache ({entry['bytes'] / 1e6:.0f} MB)")
+
+    def get(self, path, zone_w, zone_h, fit, fps, placement=None):
+        """
+        Return (clip, x_offset, y_offset) for the template scaled into the zone,
+        or None if it cannot be cached. The clip's audio reader is shared: don't close it.
+        placement: (zone_x, zone_y, canvas_w, canvas_h) - what falls off the canvas isn't kept.
+        """
+        entry = self._entry(path, zone_w, zone_h, fit, fps, placement)
+        if entry is None:
+            return None
+        frame = entry["first"].copy()
+        painter = _BandPainter(entry, frame, 0, 0, (0, len(frame)))
+        return self._make_clip(path, entry, painter, frame), entry["x_offset"], entry["y_offset"]
+
+    def backdrop(self, path, zone_w, zone_h, fit, fps, placement, color=(0, 0, 0), keep_above=None):
+        """
+        The template as the bottom layer of a composite: (base, top) or None.
+        base is a canvas-sized clip with the template over `color`; static rows
+        are painted once and only dynamic bands are copied per frame, so it
+        replaces both the background layer and the template blit
+        (CompositeVideoClip(..., use_bgclip=True)). keep_above: (y0, y1) canvas
+        rows where later layers must stay under the template; template rows
+        there come back as `top`, a positioned clip to composite after them
+        (None when the template doesn't reach those rows).
+        """
+        entry = self._entry(path, zone_w, zone_h, fit, fps, placement)
+        if entry is None:
+            return None
+        zone_x, zone_y, canvas_w, canvas_h = placement
+        x, y = zone_x + entry["x_offset"], zone_y + entry["y_offset"]
+        height = len(entry["first"])
+        t0 = t1 = height
+        if keep_above is not None:
+            t0 = min(max(keep_above[0] - y, 0), height)
+            t1 = min(max(keep_above[1] - y, t0), height)
+
+        canvas = np.empty((canvas_h, canvas_w, 3), dtype=np.uint8)
+        canvas[...] = color
+        painters = [_BandPainter(entry, canvas, x, y, rows) for rows in ((0, t0), (t1, height)) if rows[0] < rows[1]]
+
+        def paint(index):
+            for painter in painters:
+                painter(index)
+
+        base = self._make_clip(path, entry, paint, canvas)
+        top = None
+        if t0 < t1:
+            frame = np.empty((t1 - t0,) + entry["first"].shape[1:], dtype=np.uint8)
+            painter = _BandPainter(entry, frame, 0, -t0, (t0, t1))
+            top = self._make_clip(path, entry, painter, frame, audio=False).set_position((x, y + t0))
+        return base, top
+
+    def _decode(self, path, zone_w, zone_h, fit, fps, placement):
+        from moviepy.editor import VideoFileClip
+
+        start = time.perf_counter()
+        key = (path, zone_w, zone_h, fit, fps, placement)
+        source = read_ahead(VideoFileClip(path, audio=False))
+        try:
+            new_w, new_h, x_off, y_off = fit_size(source.w, source.h, zone_w, zone_h, fit)
+            # Visible part: rows and columns of the scaled template that land on the canvas
+            c0, r0, c1, r1 = 0, 0, new_w, new_h
+            if placement is not None:
+                zone_x, zone_y, canvas_w, canvas_h = placement
+                c0, r0 = max(0, -(zone_x + x_off)), max(0, -(zone_y + y_off))
+                c1, r1 = min(new_w, canvas_w - zone_x - x_off), min(new_h, canvas_h - zone_y - y_off)
+            num_frames = int(min(source.duration, self.max_duration) * fps)
+            if num_frames <= 0 or c1 <= c0 or r1 <= r0:
+                return None
+            if not self.sized:
+                # Every frame whole (no static rows), plus the first frame kept apart
+                layout = self.templates * (int(self.max_duration * fps) + 1) * (r1 - r0) * (c1 - c0) * 3
+                if self.budget_bytes is None or layout < self.budget_bytes:
+                    self.budget_bytes = layout
+                    print(f"🗂️ Template cache sized for {self.templates} x {self.max_duration}s at "
+                          f"{c1 - c0}x{r1 - r0}: {self.budget_bytes / 1e6:.0f} MB")
+                self.sized = True
+
+            chain = TransformChain.for_clip(source).resize((new_w, new_h))
+            if (c0, r0, c1, r1) != (0, 0, new_w, new_h):
+                chain = chain.crop(x1=c0, y1=r0, width=c1 - c0, height=r1 - r0)
+            transform = chain.compile()
+            row_bytes = (c1 - c0) * 3
+            static = np.ones(r1 - r0, dtype=bool)  # Rows within STATIC_TOLERANCE of the first frame so far
+            first, changing = None, np.arange(0)
+            stored, stored_bytes = [], 0  # Per frame after the first: (rows changing by then, their pixels)
+            count = 0
+            for frame in source.iter_frames(fps=fps, dtype="uint8"):
+                if count >= num_frames:
+                    break
+                scaled = transform(frame)
+                if first is None:
+                    first = scaled.copy()
+                else:
+                    candidates = np.flatnonzero(static)
+                    if len(candidates):
+                        a, b = scaled[candidates], first[candidates]
+                        change = (np.maximum(a, b) - np.minimum(a, b)).reshape(len(candidates), -1).max(axis=1)
+                        if (change > STATIC_TOLERANCE).any():
+                            static[candidates[change > STATIC_TOLERANCE]] = False
+                            changing = np.flatnonzero(~static)
+                    stored.append((changing, scaled[changing]))
+                    stored_bytes += len(changing) * row_bytes
+                # Budget the packed size: what is stored so far plus the remaining frames at today's dynamic rows
+                needed = first.nbytes + stored_bytes + (num_frames - count - 1) * len(changing) * row_bytes
+                if self.used_bytes + needed > self.budget_bytes:
+                    self._evict(needed)
+                if self.used_bytes + needed > self.budget_bytes:  # Doesn't fit even in an empty cache
+                    self.too_large.add(key)
+                    print(f"⚠️ Template too large to cache ({needed / 1e6:.0f} MB with {len(changing)}/{r1 - r0} "
+                          f"rows dynamic, {(self.budget_bytes - self.used_bytes) / 1e6:.0f} MB free) - "
+                          f"decoding it per job: {path}")
+                    return None
+                count += 1
+        finally:
+            source.close()
+
+        # Pack: each frame keeps only its dynamic bands; a row that started changing late
+        # takes the (static within tolerance) first frame's pixels before that
+        bands = _dynamic_bands(static)
+        heights = [b1 - b0 for b0, b1 in bands]
+        packed_rows = np.concatenate([np.arange(b0, b1) for b0, b1 in bands]) if bands else np.arange(0)
+        dynamic = np.empty((count, len(packed_rows), c1 - c0, 3), dtype=np.uint8)
+        if len(packed_rows):
+            dynamic[0] = first[packed_rows]
+            for index, (rows, pixels) in enumerate(stored, 1):
+                dynamic[index] = dynamic[0]
+                dynamic[index, np.searchsorted(packed_rows, rows)] = pixels
+                stored[index - 1] = None
+        del stored
+
+        self._evict(dynamic.nbytes + first.nbytes)  # Packing rounds up to whole bands
+        self.used_bytes += dynamic.nbytes + first.nbytes
+        elapsed = time.perf_counter() - start
+        self.decode_seconds[path] = self.decode_seconds.get(path, 0.0) + elapsed
+        scaled_px = new_w * new_h
+        off_canvas = 1 - (r1 - r0) * (c1 - c0) / scaled_px
+        static_share = (r1 - r0 - len(packed_rows)) * (c1 - c0) / scaled_px
+        self.skipped[path] = {"off_canvas": round(off_canvas, 4), "static": round(static_share, 4)}
+        print(f"🗂️ Cached template {path} ({count} frames, {(dynamic.nbytes + first.nbytes) / 1e6:.0f} MB) "
+              f"in {elapsed:.1f}s - {len(packed_rows)}/{r1 - r0} rows dynamic; of the scaled template "
+              f"{off_canvas + static_share:.0%} is not redrawn per frame "
+              f"({off_canvas:.0%} off-canvas, {static_share:.0%} static rows)")
+        return {
+            "first": first,
+            "dynamic": dynamic,
+            "bands": bands,
+            "band_offsets": [int(o) for o in np.cumsum([0] + heights[:-1])],
+            "count": count,
+            "fps": fps,
+            "x_offset": x_off + c0,
+            "y_offset": y_off + r0,
+            "has_audio": _has_audio(path),
+            "audio": None,  # One AudioFileClip shared by every job using the entry
+            "bytes": dynamic.nbytes + first.nbytes,
+        }
+
+    @staticmethod
+    def _make_clip(path, entry, paint, frame, audio=True):
+        """Clip whose frames are `frame`, updated in place by paint(index) when the index changes"""
+        from moviepy.editor import VideoClip, AudioFileClip
+
+        fps, last = entry["fps"], entry["count"] - 1
+        shown = [None]
+
+        def make_frame(t):
+            index = min(int(t * fps + 1e-6), last)
+            if index != shown[0]:
+                paint(index)
+                shown[0] = index
+            return frame
+
+        clip = VideoClip(make_frame, duration=entry["count"] / fps)
+        if audio and entry["has_audio"]:
+            # A reader per job would leak an ffmpeg process each time (closing a VideoClip leaves its audio open)
+            if entry["audio"] is None or entry["audio"].reader is None:
+                entry["audio"] = AudioFileClip(path)
+            clip = clip.set_audio(entry["audio"])
+        return clip
+
+    def close(self):
+        """Close the shared audio readers"""
+        for entry in self.entries.values():
+            if entry["audio"] is not None:
+                entry["audio"].close()
+                entry["audio"] = None
+
+    def report(self):
+        """Decode seconds paid vs what the naive one-decode-per-job order would have paid"""
+        paid = sum(self.decode_seconds.values())
+        saved = sum(self.decode_seconds[p] * self.hits.get(p, 0) for p in self.decode_seconds)
+        return {
+            "templates_cached": len(self.decode_seconds),
+            "cache_hits": sum(self.hits.values()),
+            "decode_seconds": round(paid, 2),
+            "decode_seconds_saved": round(saved, 2),
+            "cache_mb": round(self.used_bytes / 1e6, 1),
+            "cache_evictions": self.evictions,
+        }
+
+
+def merge_reports(reports):
+    merged = {}
+    for report in reports:
+        for key, value in report.items():
+            merged[key] = round(merged.get(key, 0) + value, 2)
+    return merged
+
+
+def _has_audio(path):
+    try:
+        from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+        return bool(ffmpeg_parse_infos(path).get("audio_found"))
+    except Exception:
+        return False
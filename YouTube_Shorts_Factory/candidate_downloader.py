@@ -0,0 +1,227 @@
+"""
+Concurrent multi-candidate source download.
+Auto mode used to download exactly one search result and give up if it was
+unusable. Here the top K candidates are fetched in parallel through a bounded
+thread pool, each finished file gets a quick ffprobe-style check, the first
+valid one wins and the rest are cancelled. Valid files that were not used are
+kept in a local candidate store and picked up by later runs before searching.
+With a SourceFingerprints index, candidates that are perceptual near-duplicates
+of an earlier source (re-uploads under a new ID) are rejected like invalid ones;
+the chosen source is only recorded by record_used(), once it made it into a short.
+With a Workspace, stored candidates count against its disk budget.
+"""
+
+import os
+import shutil
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from download_formats import info_json_path
+
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".webm", ".mov")
+
+
+def probe_video(path, min_duration=3, max_duration=None):
+    """Quick validity check without decoding: (ok, reason)"""
+    try:
+        from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+        infos = ffmpeg_parse_infos(path)
+    except Exception as e:
+        return False, f"unreadable ({e})"
+    if not infos.get("video_found"):
+        return False, "no video stream"
+    duration = infos.get("duration") or 0
+    if duration < min_duration:
+        return False, f"too short ({duration:.1f}s)"
+    if max_duration and duration > max_duration:
+        return False, f"too long ({duration:.1f}s)"
+    return True, "ok"
+
+
+class CandidateDownloader:
+    """Download several candidates at once and keep the first usable one"""
+
+    def __init__(self, store_folder, archive_file, workers=3, min_duration=3, max_duration=59,
+                 extra_args=None, ytdlp=("yt-dlp",), url_template="https://www.youtube.com/watch?v={}",
+                 fingerprints=None, workspace=None):
+        self.store_folder = store_folder
+        self.archive_file = archive_file
+        self.workers = max(1, workers)
+        self.min_duration = min_duration
+        self.max_duration = max_duration
+        self.extra_args = list(extra_args or [])
+        self.ytdlp = list(ytdlp)
+        self.url_template = url_template
+        self.fingerprints = fingerprints
+        self.workspace = workspace
+        self._lock = threading.Lock()
+        self._procs = {}
+        self._cancelled = threading.Event()
+        self._chosen = None  # (key, hashes) of the last candidate handed out, for record_used()
+
+    # ---------- archive ----------
+    def archived_ids(self):
+        if not os.path.exists(self.archive_file):
+            return set()
+        with open(self.archive_file, "r", encoding="utf-8") as f:
+            return {line.split()[-1] for line in f if line.strip()}
+
+    def add_to_archive(self, video_id):
+        with self._lock:
+            with open(self.archive_file, "a", encoding="utf-8") as f:
+                f.write(f"youtube {video_id}\n")
+
+    # ---------- search ----------
+    def search(self, search_url, limit):
+        """IDs of the first `limit` search results that are not in the archive yet"""
+        cmd = self.ytdlp + ["--flat-playlist", "--print", "id", "--playlist-end", str(limit * 4),
+                            "--no-warnings", search_url]
+        result = subprocess.run(cmd, capture_output=True, text=True, check=False)
+        seen = self.archived_ids()
+        ids = []
+        for line in result.stdout.splitlines():
+            video_id = line.strip()
+            if video_id and video_id not in seen and video_id not in ids:
+                ids.append(video_id)
+        return ids[:limit]
+
+    # ---------- candidate store ----------
+    def take_from_store(self, output_path):
+        """Move the oldest valid stored candidate to output_path (invalid ones are dropped)"""
+        if not os.path.isdir(self.store_folder):
+            return None
+        files = [os.path.join(self.store_folder, f) for f in os.listdir(self.store_folder)
+                 if f.lower().endswith(VIDEO_EXTENSIONS)]
+        for path in sorted(files, key=os.path.getmtime):
+            ok, reason = probe_video(path, self.min_duration, self.max_duration)
+            key = os.path.splitext(os.path.basename(path))[0]
+            if ok and not self._is_reupload(path, key):
+                print(f"📦 Using stored candidate: {os.path.basename(path)}")
+                shutil.move(path, output_path)
+                self._forget(path)
+                return output_path
+            if not ok:
+                print(f"🗑️ Dropping stored candidate {os.path.basename(path)}: {reason}")
+            os.remove(path)
+            self._forget(path)
+        return None
+
+    # ---------- download ----------
+    def download_first_valid(self, video_ids, output_path):
+        """Download candidates concurrently; return output_path for the first valid one or None"""
+        if not video_ids:
+            print("❌ No new candidates found")
+            return None
+        os.makedirs(self.store_folder, exist_ok=True)
+        self._cancelled.clear()
+        print(f"📥 Downloading {len(video_ids)} candidate(s) with {self.workers} worker(s)...")
+
+        winner = None
+        finished = []
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = {pool.submit(self._download_one, video_id): video_id for video_id in video_ids}
+            for future in as_completed(futures):
+                if future.cancelled():  # Never started: the winner was found first
+                    continue
+                video_id = futures[future]
+                path = future.result()
+                if not path:
+                    continue
+                self.add_to_archive(video_id)  # Used, stored or broken: not worth downloading again
+                ok, reason = probe_video(path, self.min_duration, self.max_duration)
+                if not ok:
+                    print(f"⚠️ Candidate {video_id} rejected: {reason}")
+                    self._discard(path)
+                    continue
+                if winner is None and self._is_reupload(path, video_id):
+                    self._discard(path)
+                    continue
+                if winner is None:
+                    print(f"✅ Candidate {video_id} is valid - cancelling the rest")
+                    winner = path
+                    self._cancel_all(futures)
+                else:
+                    finished.append(path)
+
+        if winner is None:
+            return None
+
+        # Keep other valid downloads for later runs
+        for path in finished:
+            self._discard(info_json_path(path))
+            if self.workspace is not None:
+                self.workspace.track(path)
+            print(f"📦 Stored unused candidate: {os.path.basename(path)}")
+
+        shutil.move(winner, output_path)
+        if os.path.exists(info_json_path(winner)):
+            shutil.move(info_json_path(winner), info_json_path(output_path))
+        return output_path
+
+    def _forget(self, path):
+        if self.workspace is not None:
+            self.workspace.forget(path)
+
+    def record_used(self):
+        """Add the last candidate handed out to the fingerprint index (call once its short was exported)"""
+        if self.fingerprints is not None and self._chosen is not None:
+            self.fingerprints.add(*self._chosen)
+        self._chosen = None
+
+    def _is_reupload(self, path, key):
+        """True if path looks like an already used source; otherwise it is remembered for record_used()"""
+        if self.fingerprints is None:
+            return False
+        duplicate, hashes = self.fingerprints.find_duplicate(path)
+        if duplicate is not None:
+            print(f"♻️ Candidate {key} is a re-upload of {duplicate} - skipping")
+            return True
+        self._chosen = (key, hashes)
+        return False
+
+    def _download_one(self, video_id):
+        if self._cancelled.is_set():
+            return None
+        target = os.path.join(self.store_folder, f"{video_id}.mp4")
+        cmd = self.ytdlp + self.extra_args + ["--no-playlist", "--no-warnings", "--force-overwrites"]
+        if self.max_duration:
+            cmd += ["--match-filter", f"duration < {self.max_duration}"]
+        cmd += ["-o", target, self.url_template.format(video_id)]
+        proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        with self._lock:
+            self._procs[video_id] = proc
+        proc.wait()
+        with self._lock:
+            self._procs.pop(video_id, None)
+
+        if self._cancelled.is_set() and proc.returncode != 0:
+            self._discard_partials(video_id)
+            return None
+        if not os.path.exists(target):
+            self._discard_partials(video_id)  # filtered out or failed - drop fragments
+            return None
+        return target
+
+    def _cancel_all(self, futures):
+        self._cancelled.set()
+        for future in futures:
+            future.cancel()
+        with self._lock:
+            procs = list(self._procs.items())
+        for video_id, proc in procs:
+            if proc.poll() is None:
+                proc.terminate()
+
+    def _discard_partials(self, video_id):
+        """Remove .part files and unmerged format streams left by a killed download"""
+        prefix = f"{video_id}."
+        for name in os.listdir(self.store_folder):
+            if name.startswith(prefix):
+                os.remove(os.path.join(self.store_folder, name))
+
+    @staticmethod
+    def _discard(path):
+        for leftover in (path, path + ".part", info_json_path(path)):
+            if leftover and os.path.exists(leftover):
+                os.remove(leftover)
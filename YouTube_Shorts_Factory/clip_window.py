@@ -0,0 +1,213 @@
+"""
+Best-window selection for long sources.
+process_video used to cut subclip(0, duration), so a long manual-mode source
+always contributed its first minute, however dull. Here the source is
+decoded once as a decimated stream: keyframes only, 64 px wide, greyscale
+(files with keyframes more than 10 s apart are sampled at 2 fps instead),
+next to an 8 kHz mono audio decode running in parallel that only decodes
+every 4th audio packet (the rest are dropped before the decoder, which is
+where the time goes). Per-second motion (mean absolute frame difference) and
+audio energy (RMS) are computed with NumPy, each normalised by its median,
+and the window of the requested length with the highest summed score wins.
+Sources without an audio stream - template-mode downloads are video-only -
+are scored on motion alone. The per-second curves are cached in a JSON
+index keyed by path + size + mtime, so any later window length is free.
+"""
+
+import os
+import re
+import json
+import time
+import threading
+import subprocess
+
+import numpy as np
+
+from video_export import get_ffmpeg_binary
+
+SAMPLE_WIDTH = 64       # Width in pixels of the decimated stream
+SAMPLE_FPS = 2          # Frames per second when not decoding keyframes only
+AUDIO_RATE = 8000       # Audio energy is measured on an 8 kHz mono decode
+AUDIO_KEEP = 4          # Decode one audio packet in this many (energy needs a sample of each second, not all of it)
+AUDIO_WEIGHT = 0.5      # Share of the score that comes from audio when the source has any
+MIN_KEYFRAMES = 0.1     # Keyframes per second below which every frame is decoded instead
+PTS_TIME = re.compile(r"pts_time:\s*(-?[\d.]+)")
+NO_STREAM = "does not contain any stream"
+_passthrough = ["-fps_mode", "passthrough"]  # "-vsync passthrough" before ffmpeg 5.1
+
+
+def _decode_video(path, keyframes_only, fps=SAMPLE_FPS, width=SAMPLE_WIDTH):
+    """Start a low-resolution greyscale decode; showinfo logs each frame's timestamp to stderr"""
+    height = width * 16 // 9  # Aspect doesn't matter for motion energy; a fixed size keeps frames stackable
+    cmd = [get_ffmpeg_binary(), "-hide_banner", "-nostats", "-threads", "2"]
+    if keyframes_only:
+        cmd += ["-skip_frame", "nokey"]
+    rate = "" if keyframes_only else f"fps={fps},"
+    cmd += ["-i", path, "-an", "-sn", "-dn",
+            "-vf", f"{rate}scale={width}:{height}:flags=fast_bilinear,format=gray,showinfo",
+            *_passthrough, "-f", "rawvideo", "-"]
+    return subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE), (height, width)
+
+
+def _decode_audio(path, keep=AUDIO_KEEP):
+    """Start an 8 kHz mono decode of every `keep`-th audio packet (all of them with keep=1)"""
+    cmd = [get_ffmpeg_binary(), "-v", "error"]
+    if keep > 1:
+        cmd += ["-bsf:a", f"noise=drop=mod(n\\,{keep})"]  # Drops packets before they reach the decoder
+    cmd += ["-i", path, "-vn", "-sn", "-dn", "-ac", "1", "-ar", str(AUDIO_RATE), "-f", "s16le", "-"]
+    return subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+def _audio(path):
+    """Decoded samples of a source's audio (None without an audio stream)"""
+    raw, log = _decode_audio(path).communicate()
+    log = log.decode("utf-8", "replace")
+    if NO_STREAM in log:
+        return None
+    if not raw and AUDIO_KEEP > 1:
+        # ffmpeg < 5.1 has no input bitstream filters / noise drop expressions: decode every packet
+        print(f"⚠️ Sparse audio decode failed, decoding all of it: {log.strip()[-200:]}")
+        raw, _ = _decode_audio(path, keep=1).communicate()
+    return np.frombuffer(raw[:len(raw) // 2 * 2], dtype=np.int16).astype(np.float32) / 32768
+
+
+def _frames(process, shape):
+    """(frames, timestamps) read from a _decode_video process"""
+    raw, log = process.communicate()
+    if process.returncode != 0 and not raw:
+        raise IOError(f"ffmpeg sampling failed: {log.decode('utf-8', 'replace').strip()[-300:]}")
+    frame_bytes = shape[0] * shape[1]
+    frames = np.frombuffer(raw, dtype=np.uint8)[:len(raw) // frame_bytes * frame_bytes].reshape(-1, *shape)
+    times = np.array([float(t) for t in PTS_TIME.findall(log.decode("utf-8", "replace"))])
+    count = min(len(frames), len(times))
+    return frames[:count], times[:count]
+
+
+def _sample(path, keyframes_only):
+    """(frames, timestamps) of the decimated stream, falling back to -vsync on ffmpeg < 5.1"""
+    global _passthrough
+    try:
+        return _frames(*_decode_video(path, keyframes_only))
+    except IOError as e:
+        if "fps_mode" not in str(e):
+            raise
+        print("⚠️ ffmpeg has no -fps_mode (older than 5.1) - sampling with -vsync passthrough")
+        _passthrough = ["-vsync", "passthrough"]
+        return _frames(*_decode_video(path, keyframes_only))
+
+
+def activity(path, duration=None):
+    """
+    (motion, audio): per-second activity curves of a video. audio is None when
+    the source has no audio stream (the window is then chosen on motion alone).
+    """
+    if duration is None:
+        from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+        duration = ffmpeg_parse_infos(path).get("duration") or 0
+    seconds = max(1, int(np.ceil(duration)))
+
+    # Both decoders run at once, the audio pipe drained on its own thread
+    audio_out = []
+    reader = threading.Thread(target=lambda: audio_out.append(_audio(path)), daemon=True)
+    reader.start()
+    frames, times = _sample(path, keyframes_only=True)
+    if len(frames) < MIN_KEYFRAMES * seconds:
+        frames, times = _sample(path, keyframes_only=False)
+    reader.join()
+    samples = audio_out[0] if audio_out else None
+
+    motion = np.zeros(seconds, dtype=np.float32)
+    if len(frames) > 1:
+        # Change between consecutive samples, spread evenly over the time between them
+        diffs = np.abs(frames[1:].astype(np.int16) - frames[:-1]).mean(axis=(1, 2))
+        changed = np.concatenate(([0.0], np.cumsum(diffs)))
+        motion[:] = np.diff(np.interp(np.arange(seconds + 1), times, changed))
+
+    if samples is None:
+        return motion, None
+    energy = np.zeros(seconds, dtype=np.float32)
+    # Kept packets come out back to back: each second of the source is ~len / duration samples
+    per_second = int(len(samples) / duration) if duration > 0 else 0
+    if per_second:
+        usable = min(len(samples) // per_second, seconds)
+        blocks = samples[:usable * per_second].reshape(usable, per_second)
+        energy[:usable] = np.sqrt((blocks ** 2).mean(axis=1))
+    return motion, energy
+
+
+def _normalised(curve):
+    scale = np.median(curve[curve > 0]) if np.any(curve > 0) else 0
+    return curve / scale if scale > 0 else curve
+
+
+def best_window(motion, audio, length, audio_weight=AUDIO_WEIGHT):
+    """Start second of the `length`-second window with the highest motion + audio score (earliest on ties)"""
+    seconds = len(motion)
+    length = int(np.floor(length))
+    if length >= seconds:
+        return 0
+    score = _normalised(np.asarray(motion, dtype=np.float64))
+    if audio is not None and np.any(np.asarray(audio) > 0):
+        score = (1 - audio_weight) * score + audio_weight * _normalised(np.asarray(audio, dtype=np.float64))
+    totals = np.convolve(score, np.ones(length), mode="valid")  # totals[i] = score[i:i + length].sum()
+    return int(np.argmax(totals))
+
+
+class SourceWindows:
+    """Per-source activity curves, analysed once and cached in a JSON index"""
+
+    def __init__(self, index_path):
+        self.index_path = index_path
+        self.entries = {}
+        if os.path.exists(index_path):
+            try:
+                with open(index_path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except ValueError:
+                self.entries = {}
+
+    def _save(self):
+        # Sources come and go (workspace eviction): drop entries for files that no longer exist
+        self.entries = {key: entry for key, entry in self.entries.items() if os.path.exists(key)}
+        os.makedirs(os.path.dirname(os.path.abspath(self.index_path)), exist_ok=True)
+        tmp = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp, self.index_path)
+
+    def curves(self, path, duration=None):
+        """Cached (motion, audio) curves for a source (analysed on first use or after the file changed)"""
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        entry = self.entries.get(key)
+        if entry is None or entry.get("bytes") != stat.st_size or entry.get("mtime") != int(stat.st_mtime):
+            start = time.perf_counter()
+            motion, audio = activity(path, duration)
+            entry = {
+                "bytes": stat.st_size,
+                "mtime": int(stat.st_mtime),
+                "motion": [round(float(v), 3) for v in motion],
+                "audio": None if audio is None else [round(float(v), 4) for v in audio],
+            }
+            self.entries[key] = entry
+            self._save()
+            print(f"📈 Analysed {os.path.basename(path)} ({len(motion)}s{', no audio: motion only' if audio is None else ''}) "
+                  f"in {(time.perf_counter() - start) * 1000:.0f} ms")
+        return np.array(entry["motion"]), None if entry["audio"] is None else np.array(entry["audio"])
+
+    def window(self, path, length, duration):
+        """(start, end) in seconds of the most active `length`-second stretch of a `duration`-second source"""
+        if duration <= length:
+            return 0, duration
+        try:
+            motion, audio = self.curves(path, duration)
+        except Exception as e:
+            print(f"⚠️ Activity analysis failed, using the start of the source: {e}")
+            return 0, length
+        if not np.any(motion) and (audio is None or not np.any(audio)):
+            print(f"⚠️ No activity measured in {os.path.basename(path)}, using the start of the source")
+            return 0, length
+        start = min(best_window(motion, audio, length), max(0.0, duration - length))
+        if start:
+            print(f"🎯 Using the most active {length:.0f}s of the source: {start:.0f}s - {start + length:.0f}s")
+        return start, start + length
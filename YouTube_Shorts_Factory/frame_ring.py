@@ -0,0 +1,77 @@
+"""
+Fixed-size frame ring for bounded-memory rendering.
+A small pool of preallocated frame slots is handed from the compositor to
+the encoder writer thread, so the number of frames in flight (and the memory
+they use) never depends on how fast ffmpeg drains its pipe.
+"""
+
+import sys
+import queue
+
+import numpy as np
+
+
+class FrameRing:
+    """Producer fills a free slot, consumer reads it and releases it back"""
+
+    def __init__(self, shape, slots=3, dtype=np.uint8):
+        self.shape = tuple(shape)
+        self.slots = [np.empty(self.shape, dtype=dtype) for _ in range(max(1, slots))]
+        self._held = [None] * len(self.slots)  # Frames handed over by reference instead of copied
+        self._free = queue.Queue()
+        self._filled = queue.Queue()
+        for index in range(len(self.slots)):
+            self._free.put(index)
+
+    @property
+    def nbytes(self):
+        return sum(slot.nbytes for slot in self.slots)
+
+    def put(self, frame, timeout=None, owned=False):
+        """
+        Queue a frame in the next free slot (blocks while all slots are in flight).
+        owned: the caller holds the only reference to this C-contiguous array,
+        so it is passed on as is instead of being copied into the slot.
+        """
+        index = self._free.get(timeout=timeout)
+        if owned:
+            self._held[index] = frame
+        else:
+            np.copyto(self.slots[index], frame, casting="unsafe")
+        self._filled.put(index)
+
+    def view(self, index):
+        """Bytes of a filled slot as a memoryview (no copy)"""
+        frame = self._held[index]
+        return memoryview(self.slots[index] if frame is None else frame).cast("B")
+
+    def close(self):
+        """Tell the consumer no more frames are coming"""
+        self._filled.put(None)
+
+    def get(self, timeout=None):
+        """Next filled slot index, or None once the producer has closed the ring"""
+        return self._filled.get(timeout=timeout)
+
+    def release(self, index):
+        self._held[index] = None
+        self._free.put(index)
+
+
+def ring_slots_for_budget(ceiling_mb, frame_shape, share=0.10, minimum=2, maximum=8):
+    """How many frame slots fit in `share` of the memory ceiling"""
+    frame_bytes = int(np.prod(frame_shape))
+    slots = int(ceiling_mb * 1024 * 1024 * share) // max(1, frame_bytes)
+    return max(minimum, min(maximum, slots))
+
+
+def peak_rss_mb(children=False):
+    """Peak resident set size of this process (or of its finished children, e.g. ffmpeg) in MB"""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
@@ -0,0 +1,330 @@
+"""
+Persistent SQLite job queue.
+Render jobs live in a small database instead of a for-loop, so they survive
+crashes and can be added from outside the process. Each job has a state
+(queued -> running -> done / failed), a retry count with backoff, a priority
+and a lease: a worker owns a running job only until its lease expires, after
+which another worker may take it over. Claims happen inside an IMMEDIATE
+transaction, so any number of worker processes can pull from one file.
+"""
+
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+
+STATES = ("queued", "running", "done", "failed")
+
+
+class JobDropped(Exception):
+    """Raised by a handler for a job that retrying can't help (e.g. over its render budget): failed at once"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'queued',
+    priority INTEGER NOT NULL DEFAULT 0,
+    affinity TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    available_at REAL NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    result TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_pick ON jobs (state, priority, available_at);
+"""
+
+
+class JobQueue:
+    """Durable job table shared by every worker process"""
+
+    def __init__(self, path, clock=time.time, retry_delay=60):
+        self.path = path
+        self.clock = clock
+        self.retry_delay = retry_delay
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    # ---------- producers ----------
+    def enqueue(self, kind, payload, priority=0, max_attempts=3, affinity=None, delay=0):
+        now = self.clock()
+        cursor = self._db.execute(
+            "INSERT INTO jobs (kind, payload, priority, affinity, max_attempts, available_at, created, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (kind, json.dumps(payload), priority, affinity, max_attempts, now + delay, now, now),
+        )
+        return cursor.lastrowid
+
+    # ---------- workers ----------
+    def claim(self, worker_id, lease_seconds=600, kinds=None, affinity=None):
+        """
+        Take the next runnable job (highest priority, then same affinity as
+        the worker's last job, then oldest) and lease it. Returns a dict or None.
+        Jobs whose lease ran out are runnable again; ones out of attempts fail.
+        """
+        now = self.clock()
+        kind_filter = ""
+        params = [now, now]
+        if kinds:
+            kind_filter = f" AND kind IN ({','.join('?' * len(kinds))})"
+            params += list(kinds)
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            # Expired leases that already used every attempt are given up on
+            self._db.execute(
+                "UPDATE jobs SET state = 'failed', error = 'lease expired', lease_owner = NULL, updated = ? "
+                "WHERE state = 'running' AND lease_expires < ? AND attempts >= max_attempts",
+                (now, now),
+            )
+            row = self._db.execute(
+                "SELECT * FROM jobs WHERE ((state = 'queued' AND available_at <= ?) "
+                "OR (state = 'running' AND lease_expires < ?))" + kind_filter +
+                " ORDER BY priority DESC, (affinity IS ?) DESC, id LIMIT 1",
+                params + [affinity],
+            ).fetchone()
+            if row is None:
+                self._db.execute("COMMIT")
+                return None
+            self._db.execute(
+                "UPDATE jobs SET state = 'running', attempts = attempts + 1, lease_owner = ?, "
+                "lease_expires = ?, updated = ? WHERE id = ?",
+                (worker_id, now + lease_seconds, now, row["id"]),
+            )
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["attempts"] += 1
+        job["lease_owner"] = worker_id
+        return job
+
+    def heartbeat(self, job_id, worker_id, lease_seconds=600):
+        """Extend a lease; False if the job was taken over (lease lost)"""
+        cursor = self._db.execute(
+            "UPDATE jobs SET lease_expires = ?, updated = ? WHERE id = ? AND state = 'running' AND lease_owner = ?",
+            (self.clock() + lease_seconds, self.clock(), job_id, worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, worker_id, result=None):
+        cursor = self._db.execute(
+            "UPDATE jobs SET state = 'done', result = ?, error = NULL, lease_owner = NULL, updated = ? "
+            "WHERE id = ? AND state = 'running' AND lease_owner = ?",
+            (None if result is None else str(result), self.clock(), job_id, worker_id),
+        )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id, worker_id, error, retry=True):
+        """Requeue with exponential backoff, or mark failed once attempts are used up (or retry=False)"""
+        now = self.clock()
+        row = self._db.execute("SELECT attempts, max_attempts FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        if retry and row["attempts"] < row["max_attempts"]:
+            delay = self.retry_delay * 2 ** (row["attempts"] - 1)
+            state, available_at = "queued", now + delay
+        else:
+            state, available_at = "failed", now
+        self._db.execute(
+            "UPDATE jobs SET state = ?, error = ?, available_at = ?, lease_owner = NULL, updated = ? "
+            "WHERE id = ? AND state = 'running' AND lease_owner = ?",
+            (state, str(error), available_at, now, job_id, worker_id),
+        )
+        return state
+
+    # ---------- inspection ----------
+    def counts(self):
+        counts = dict.fromkeys(STATES, 0)
+        for row in self._db.execute("SELECT state, COUNT(*) AS n FROM jobs GROUP BY state"):
+            counts[row["state"]] = row["n"]
+        return counts
+
+    def pending(self):
+        """Jobs a worker could still run now or later (queued or leased)"""
+        row = self._db.execute("SELECT COUNT(*) FROM jobs WHERE state IN ('queued', 'running')").fetchone()
+        return row[0]
+
+    def queued(self, kinds=None):
+        """Jobs still waiting to run (payload decoded), in the order workers would claim them"""
+        query = "SELECT * FROM jobs WHERE state = 'queued'"
+        params = []
+        if kinds:
+            query += f" AND kind IN ({','.join('?' * len(kinds))})"
+            params += list(kinds)
+        jobs = []
+        for row in self._db.execute(query + " ORDER BY priority DESC, id", params):
+            job = dict(row)
+            job["payload"] = json.loads(job["payload"])
+            jobs.append(job)
+        return jobs
+
+    def jobs(self, state=None, limit=50):
+        query = "SELECT id, kind, state, priority, attempts, max_attempts, result, error FROM jobs"
+        params = []
+        if state:
+            query += " WHERE state = ?"
+            params.append(state)
+        query += " ORDER BY id DESC LIMIT ?"
+        return [dict(row) for row in self._db.execute(query, params + [limit])]
+
+    def retry_failed(self):
+        """Put every failed job back in the queue with a fresh attempt budget"""
+        cursor = self._db.execute(
+            "UPDATE jobs SET state = 'queued', attempts = 0, available_at = ?, updated = ? WHERE state = 'failed'",
+            (self.clock(), self.clock()),
+        )
+        return cursor.rowcount
+
+
+# ==================== JOB FILES ====================
+def read_jobs_file(path, kind="render"):
+    """
+    Jobs from a URL list (one URL per line, # comments) or a JSONL file whose
+    rows are payloads; "kind", "priority" and "max_attempts" keys are taken out
+    of the row. Returns [(kind, payload, options)].
+    """
+    jobs = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                payload = json.loads(line)
+                options = {key: payload.pop(key) for key in ("priority", "max_attempts") if key in payload}
+                jobs.append((payload.pop("kind", kind), payload, options))
+            else:
+                jobs.append((kind, {"url": line}, {}))
+    return jobs
+
+
+def enqueue_file(db_path, path, priority=0, upload=False, max_attempts=3):
+    """Add every job from a URL list / JSONL file to the queue (no prompts); returns the job ids"""
+    queue = JobQueue(db_path)
+    ids = []
+    try:
+        for kind, payload, options in read_jobs_file(path):
+            payload.setdefault("upload", upload)
+            job_id = queue.enqueue(kind, payload, priority=options.get("priority", priority),
+                                   max_attempts=options.get("max_attempts", max_attempts),
+                                   affinity=payload.get("reaction"))
+            ids.append(job_id)
+            print(f"➕ Job #{job_id}: {payload.get('url') or payload.get('source')}")
+        print(f"📋 Queue: {queue.counts()}")
+    finally:
+        queue.close()
+    return ids
+
+
+def print_status(db_path, limit=20):
+    queue = JobQueue(db_path)
+    try:
+        print(f"📋 Queue: {queue.counts()}")
+        for job in queue.jobs(limit=limit):
+            print(f"   #{job['id']} {job['state']:<8} p{job['priority']} "
+                  f"try {job['attempts']}/{job['max_attempts']} {job['error'] or job['result'] or ''}")
+    finally:
+        queue.close()
+
+
+# ==================== WORKERS ====================
+def run_worker(db_path, handlers, index=0, lease_seconds=600, poll_seconds=2, exit_when_idle=True,
+               affinity_key=None, on_exit=None):
+    """
+    Pull and run jobs until the queue has nothing runnable (or forever).
+    handlers: {kind: callable(payload) -> result}; a falsy result or exception counts as a failure
+    (retried, except for JobDropped).
+    affinity_key: payload key whose value the worker prefers to repeat (e.g. the template path).
+    on_exit: callable returning a dict merged into the returned stats.
+    """
+    queue = JobQueue(db_path)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{index}"
+    stats = {"done": 0, "failed": 0, "retried": 0}
+    affinity = None
+    try:
+        while True:
+            job = queue.claim(worker_id, lease_seconds, kinds=list(handlers), affinity=affinity)
+            if job is None:
+                if exit_when_idle and queue.pending() == 0:
+                    break
+                time.sleep(poll_seconds)
+                continue
+
+            print(f"\n📋 Job #{job['id']} ({job['kind']}, attempt {job['attempts']}/{job['max_attempts']})")
+            if affinity_key:
+                affinity = job["payload"].get(affinity_key)
+            stop = threading.Event()
+            beat = threading.Thread(target=_keep_leased, args=(db_path, job["id"], worker_id, lease_seconds, stop),
+                                    daemon=True)
+            beat.start()
+            retry = True
+            try:
+                result = handlers[job["kind"]](job["payload"])
+                error = None if result else "handler returned no result"
+            except JobDropped as e:
+                result, error, retry = None, f"dropped: {e}", False
+            except SystemExit as e:  # handlers reuse CLI code that exits on failure
+                result, error = None, f"exit {e.code}"
+            except Exception as e:
+                result, error = None, str(e)
+            finally:
+                stop.set()
+                beat.join()
+
+            if error is None:
+                queue.complete(job["id"], worker_id, result)
+                stats["done"] += 1
+                print(f"✅ Job #{job['id']} done")
+            else:
+                state = queue.fail(job["id"], worker_id, error, retry)
+                stats["retried" if state == "queued" else "failed"] += 1
+                print(f"❌ Job #{job['id']} {'will retry' if state == 'queued' else 'failed'}: {error}")
+    finally:
+        queue.close()
+    if on_exit:
+        stats.update(on_exit() or {})
+    return stats
+
+
+def _keep_leased(db_path, job_id, worker_id, lease_seconds, stop):
+    """Heartbeat thread: renew the lease at a third of its length while the job runs"""
+    queue = JobQueue(db_path)
+    try:
+        while not stop.wait(lease_seconds / 3):
+            if not queue.heartbeat(job_id, worker_id, lease_seconds):
+                print(f"⚠️ Lost the lease on job #{job_id}")
+                return
+    finally:
+        queue.close()
+
+
+def run_workers(db_path, handlers, workers=1, initializer=None, initargs=(), **kwargs):
+    """
+    Drain the queue with `workers` processes; returns one stats dict per worker.
+    Workers are spawned (as on Windows / macOS): they import the modules fresh,
+    so anything main() changed at runtime must be re-applied by `initializer(*initargs)`.
+    """
+    if workers <= 1:
+        return [run_worker(db_path, handlers, 0, **kwargs)]
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=initializer, initargs=initargs) as pool:
+        futures = [pool.submit(run_worker, db_path, handlers, i, **kwargs) for i in range(workers)]
+        return [future.result() for future in futures]
@@ -0,0 +1,293 @@
+"""
+Music library ingestion.
+Searches every trusted source concurrently, downloads new tracks through a
+bounded pool (one YoutubeDL per thread, files named by video ID) and keeps a
+JSON index of track metadata, credits and an audio fingerprint. Tracks are
+deduplicated by video ID before downloading and by fingerprint afterwards,
+so re-uploads under a different title are dropped. Picking a track for a
+render is an index lookup.
+"""
+
+import os
+import re
+import json
+import base64
+import random
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from video_export import get_ffmpeg_binary
+
+AUDIO_EXTENSIONS = (".mp3", ".wav", ".m4a")
+
+# Credit phrases, each matched from wherever it appears to the end of its line, grouped by phrase
+# (a line with two phrases, e.g. "Download / Stream: ...", is reported once per phrase)
+CREDIT_PATTERNS = [re.compile(pattern, re.IGNORECASE | re.MULTILINE) for pattern in (
+    r"Music provided by.*", r"Track:.*", r"Artist:.*", r"Download.*",
+    r"Stream.*", r"License.*", r"Creative Commons.*", r"Attribution.*",
+)]
+
+
+def find_credits(description):
+    """Credit lines of a description, in phrase order"""
+    return [line for pattern in CREDIT_PATTERNS for line in pattern.findall(description or "")]
+
+
+# ==================== CREDITS ====================
+def format_credits(description, title):
+    """Credit block for the video description: matching lines, or the start of the description"""
+    description = description or ""
+    credits_text = f"🎵 MUSIC CREDITS FOR: {title}\n"
+    credits_text += "="*60 + "\n\n"
+    found_credits = find_credits(description)
+    if found_credits:
+        credits_text += "\n".join(found_credits)
+    else:
+        credits_text += description[:500] + "..."
+    credits_text += "\n\n" + "="*60
+    credits_text += "\n⚠️ Copy above text to your YouTube video description!\n"
+    return credits_text
+
+
+def save_credits(credits_folder, title, credits):
+    safe_filename = re.sub(r'[^\w\s-]', '', title)[:50]
+    credits_file = os.path.join(credits_folder, f"{safe_filename}_credits.txt")
+    os.makedirs(credits_folder, exist_ok=True)
+    with open(credits_file, 'w', encoding='utf-8') as f:
+        f.write(credits)
+    return credits_file
+
+
+# ==================== FINGERPRINT ====================
+FP_RATE = 8000
+FP_FRAME = 2048  # 256 ms
+FP_HOP = 512     # 64 ms
+FP_BAND_EDGES = np.geomspace(300, 2000, 18)  # 17 bands -> 16 bits per frame
+# Bit error rate below which two fingerprints are the same recording. Re-encoded, quieter, EQ'd,
+# low-passed or shifted copies measure <= 0.20 and unrelated tracks >= 0.37 (bench_music_library).
+# Sped-up copies (~0.47) are not caught.
+DUPLICATE_THRESHOLD = 0.25
+
+
+def audio_fingerprint(path, seconds=60):
+    """
+    Bits of band-energy differences over time (Haitsma-Kalker style): robust to
+    re-encoding and volume changes. Returns packed bytes (2 per frame) or None.
+    """
+    cmd = [get_ffmpeg_binary(), "-v", "error", "-i", path, "-t", str(seconds),
+           "-ac", "1", "-ar", str(FP_RATE), "-f", "s16le", "-"]
+    raw = subprocess.run(cmd, capture_output=True, check=False).stdout
+    samples = np.frombuffer(raw, dtype=np.int16).astype(np.float32)
+    if len(samples) < FP_FRAME * 8:
+        return None
+    count = 1 + (len(samples) - FP_FRAME) // FP_HOP
+    index = np.arange(FP_FRAME)[None, :] + FP_HOP * np.arange(count)[:, None]
+    spectrum = np.abs(np.fft.rfft(samples[index] * np.hanning(FP_FRAME), axis=1)) ** 2
+    bands = np.digitize(np.fft.rfftfreq(FP_FRAME, 1 / FP_RATE), FP_BAND_EDGES) - 1
+    energy = np.stack([spectrum[:, bands == b].sum(axis=1) for b in range(len(FP_BAND_EDGES) - 1)], axis=1)
+    across = energy[:, :-1] - energy[:, 1:]
+    bits = (across[1:] - across[:-1]) > 0
+    return np.packbits(bits, axis=1).tobytes()
+
+
+def fingerprint_distance(a, b, max_shift=80, min_overlap=50):
+    """Lowest bit error rate over +-max_shift frames of offset (0 = same audio, ~0.5 = unrelated)"""
+    a = np.unpackbits(np.frombuffer(a, dtype=np.uint8)).reshape(-1, 16)
+    b = np.unpackbits(np.frombuffer(b, dtype=np.uint8)).reshape(-1, 16)
+    best = 1.0
+    for shift in range(-max_shift, max_shift + 1):
+        x, y = a[max(shift, 0):], b[max(-shift, 0):]
+        n = min(len(x), len(y))
+        if n < min_overlap:
+            continue
+        best = min(best, np.count_nonzero(x[:n] != y[:n]) / (n * 16))
+    return best
+
+
+# ==================== LIBRARY ====================
+class MusicLibrary:
+    """Downloaded tracks + metadata/credits/fingerprint index stored next to the music files"""
+
+    def __init__(self, music_folder, credits_folder, index_path=None, workers=4,
+                 duplicate_threshold=DUPLICATE_THRESHOLD):
+        self.music_folder = music_folder
+        self.credits_folder = credits_folder
+        self.index_path = index_path or os.path.join(music_folder, "music_index.json")
+        self.workers = max(1, workers)
+        self.duplicate_threshold = duplicate_threshold
+        self._lock = threading.Lock()
+        self.tracks = self._load()
+        self.stats = {"added": 0, "known_id": 0, "duplicate_audio": 0, "failed": 0}
+
+    # ---------- index ----------
+    def _load(self):
+        if not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f).get("tracks", {})
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Music index unreadable, starting a new one: {e}")
+            return {}
+
+    def save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.index_path)), exist_ok=True)
+        tmp_path = self.index_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"tracks": self.tracks}, f, indent=1, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+
+    def usable(self):
+        return [t for t in self.tracks.values()
+                if not t.get("duplicate_of") and t.get("file") and os.path.exists(t["file"])]
+
+    def pick(self):
+        """Random indexed track; untracked files in the folder are the fallback"""
+        tracks = self.usable()
+        if tracks:
+            return random.choice(tracks)["file"]
+        if os.path.isdir(self.music_folder):
+            files = [f for f in os.listdir(self.music_folder) if f.lower().endswith(AUDIO_EXTENSIONS)]
+            if files:
+                return os.path.join(self.music_folder, random.choice(files))
+        return None
+
+    def find_duplicate(self, fingerprint):
+        """Key of an indexed track with (nearly) the same audio, or None"""
+        if not fingerprint:
+            return None
+        for key, track in self.tracks.items():
+            other = track.get("fingerprint")
+            if other and not track.get("duplicate_of"):
+                if fingerprint_distance(fingerprint, base64.b64decode(other)) < self.duplicate_threshold:
+                    return key
+        return None
+
+    def index_untracked(self):
+        """Fingerprint audio already in the folder (e.g. older title-named downloads) so new ones dedup against it"""
+        if not os.path.isdir(self.music_folder):
+            return 0
+        known = {os.path.abspath(t["file"]) for t in self.tracks.values() if t.get("file")}
+        added = 0
+        for name in sorted(os.listdir(self.music_folder)):
+            path = os.path.join(self.music_folder, name)
+            if not name.lower().endswith(AUDIO_EXTENSIONS) or os.path.abspath(path) in known:
+                continue
+            fingerprint = audio_fingerprint(path)
+            self.tracks[f"file:{name}"] = {
+                "file": path,
+                "title": os.path.splitext(name)[0],
+                "fingerprint": base64.b64encode(fingerprint).decode("ascii") if fingerprint else None,
+            }
+            added += 1
+        return added
+
+    # ---------- ingestion ----------
+    def search(self, source, limit):
+        """(video_id, title) of the top `limit` results for one source, metadata only"""
+        import yt_dlp
+        opts = {"extract_flat": "in_playlist", "quiet": True, "no_warnings": True, "ignoreerrors": True}
+        try:
+            with yt_dlp.YoutubeDL(opts) as ydl:
+                info = ydl.extract_info(f"ytsearch{limit}:{source}", download=False) or {}
+        except Exception as e:
+            print(f"⚠️ Search failed for {source}: {e}")
+            return []
+        return [(entry["id"], entry.get("title")) for entry in info.get("entries") or [] if entry and entry.get("id")]
+
+    def ingest(self, sources, per_source=3):
+        """Search all sources at once, then download every new track concurrently; returns stats"""
+        print(f"\n🎵 SAFE VIRAL MUSIC DOWNLOADER")
+        print(f"📻 Sources: {', '.join(sources)}")
+        os.makedirs(self.music_folder, exist_ok=True)
+        if self.index_untracked():
+            self.save()
+
+        # Over-fetch so already known tracks don't leave a source short
+        with ThreadPoolExecutor(max_workers=len(sources) or 1) as pool:
+            results = list(pool.map(lambda source: self.search(source, per_source * 2), sources))
+
+        queued = []
+        seen = set(self.tracks)
+        for source, entries in zip(sources, results):
+            taken = 0
+            for video_id, title in entries:
+                if video_id in seen:
+                    self.stats["known_id"] += 1
+                    continue
+                if taken >= per_source:
+                    break
+                seen.add(video_id)
+                queued.append((video_id, source))
+                taken += 1
+
+        print(f"📥 {len(queued)} new track(s) to download with {self.workers} worker(s)")
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            list(pool.map(lambda item: self._download_track(*item), queued))
+        self.save()
+        print(f"\n✅ Music download complete! {self.stats['added']} added, {self.stats['known_id']} already known, "
+              f"{self.stats['duplicate_audio']} duplicate audio, {self.stats['failed']} failed")
+        return dict(self.stats)
+
+    def _download_track(self, video_id, source):
+        import yt_dlp
+        opts = {
+            'format': 'bestaudio/best',
+            'outtmpl': os.path.join(self.music_folder, '%(id)s.%(ext)s'),
+            'postprocessors': [{
+                'key': 'FFmpegExtractAudio',
+                'preferredcodec': 'mp3',
+                'preferredquality': '192',
+            }],
+            'noplaylist': True,
+            'quiet': True,
+            'no_warnings': True,
+        }
+        path = os.path.join(self.music_folder, f"{video_id}.mp3")
+        try:
+            with yt_dlp.YoutubeDL(opts) as ydl:
+                info = ydl.extract_info(f"https://www.youtube.com/watch?v={video_id}", download=True)
+        except Exception as e:
+            print(f"⚠️ Track {video_id} failed: {e}")
+            with self._lock:
+                self.stats["failed"] += 1
+            return None
+        if not os.path.exists(path):
+            with self._lock:
+                self.stats["failed"] += 1
+            return None
+        return self.add_track(video_id, path, info, source)
+
+    def add_track(self, key, path, info, source=None):
+        """Index a downloaded file, or delete it if the same audio is already in the library"""
+        fingerprint = audio_fingerprint(path)
+        title = info.get("title") or key
+        # Duplicate check and insert happen under one lock so parallel downloads of the same song can't both win
+        with self._lock:
+            duplicate = self.find_duplicate(fingerprint)
+            if duplicate:
+                os.remove(path)
+                self.tracks[key] = {"title": title, "duplicate_of": duplicate}
+                self.stats["duplicate_audio"] += 1
+                print(f"♻️ {title}: same audio as {self.tracks[duplicate].get('title')} - removed")
+                return None
+            credits = format_credits(info.get("description"), title)
+            self.tracks[key] = {
+                "file": path,
+                "title": title,
+                "uploader": info.get("uploader"),
+                "duration": info.get("duration"),
+                "source": source,
+                "credits": "\n".join(find_credits(info.get("description"))),
+                "fingerprint": base64.b64encode(fingerprint).decode("ascii") if fingerprint else None,
+            }
+            self.stats["added"] += 1
+        try:
+            self.tracks[key]["credits_file"] = save_credits(self.credits_folder, title, credits)
+        except Exception as e:
+            print(f"⚠️ Credits save error: {str(e)}")
+        print(f"✅ {title}")
+        return path
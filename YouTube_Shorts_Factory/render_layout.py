@@ -0,0 +1,122 @@
+"""
+Resolution-independent layout + render profiles.
+Every zone is stored as a fraction of the canvas, so a 540x960 preview
+and the 1080x1920 final render run the exact same placement maths.
+"""
+
+import os
+
+# Reference canvas the layouts were designed on (9:16 Vertical)
+BASE_WIDTH = 1080
+BASE_HEIGHT = 1920
+
+# ==================== LAYOUT ====================
+class Zone:
+    """A rectangle on the canvas, stored as fractions (0-1) of the canvas size"""
+
+    def __init__(self, x, y, w, h, fit="contain"):
+        self.x = x
+        self.y = y
+        self.w = w
+        self.h = h
+        self.fit = fit
+
+    @classmethod
+    def from_pixels(cls, x, y, w, h, canvas_w=BASE_WIDTH, canvas_h=BASE_HEIGHT, fit="contain"):
+        """Build a zone from pixel values measured on a canvas_w x canvas_h canvas"""
+        return cls(x / canvas_w, y / canvas_h, w / canvas_w, h / canvas_h, fit)
+
+    def to_pixels(self, canvas_w, canvas_h):
+        """Return (x, y, w, h) in pixels for the given canvas size"""
+        return (
+            int(round(self.x * canvas_w)),
+            int(round(self.y * canvas_h)),
+            int(round(self.w * canvas_w)),
+            int(round(self.h * canvas_h)),
+        )
+
+    def __repr__(self):
+        return f"Zone({self.x:.4f}, {self.y:.4f}, {self.w:.4f}, {self.h:.4f}, fit={self.fit!r})"
+
+
+def fit_size(src_w, src_h, zone_w, zone_h, fit="contain"):
+    """
+    Size a src_w x src_h frame for a zone (CSS object-fit style).
+    Returns (new_w, new_h, x_offset, y_offset) with the offsets centring the frame in the zone.
+    """
+    video_ratio = src_w / src_h
+    zone_ratio = zone_w / zone_h
+
+    if fit == "stretch":
+        new_width, new_height = zone_w, zone_h
+    elif fit == "cover":
+        if video_ratio > zone_ratio:
+            new_height = zone_h
+            new_width = int(zone_h * video_ratio)
+        else:
+            new_width = zone_w
+            new_height = int(zone_w / video_ratio)
+    else:
+        if video_ratio > zone_ratio:
+            # Video is wider than zone - fit to width
+            new_width = zone_w
+            new_height = int(zone_w / video_ratio)
+        else:
+            # Video is taller than zone - fit to height
+            new_height = zone_h
+            new_width = int(zone_h * video_ratio)
+
+    x_offset = (zone_w - new_width) // 2
+    y_offset = (zone_h - new_height) // 2
+    return new_width, new_height, x_offset, y_offset
+
+# ==================== RENDER PROFILES ====================
+class RenderProfile:
+    """Output size + encoder settings for one kind of render"""
+
+    def __init__(self, name, width, height, fps=30, preset="medium", audio=True, contact_sheet=False):
+        self.name = name
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.preset = preset
+        self.audio = audio
+        self.contact_sheet = contact_sheet
+
+    @property
+    def scale(self):
+        return self.width / BASE_WIDTH
+
+    def __repr__(self):
+        return f"RenderProfile({self.name!r}, {self.width}x{self.height}, preset={self.preset!r})"
+
+
+PROFILES = {
+    "final": RenderProfile("final", BASE_WIDTH, BASE_HEIGHT, fps=30, preset="medium", audio=True),
+    # Same layout at half size, fastest x264 preset and no audio mixing - for tuning zones
+    "preview": RenderProfile("preview", BASE_WIDTH // 2, BASE_HEIGHT // 2, fps=30,
+                             preset="ultrafast", audio=False, contact_sheet=True),
+}
+
+
+def get_profile(name):
+    """Look up a render profile by name (falls back to 'final')"""
+    return PROFILES.get(name, PROFILES["final"])
+
+
+def write_contact_sheet(clip, output_path, num_frames=4):
+    """Save a single PNG with num_frames evenly spaced frames side by side"""
+    try:
+        import numpy as np
+        import imageio
+
+        times = [clip.duration * (i + 0.5) / num_frames for i in range(num_frames)]
+        frames = [clip.get_frame(t).astype("uint8") for t in times]
+        sheet = np.hstack(frames)
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        imageio.imwrite(output_path, sheet)
+        print(f"🖼️ Contact sheet saved: {output_path}")
+        return output_path
+    except Exception as e:
+        print(f"⚠️ Contact sheet skipped: {e}")
+        return None
@@ -0,0 +1,262 @@
+"""
+Dry-run render planning and cost estimation.
+A plan is the render graph of one short, built from container metadata only
+(no frame is decoded): every video layer with its source size, scaled size
+and position, the audio tracks of the mix, duration, fps and the encoded
+outputs. estimate() turns a plan into CPU time, wall time, output bytes and
+peak memory using per-pixel costs from a calibration table, which
+benchmarks/bench_render_cost.py measures on the machine that will render
+(built-in defaults otherwise). fit_budget() downgrades a plan (drop proxies,
+faster preset, shorter cut) until it fits a time budget, or drops it.
+"""
+
+import os
+import json
+import copy
+
+# Used until bench_render_cost.py has measured the render machine (numbers from a
+# small single-core VM, so they err on the slow side)
+DEFAULT_CALIBRATION = {
+    "decode_ns_per_px": 12.0,       # H.264 decode + rawvideo pipe into numpy, per source pixel
+    "transform_ns_per_px": 170.0,   # Fused resize/colour chain, per pixel in + pixel out
+    "composite_ns_per_px": 9.0,     # Blit into the canvas, per layer pixel
+    "encode_ns_per_px": {"ultrafast": 9.0, "veryfast": 18.0, "fast": 28.0, "medium": 30.0},  # x264 CPU time
+    "bits_per_px": {"ultrafast": 0.13, "veryfast": 0.03, "fast": 0.032, "medium": 0.031},
+    "audio_seconds_per_track_second": 0.005,
+    "audio_bitrate": 192000,
+    "base_memory_mb": 150,
+    "cores": 1,
+    "measured_on": None,
+}
+
+PRESET_ORDER = ["medium", "fast", "veryfast", "ultrafast"]
+
+_probes = {}
+
+
+# ==================== PLAN ====================
+def probe_media(path):
+    """Container metadata of a media file (ffmpeg -i, no decoding), cached per path"""
+    if path in _probes:
+        return _probes[path]
+    from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+    infos = ffmpeg_parse_infos(path)
+    info = {
+        "size": list(infos.get("video_size") or [0, 0]),
+        "fps": infos.get("video_fps") or 30,
+        "duration": infos.get("duration") or 0,
+        "audio": bool(infos.get("audio_found")),
+    }
+    _probes[path] = info
+    return info
+
+
+def assumed_source(width, height, duration, fps=30, audio=True):
+    """Metadata for a source that isn't downloaded yet (the stream format selection would pick)"""
+    return {"size": [width, height], "fps": fps, "duration": duration, "audio": audio, "assumed": True}
+
+
+# How a layer's frames are produced
+LAYER_KINDS = (
+    "decode",  # decoded from its file every frame
+    "shared",  # reuses the frame another layer decoded from the same clip
+    "cached",  # whole clip held decoded + scaled in memory (template cache)
+    "static",  # one image (text overlay, background colour)
+)
+
+
+def layer(name, path, info, scaled, position=(0, 0), decode_size=None, kind="decode", ops=(), resized=None):
+    """
+    One video layer: decoded at decode_size (default: source size), transformed by `ops`
+    and blitted at `position` with size `scaled`. resized: size the resize step
+    produces when it is cropped afterwards (cover fills).
+    """
+    return {
+        "name": name,
+        "path": path,
+        "source": list(info["size"]) if info else None,
+        "decode": list(decode_size or (info["size"] if info else scaled)),
+        "scaled": list(scaled),
+        "position": list(position),
+        "kind": kind,
+        "ops": list(ops),
+        "resized": list(resized or scaled),
+    }
+
+
+def audio_track(name, path, duration, gain=1.0):
+    return {"name": name, "path": path, "duration": round(duration, 3), "gain": gain}
+
+
+def output(spec, canvas):
+    """Plan entry for an OutputSpec"""
+    return {
+        "path": spec.path,
+        "size": [spec.width or canvas[0], spec.height or canvas[1]],
+        "preset": spec.preset,
+        "crf": spec.crf,
+        "audio": spec.audio,
+    }
+
+
+def make_plan(name, profile, duration, layers, audio, outputs, **extra):
+    plan = {
+        "name": name,
+        "profile": profile.name,
+        "canvas": [profile.width, profile.height],
+        "fps": profile.fps,
+        "duration": round(duration, 3),
+        "layers": layers,
+        "audio": audio if profile.audio else [],
+        "outputs": outputs,
+    }
+    plan.update(extra)
+    return plan
+
+
+# ==================== CALIBRATION + ESTIMATE ====================
+def load_calibration(path=None):
+    """Calibration table from bench_render_cost.py merged over the defaults"""
+    table = copy.deepcopy(DEFAULT_CALIBRATION)
+    if path and os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                measured = json.load(f)
+        except ValueError:
+            return table
+        for key, value in measured.items():
+            if isinstance(value, dict) and isinstance(table.get(key), dict):
+                table[key].update(value)
+            else:
+                table[key] = value
+    return table
+
+
+def _per_preset(table, key, preset):
+    values = table[key]
+    return values.get(preset, values.get("medium"))
+
+
+def estimate(plan, calibration=None, threads=4):
+    """{"cpu_seconds", "wall_seconds", "output_bytes", "peak_memory_mb"} for a plan"""
+    cal = calibration or DEFAULT_CALIBRATION
+    frames = plan["duration"] * plan["fps"]
+    decode = transform = composite = 0.0
+    memory = cal["base_memory_mb"] * 1e6
+    for item in plan["layers"]:
+        scaled_px = item["scaled"][0] * item["scaled"][1]
+        composite += scaled_px * cal["composite_ns_per_px"]
+        if item["kind"] == "cached":
+            memory += scaled_px * 3 * frames  # whole clip held decoded
+            continue
+        if item["kind"] == "static":
+            memory += scaled_px * 4
+            continue
+        if item["kind"] == "decode":
+            decode_px = item["decode"][0] * item["decode"][1]
+            decode += decode_px * cal["decode_ns_per_px"]
+            memory += decode_px * 3 * 6  # reader frame + read-ahead queue
+        if item["ops"]:
+            resized_px = item["resized"][0] * item["resized"][1]
+            transform += (item["decode"][0] * item["decode"][1] + resized_px) * cal["transform_ns_per_px"]
+            memory += resized_px * 3  # transform output
+    encode = 0.0
+    output_bytes = 0.0
+    for out in plan["outputs"]:
+        px = out["size"][0] * out["size"][1]
+        encode += px * _per_preset(cal, "encode_ns_per_px", out["preset"])
+        output_bytes += frames * px * _per_preset(cal, "bits_per_px", out["preset"]) / 8
+        if plan["audio"] and out.get("audio", True):
+            output_bytes += plan["duration"] * cal["audio_bitrate"] / 8
+    canvas_px = plan["canvas"][0] * plan["canvas"][1]
+    memory += canvas_px * 3 * 5  # composite + 3 ring slots + ffmpeg input frame
+    memory += sum(o["size"][0] * o["size"][1] for o in plan["outputs"]) * 1.5 * 20  # x264 lookahead
+    audio = len(plan["audio"]) * plan["duration"] * cal["audio_seconds_per_track_second"]
+
+    video_side = frames * (decode + transform + composite) / 1e9  # Python thread, one core
+    encode_side = frames * encode / 1e9                              # ffmpeg, spread over threads
+    cores = max(1, min(threads, cal.get("cores") or 1))
+    if cores == 1:
+        wall = video_side + encode_side + audio  # Nothing overlaps on a single core
+    else:
+        # The frame pipe overlaps compositing with encoding; audio renders on its own thread
+        wall = max(video_side, encode_side / cores, audio) + min(video_side, encode_side / cores) * 0.1
+    return {
+        "cpu_seconds": round(video_side + encode_side + audio, 1),
+        "wall_seconds": round(wall, 1),
+        "output_bytes": int(output_bytes),
+        "peak_memory_mb": round(memory / 1e6),
+    }
+
+
+# ==================== BUDGET ====================
+def fit_budget(plan, budget_seconds, calibration=None, min_duration=10):
+    """
+    (plan, estimate, action) with the plan downgraded until its wall time fits the budget.
+    action: "keep", "downgrade" (steps in plan["downgrades"]) or "drop".
+    """
+    cost = estimate(plan, calibration)
+    if budget_seconds is None or cost["wall_seconds"] <= budget_seconds:
+        return plan, cost, "keep"
+    plan = copy.deepcopy(plan)
+    steps = plan.setdefault("downgrades", [])
+
+    if len(plan["outputs"]) > 1:
+        plan["outputs"] = plan["outputs"][:1]
+        steps.append("drop proxy renditions")
+        cost = estimate(plan, calibration)
+    master = plan["outputs"][0]
+    while cost["wall_seconds"] > budget_seconds and master["preset"] in PRESET_ORDER[:-1]:
+        # A faster preset only helps while the encoder, not the compositor, is the bottleneck
+        preset = master["preset"]
+        master["preset"] = PRESET_ORDER[PRESET_ORDER.index(preset) + 1]
+        faster = estimate(plan, calibration)
+        if faster["wall_seconds"] >= cost["wall_seconds"]:
+            master["preset"] = preset
+            break
+        steps.append(f"preset {master['preset']}")
+        cost = faster
+    if cost["wall_seconds"] > budget_seconds:
+        # Cost is linear in duration
+        duration = plan["duration"] * budget_seconds / cost["wall_seconds"]
+        if duration < min_duration:
+            return plan, cost, "drop"
+        plan["duration"] = round(duration, 3)
+        for track in plan["audio"]:
+            track["duration"] = min(track["duration"], plan["duration"])
+        steps.append(f"cut to {plan['duration']:.1f}s")
+        cost = estimate(plan, calibration)
+    return plan, cost, "downgrade"
+
+
+def apply_downgrades(plan, outputs):
+    """OutputSpecs matching a (possibly downgraded) plan: same order, proxies dropped, presets changed"""
+    kept = []
+    for entry in plan["outputs"]:
+        for spec in outputs:
+            if spec.path == entry["path"]:
+                spec = copy.copy(spec)
+                spec.preset = entry["preset"]
+                kept.append(spec)
+                break
+    return kept
+
+
+def print_plan(plans, calibration=None, budget_seconds=None):
+    """Estimate every plan and print the lot as JSON (returns the report)"""
+    report = {"budget_seconds": budget_seconds, "jobs": []}
+    totals = {"cpu_seconds": 0.0, "wall_seconds": 0.0, "output_bytes": 0, "peak_memory_mb": 0}
+    for plan in plans:
+        fitted, cost, action = fit_budget(plan, budget_seconds, calibration)
+        report["jobs"].append({"plan": fitted, "estimate": cost, "action": action})
+        if action == "drop":
+            continue
+        for key in ("cpu_seconds", "wall_seconds", "output_bytes"):
+            totals[key] += cost[key]
+        totals["peak_memory_mb"] = max(totals["peak_memory_mb"], cost["peak_memory_mb"])
+    totals["cpu_seconds"] = round(totals["cpu_seconds"], 1)
+    totals["wall_seconds"] = round(totals["wall_seconds"], 1)
+    report["totals"] = totals
+    report["calibration"] = (calibration or DEFAULT_CALIBRATION).get("measured_on") or "defaults"
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    return report
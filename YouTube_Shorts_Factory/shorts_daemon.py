@@ -0,0 +1,269 @@
+"""
+Long-running scheduler daemon.
+Instead of a fresh process every 8 hours, the factory can stay resident: it
+fires its own timer, keeps expensive state warm between runs (authenticated
+YouTube client, asset catalog, decoded templates) and accepts extra jobs from
+a drop directory or a localhost HTTP endpoint, which also serves /health.
+The clock is injectable so the scheduling logic can be driven without waiting.
+"""
+
+import os
+import json
+import time
+import queue
+import signal
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StageTimer:
+    """Wall time per named stage of one run"""
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.stages = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.stages[name] = round(self.stages.get(name, 0) + self.clock() - start, 3)
+
+    def summary(self):
+        return ", ".join(f"{name} {seconds:.1f}s" for name, seconds in self.stages.items())
+
+
+class AssetCatalog:
+    """Folder listings cached until the folder's mtime changes"""
+
+    def __init__(self):
+        self._listings = {}
+
+    def files(self, folder, extensions):
+        try:
+            mtime = os.stat(folder).st_mtime_ns
+        except OSError:
+            return []
+        cached = self._listings.get(folder)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, sorted(os.listdir(folder)))
+            self._listings[folder] = cached
+        return [f for f in cached[1] if os.path.splitext(f)[1].lower() in extensions]
+
+
+class WarmState:
+    """Everything a run can reuse from the previous one"""
+
+    def __init__(self, template_cache=None, catalog=None, youtube=None):
+        self.template_cache = template_cache
+        self.catalog = catalog or AssetCatalog()
+        self.youtube = youtube  # authenticated API client, built on first upload
+        self.fingerprints = None  # SourceFingerprints, loaded on the first run
+        self.timer = StageTimer()
+
+
+class ShortsDaemon:
+    """
+    Timer + job queue + health endpoint around a dict of job handlers.
+    handlers: {job type: callable(job, warm) -> result}; the timer enqueues {"type": timer_job}.
+    validators: {job type: callable(job)} raising ValueError for a job to reject on intake.
+    """
+
+    def __init__(self, handlers, interval, warm=None, inbox=None, port=None, timer_job="auto",
+                 clock=time.time, run_on_start=True, validators=None):
+        self.handlers = handlers
+        self.validators = validators or {}
+        self.interval = interval
+        self.warm = warm or WarmState()
+        self.inbox = inbox
+        self.port = port
+        self.timer_job = timer_job
+        self.clock = clock
+        self.started = clock()
+        self.next_run = self.started if run_on_start else self.started + interval
+        self.jobs = queue.Queue()
+        self.current = None
+        self.last_run = None
+        self.runs = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._server = None
+        if inbox:
+            os.makedirs(inbox, exist_ok=True)
+
+    # ---------- job intake ----------
+    def submit(self, job):
+        if not isinstance(job, dict) or job.get("type") not in self.handlers:
+            raise ValueError(f"Unknown job: {job!r}")
+        if job["type"] in self.validators:
+            self.validators[job["type"]](job)
+        self.jobs.put(job)
+
+    def poll_inbox(self):
+        """Queue every *.json job file dropped into the inbox (file is removed once queued)"""
+        if not self.inbox:
+            return 0
+        found = 0
+        for name in sorted(os.listdir(self.inbox)):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.inbox, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    job = json.load(f)
+                self.submit(job)
+                os.remove(path)
+                found += 1
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Bad job file {name}: {e}")
+                os.replace(path, path + ".rejected")
+        return found
+
+    # ---------- scheduling ----------
+    def tick(self):
+        """One scheduler step: fire the timer if due, pick up dropped jobs, run one queued job"""
+        now = self.clock()
+        if now >= self.next_run:
+            self.submit({"type": self.timer_job, "origin": "timer"})
+            # Skip runs missed while busy instead of firing them back to back
+            while self.next_run <= now:
+                self.next_run += self.interval
+        self.poll_inbox()
+        try:
+            job = self.jobs.get_nowait()
+        except queue.Empty:
+            return None
+        return self.run_job(job)
+
+    def run_job(self, job):
+        self.warm.timer = StageTimer(self.warm.timer.clock)
+        started = self.clock()
+        with self._lock:
+            self.current = job
+        print(f"\n⏰ Daemon running job: {job.get('type')} ({job.get('origin', 'queued')})")
+        ok, error, result = False, None, None
+        try:
+            result = self.handlers[job["type"]](job, self.warm)
+            ok = bool(result)
+        except SystemExit as e:  # handlers reuse CLI code paths that exit on failure
+            error = f"exit {e.code}"
+        except Exception as e:
+            error = str(e)
+        with self._lock:
+            self.current = None
+            self.runs += 1
+            self.failures += 0 if ok else 1
+            self.last_run = {
+                "type": job.get("type"),
+                "ok": ok,
+                "error": error,
+                "result": result if isinstance(result, (str, int, float)) else None,
+                "started": started,
+                "seconds": round(self.clock() - started, 3),
+                "stages": dict(self.warm.timer.stages),
+            }
+        print(f"{'✅' if ok else '❌'} Job finished ({self.warm.timer.summary() or 'no stages'})")
+        return self.last_run
+
+    def health(self):
+        with self._lock:
+            return {
+                "status": "stopping" if self._stop.is_set() else "ok",
+                "uptime": round(self.clock() - self.started, 1),
+                "queue_depth": self.jobs.qsize(),
+                "running": self.current.get("type") if self.current else None,
+                "next_run_in": round(max(0, self.next_run - self.clock()), 1),
+                "runs": self.runs,
+                "failures": self.failures,
+                "last_run": self.last_run,
+            }
+
+    # ---------- lifecycle ----------
+    def stop(self, *_):
+        """Graceful shutdown: the running job finishes, queued jobs go back to the inbox"""
+        if not self._stop.is_set():
+            print("\n🛑 Shutdown requested - finishing the current job...")
+        self._stop.set()
+
+    def serve_forever(self, poll_seconds=5):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        if self.port:
+            self._start_http()
+        print(f"🛰️ Daemon started (every {self.interval / 3600:.1f}h"
+              + (f", inbox {self.inbox}" if self.inbox else "")
+              + (f", http://127.0.0.1:{self.port}/health" if self.port else "") + ")")
+        try:
+            while not self._stop.is_set():
+                if self.tick() is None:
+                    self._stop.wait(poll_seconds)
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        self._stop.set()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        saved = self._spill_queue()
+        print(f"👋 Daemon stopped ({saved} queued job(s) saved to the inbox)")
+
+    def _spill_queue(self):
+        """Write jobs that never ran back to the inbox so the next start picks them up"""
+        saved = 0
+        while True:
+            try:
+                job = self.jobs.get_nowait()
+            except queue.Empty:
+                return saved
+            if job.get("origin") == "timer" or not self.inbox:
+                continue
+            path = os.path.join(self.inbox, f"requeued_{int(self.clock() * 1000)}_{saved}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(job, f)
+            saved += 1
+
+    def _start_http(self):
+        daemon = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, code, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/health":
+                    self._reply(200, daemon.health())
+                else:
+                    self._reply(404, {"error": "not found"})
+
+            def do_POST(self):
+                if self.path != "/jobs":
+                    return self._reply(404, {"error": "not found"})
+                try:
+                    length = int(self.headers.get("Content-Length") or 0)
+                    job = json.loads(self.rfile.read(length) or b"{}")
+                    if not isinstance(job, dict):
+                        raise ValueError(f"Job must be a JSON object: {job!r}")
+                    job["origin"] = "http"
+                    daemon.submit(job)
+                except ValueError as e:
+                    return self._reply(400, {"error": str(e)})
+                self._reply(202, {"queued": True, "queue_depth": daemon.jobs.qsize()})
+
+            def log_message(self, *args):
+                pass
+
+        # Localhost only - there is no authentication on this endpoint
+        self._server = ThreadingHTTPServer(("127.0.0.1", self.port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="daemon-http", daemon=True).start()
@@ -14,21 +14,32 @@ Features:
 """
 
 import os
-import re
 import json
 import random
+import hashlib
 import subprocess
 import asyncio
 from pathlib import Path
-from datetime import datetime
-from moviepy.editor import (
-    VideoFileClip, AudioFileClip, CompositeVideoClip, 
-    CompositeAudioClip, TextClip, ColorClip
-)
-from moviepy.video.fx.all import mirror_x, colorx
-import edge_tts
-import yt_dlp
-from youtube_uploader import upload_video
+# moviepy, yt_dlp and the YouTube client are imported by the stage that needs
+# them, so --help, a cron run that fails early or a batch worker doesn't pay for
+# loading everything up front
+from render_layout import Zone, fit_size, get_profile, write_contact_sheet
+from frame_transform import TransformChain
+from video_export import OutputSpec, export_video
+from download_formats import format_args, report_bytes_saved, required_resolution, DEFAULT_ASPECT
+from candidate_downloader import CandidateDownloader, VIDEO_EXTENSIONS
+from video_fingerprint import SourceFingerprints
+from clip_window import SourceWindows
+from shorts_daemon import ShortsDaemon, StageTimer, WarmState
+from batch_scheduler import plan_batch, group_by_template, TemplateCache, cache_budget_mb, merge_reports
+from music_library import MusicLibrary, format_credits, save_credits
+from job_queue import JobQueue, JobDropped, enqueue_file, print_status, run_workers
+from render_profiler import RenderProfiler, instrument
+from read_ahead import read_ahead
+from workspace import Workspace
+from upload_scheduler import UploadScheduler
+from render_planner import (probe_media, assumed_source, layer, audio_track, output, make_plan,
+                            load_calibration, fit_budget, apply_downgrades, print_plan)
 
 # ==================== CONFIGURATION ====================
 class Config:
@@ -47,6 +58,56 @@ class Config:
     REACTION_HEIGHT = int(CANVAS_HEIGHT * 0.40)  # Top 40%
     MAIN_VIDEO_HEIGHT = int(CANVAS_HEIGHT * 0.60)  # Bottom 60%
     
+    # Same split as canvas fractions - used for every render profile
+    REACTION_ZONE = Zone(0, 0, 1, 0.40, fit="cover")
+    MAIN_VIDEO_ZONE = Zone(0, 0.40, 1, 0.60, fit="contain")
+    
+    # Render profile: "final" (1080x1920) or "preview" (540x960, ultrafast, no audio)
+    RENDER_PROFILE = "final"
+    # Extra proxy files encoded from the same render pass, e.g. ["720p", "480p"]
+    PROXY_RENDITIONS = []
+    
+    # Batch Settings
+    BATCH_WORKERS = 1          # Render processes; jobs sharing a template stay on one worker
+    TEMPLATE_CACHE_MB = 1024   # Decoded reaction frames kept in memory per worker, at most
+    TEMPLATE_CACHE_RAM_SHARE = 0.25  # Share of the memory available at start all workers' caches may take together
+    TEMPLATE_CACHE_TEMPLATES = 1  # Caps TEMPLATE_CACHE_MB at this many full-length templates (~4.3 GB each at 1080x768, 58s)
+    READ_AHEAD_FRAMES = 4      # Frames decoded ahead per input clip on a background thread (0 = off)
+    
+    # Auto Mode Download
+    CANDIDATE_COUNT = 3        # Search results downloaded in parallel; first valid one wins
+    CANDIDATE_STORE = os.path.join(DOWNLOADS_FOLDER, "candidates")  # Unused valid downloads
+    MIN_SOURCE_DURATION = 3    # Seconds; shorter downloads are rejected
+    FINGERPRINT_INDEX = os.path.join(PROJECT_ROOT, "source_fingerprints.jsonl")  # Perceptual hashes of used sources
+    FINGERPRINT_RADIUS = 10    # Max differing bits (of 64) for a frame to count as the same
+    WINDOW_INDEX = os.path.join(PROJECT_ROOT, "source_windows.json")  # Activity curves of long sources
+    
+    # Daemon Mode (--daemon)
+    DAEMON_INTERVAL_HOURS = 8  # Same cadence as the scheduled workflow
+    DAEMON_INBOX = os.path.join(PROJECT_ROOT, "daemon_inbox")  # Drop *.json jobs here
+    DAEMON_PORT = 8765         # GET /health, POST /jobs on 127.0.0.1
+    
+    # Job Queue (batch + --enqueue / --work)
+    QUEUE_DB = os.path.join(PROJECT_ROOT, "jobs.db")
+    QUEUE_LEASE_SECONDS = 900  # A crashed worker's job is picked up again after this
+    QUEUE_MAX_ATTEMPTS = 3
+    
+    # Workspace (downloads/ + temp/ + output/ kept under a disk budget, least recently used first)
+    WORKSPACE_LEDGER = os.path.join(PROJECT_ROOT, "workspace.db")
+    WORKSPACE_BUDGET_MB = 10240
+    WORKSPACE_LEASE_SECONDS = 3 * 3600  # Files a crashed run was using become evictable after this
+    
+    # Uploads (held for the next quota window once the daily YouTube API quota is used up)
+    UPLOAD_DB = os.path.join(PROJECT_ROOT, "uploads.db")
+    YOUTUBE_DAILY_QUOTA = 10000
+    
+    # Render budget (--plan / auto + queued jobs): jobs estimated over this are downgraded or dropped
+    RENDER_CALIBRATION = os.path.join(PROJECT_ROOT, "render_calibration.json")  # benchmarks/bench_render_cost.py
+    RENDER_BUDGET_SECONDS = 1800
+    
+    # Profiling (--profile)
+    PROFILE_FOLDER = os.path.join(PROJECT_ROOT, "profiles")
+    
     # Anti-Copyright Effects
     BRIGHTNESS_FACTOR = 1.1
     MUSIC_VOLUME = 0.30  # 30% Volume
@@ -66,6 +127,10 @@ class Config:
         "hinglish": ["Wait karo yaar 🔥", "Dekho kya hoga 👀", "Ekdum zabardast! 😱", "Full satisfying hai 🌟"]
     }
     
+    # Music Library (downloaded concurrently, deduplicated by video ID + audio fingerprint)
+    MUSIC_INDEX = os.path.join(MUSIC_FOLDER, "music_index.json")
+    MUSIC_DOWNLOAD_WORKERS = 4
+    
     # Trusted Music Sources
     TRUSTED_MUSIC_SOURCES = [
         "NoCopyrightSounds trending",
@@ -109,143 +174,103 @@ def create_readme_files():
             with open(readme_path, 'w', encoding='utf-8') as f:
                 f.write(content)
 
+_workspace = None
+
+def get_workspace():
+    """This process's Workspace (queue workers each open their own ledger connection)"""
+    global _workspace
+    if _workspace is None or _workspace.pid != os.getpid():
+        _workspace = Workspace(Config.WORKSPACE_LEDGER,
+                               [Config.DOWNLOADS_FOLDER, Config.TEMP_FOLDER, Config.OUTPUT_FOLDER],
+                               Config.WORKSPACE_BUDGET_MB, scratch_root=Config.TEMP_FOLDER,
+                               lease_seconds=Config.WORKSPACE_LEASE_SECONDS)
+    return _workspace
+
 # ==================== MUSIC DOWNLOADER MODULE ====================
 class SafeMusicDownloader:
-    """Download safe viral music with auto credit extraction"""
+    """Download safe viral music with auto credit extraction (deduplicated, indexed library)"""
     
     def __init__(self):
         self.music_folder = Config.MUSIC_FOLDER
         self.credits_folder = Config.CREDITS_FOLDER
+        self.library = MusicLibrary(self.music_folder, self.credits_folder, Config.MUSIC_INDEX,
+                                    workers=Config.MUSIC_DOWNLOAD_WORKERS)
     
     def extract_credits(self, description, title):
-        credits_text = f"🎵 MUSIC CREDITS FOR: {title}\n"
-        credits_text += "="*60 + "\n\n"
-        patterns = [
-            r"Music provided by.*", r"Track:.*", r"Artist:.*", r"Download.*",
-            r"Stream.*", r"License.*", r"Creative Commons.*", r"Attribution.*"
-        ]
-        found_credits = []
-        for pattern in patterns:
-            matches = re.findall(pattern, description, re.IGNORECASE | re.MULTILINE)
-            found_credits.extend(matches)
-        
-        if found_credits:
-            credits_text += "\n".join(found_credits)
-        else:
-            credits_text += description[:500] + "..."
-        
-        credits_text += "\n\n" + "="*60
-        credits_text += "\n⚠️ Copy above text to your YouTube video description!\n"
-        return credits_text
+        return format_credits(description, title)
     
-    def download_music(self, num_songs=3, source_index=0):
+    def download_music(self, num_songs=3, source_index=None):
+        """num_songs per source; all TRUSTED_MUSIC_SOURCES at once unless source_index picks one"""
         try:
-            print(f"\n🎵 SAFE VIRAL MUSIC DOWNLOADER")
-            source = Config.TRUSTED_MUSIC_SOURCES[source_index]
-            print(f"📻 Source: {source}")
-            
-            ydl_opts = {
-                'format': 'bestaudio/best',
-                'outtmpl': os.path.join(self.music_folder, '%(title)s.%(ext)s'),
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '192',
-                }],
-                'noplaylist': True,
-                'quiet': False,
-                'no_warnings': True,
-                'ignoreerrors': True,
-            }
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                search_query = f"ytsearch{num_songs}:{source}"
-                info = ydl.extract_info(search_query, download=True)
-                if 'entries' in info:
-                    for entry in info['entries']:
-                        if entry:
-                            self.save_credits(entry)
-            print(f"\n✅ Music download complete!")
-            
+            sources = Config.TRUSTED_MUSIC_SOURCES
+            if source_index is not None:
+                sources = [sources[source_index]]
+            return self.library.ingest(sources, per_source=num_songs)
         except Exception as e:
             print(f"❌ Music download error: {str(e)}")
     
     def save_credits(self, video_info):
         try:
             title = video_info.get('title', 'Unknown')
-            description = video_info.get('description', '')
-            credits = self.extract_credits(description, title)
-            safe_filename = re.sub(r'[^\w\s-]', '', title)[:50]
-            credits_file = os.path.join(self.credits_folder, f"{safe_filename}_credits.txt")
-            with open(credits_file, 'w', encoding='utf-8') as f:
-                f.write(credits)
+            save_credits(self.credits_folder, title, self.extract_credits(video_info.get('description', ''), title))
         except Exception as e:
             print(f"⚠️ Credits save error: {str(e)}")
 
 # ==================== VIDEO DOWNLOADER ====================
+def source_format_args():
+    """yt-dlp format args sized for the main video zone (source audio is kept)"""
+    _, _, zone_w, zone_h = Config.MAIN_VIDEO_ZONE.to_pixels(Config.CANVAS_WIDTH, Config.CANVAS_HEIGHT)
+    return format_args(zone_w, zone_h, Config.MAIN_VIDEO_ZONE.fit, need_audio=True)
+
 def download_video(url, output_path):
     try:
         print(f"\n📥 Downloading video from: {url}")
         command = [
-            "yt-dlp", "-f", "best[height<=1080]", "--no-warnings", "-o", output_path, url
+            "yt-dlp", *source_format_args(), "--no-warnings", "-o", output_path, url
         ]
         subprocess.run(command, capture_output=True, text=True)
         
-        if os.path.exists(output_path):
-             return output_path
-        
+        # yt-dlp may leave a .mkv/.webm when it can't merge into mp4; it is tracked and reported the same way
         base_name = os.path.splitext(output_path)[0]
-        for ext in ['.mp4', '.mkv', '.webm']:
-            if os.path.exists(base_name + ext):
-                return base_name + ext
+        for path in [output_path] + [base_name + ext for ext in ['.mp4', '.mkv', '.webm']]:
+            if os.path.exists(path):
+                report_bytes_saved(path, max_height=1080)
+                get_workspace().track(path)
+                return path
         return None
     except Exception as e:
         print(f"❌ Download error: {str(e)}")
         return None
 
 # ==================== VIDEO PROCESSING ====================
-def apply_anti_copyright_effects(video_clip):
+def apply_anti_copyright_effects(chain):
     try:
-        video_clip = mirror_x(video_clip)
-        video_clip = colorx(video_clip, Config.BRIGHTNESS_FACTOR)
-        return video_clip
+        return chain.mirror_x().colorx(Config.BRIGHTNESS_FACTOR)
     except Exception as e:
-        return video_clip
+        return chain
 
-def resize_and_position_video(video_clip, target_width, target_height, y_position, fit_mode="contain"):
+def resize_and_position_video(video_clip, target_width, target_height, y_position, fit_mode="contain", chain=None,
+                              name=None):
+    """Resize + position a clip; pending per-frame ops in `chain` run in the same pass"""
     try:
-        aspect_ratio = video_clip.w / video_clip.h
-        target_aspect = target_width / target_height
-        
-        if fit_mode == "contain":
-            if aspect_ratio > target_aspect:
-                new_width = target_width
-                new_height = int(target_width / aspect_ratio)
-            else:
-                new_height = target_height
-                new_width = int(target_height * aspect_ratio)
-        elif fit_mode == "cover":
-            if aspect_ratio > target_aspect:
-                new_height = target_height
-                new_width = int(target_height * aspect_ratio)
-            else:
-                new_width = target_width
-                new_height = int(target_width / aspect_ratio)
-        
-        video_clip = video_clip.resize(newsize=(new_width, new_height))
-        x_position = (target_width - new_width) // 2
-        y_offset = (target_height - new_height) // 2
+        chain = chain or TransformChain.for_clip(video_clip)
+        new_width, new_height, x_position, y_offset = fit_size(
+            chain.w, chain.h, target_width, target_height, fit_mode
+        )
+        video_clip = chain.resize((new_width, new_height)).apply(video_clip, name)
         video_clip = video_clip.set_position((x_position, y_position + y_offset))
         return video_clip
     except Exception as e:
         return video_clip
 
-def create_text_overlay(text, duration):
+def create_text_overlay(text, duration, canvas_width=Config.CANVAS_WIDTH):
     try:
+        from moviepy.editor import TextClip
+        scale = canvas_width / Config.CANVAS_WIDTH
         txt_clip = TextClip(
-            text, fontsize=65, color='yellow', font='Arial-Bold', 
+            text, fontsize=int(65 * scale), color='yellow', font='Arial-Bold', 
             stroke_color='black', stroke_width=3, method='caption', 
-            size=(Config.CANVAS_WIDTH - 100, None)
+            size=(canvas_width - int(100 * scale), None)
         )
         txt_clip = txt_clip.set_position('center').set_duration(duration)
         txt_clip = txt_clip.crossfadein(0.5).crossfadeout(0.5)
@@ -260,52 +285,103 @@ async def generate_voiceover(text, output_path, language="hindi"):
     """
     return None
 
-def get_random_file(folder, extensions=[".mp4", ".mov", ".avi", ".mp3", ".wav"]):
+def get_random_file(folder, extensions=[".mp4", ".mov", ".avi", ".mp3", ".wav"], catalog=None):
     try:
         if not os.path.exists(folder): return None
-        files = [f for f in os.listdir(folder) if os.path.splitext(f)[1].lower() in extensions]
+        if catalog is not None:
+            files = catalog.files(folder, extensions)
+        else:
+            files = [f for f in os.listdir(folder) if os.path.splitext(f)[1].lower() in extensions]
         if not files: return None
         return os.path.join(folder, random.choice(files))
     except Exception:
         return None
 
-def process_video(source_video, reaction_video, music_path, voiceover_path, output_path):
+def default_outputs(output_path, profile):
+    """Master at the profile's preset plus the configured proxy renditions"""
+    outputs = [OutputSpec(output_path, preset=profile.preset)]
+    outputs += [OutputSpec.rendition(output_path, name) for name in Config.PROXY_RENDITIONS]
+    return outputs
+
+def process_video(source_video, reaction_video, music_path, voiceover_path, output_path, profile=None, outputs=None,
+                  template_cache=None, max_duration=None):
+    """
+    Render one short; `outputs` (list of OutputSpec) are all encoded from the same render pass.
+    With a TemplateCache the reaction is taken pre-decoded and pre-scaled from memory.
+    max_duration: shorter cut than MAX_VIDEO_DURATION (set when the render budget downgrades a job).
+    """
     try:
-        print(f"\n🎬 VIDEO PROCESSING STARTED (Original Audio Mode)")
-        main_video = VideoFileClip(source_video)
-        reaction = VideoFileClip(reaction_video)
+        from moviepy.editor import VideoFileClip, AudioFileClip, CompositeVideoClip, CompositeAudioClip, ColorClip
+        
+        profile = profile or get_profile(Config.RENDER_PROFILE)
+        if outputs is None:
+            outputs = default_outputs(output_path, profile)
+        output_path = outputs[0].path
+        canvas_w, canvas_h = profile.width, profile.height
+        print(f"\n🎬 VIDEO PROCESSING STARTED (Original Audio Mode, {profile.name} {canvas_w}x{canvas_h})")
+        reaction_zone_x, reaction_y, reaction_w, reaction_h = Config.REACTION_ZONE.to_pixels(canvas_w, canvas_h)
+        _, main_y, main_w, main_h = Config.MAIN_VIDEO_ZONE.to_pixels(canvas_w, canvas_h)
         
-        duration = min(main_video.duration, reaction.duration, Config.MAX_VIDEO_DURATION)
-        main_video = main_video.subclip(0, duration)
+        main_video = read_ahead(VideoFileClip(source_video), Config.READ_AHEAD_FRAMES)
+        cached = None
+        if template_cache is not None:
+            # The cached reaction is drawn as the canvas itself (static rows painted once); any part of it
+            # that overflows into the main zone stays on top of the main video as before
+            cached = template_cache.backdrop(reaction_video, reaction_w, reaction_h, Config.REACTION_ZONE.fit,
+                                             profile.fps, (reaction_zone_x, reaction_y, canvas_w, canvas_h),
+                                             keep_above=(main_y, main_y + main_h))
+        if cached:
+            reaction, reaction_top = cached
+        else:
+            reaction = read_ahead(VideoFileClip(reaction_video), Config.READ_AHEAD_FRAMES)
+        
+        duration = min(main_video.duration, reaction.duration, max_duration or Config.MAX_VIDEO_DURATION)
+        # Long sources contribute their most active stretch, not just their first seconds
+        start, end = SourceWindows(Config.WINDOW_INDEX).window(source_video, duration, main_video.duration)
+        main_video = main_video.subclip(start, end)
         reaction = reaction.subclip(0, duration)
+        if cached and reaction_top is not None:
+            reaction_top = reaction_top.subclip(0, duration)
         
-        main_video = apply_anti_copyright_effects(main_video)
+        main_chain = apply_anti_copyright_effects(TransformChain.for_clip(main_video))
         # main_video = main_video.without_audio() # KEEPING AUDIO
         
-        reaction = resize_and_position_video(reaction, Config.CANVAS_WIDTH, Config.REACTION_HEIGHT, 0, "cover")
-        main_video = resize_and_position_video(main_video, Config.CANVAS_WIDTH, Config.MAIN_VIDEO_HEIGHT, Config.REACTION_HEIGHT, "contain")
-        
-        background = ColorClip(size=(Config.CANVAS_WIDTH, Config.CANVAS_HEIGHT), color=(0, 0, 0), duration=duration)
+        if not cached:
+            reaction = resize_and_position_video(reaction, reaction_w, reaction_h, reaction_y, Config.REACTION_ZONE.fit,
+                                                 name="reaction")
+        main_video = resize_and_position_video(main_video, main_w, main_h, main_y, Config.MAIN_VIDEO_ZONE.fit, main_chain,
+                                               name="main")
         
         text = random.choice(Config.TEXT_PRESETS["hinglish"])
-        text_overlay = create_text_overlay(text, duration)
-        
-        layers = [background, main_video, reaction]
-        if text_overlay: layers.append(text_overlay)
+        text_overlay = create_text_overlay(text, duration, canvas_w)
         
-        final_video = CompositeVideoClip(layers)
+        if cached:
+            # Cached reaction is the canvas: no black background layer, no full-size template blit
+            layers = [reaction, main_video] + ([reaction_top] if reaction_top is not None else [])
+            if text_overlay: layers.append(text_overlay)
+            final_video = CompositeVideoClip(layers, use_bgclip=True)
+            instrument(final_video, {"reaction": reaction, "main": main_video, "text": text_overlay})
+        else:
+            background = ColorClip(size=(canvas_w, canvas_h), color=(0, 0, 0), duration=duration)
+            layers = [background, main_video, reaction]
+            if text_overlay: layers.append(text_overlay)
+            final_video = CompositeVideoClip(layers)
+            instrument(final_video, {"background": background, "main": main_video, "reaction": reaction,
+                                     "text": text_overlay})
         
-        # Audio Mixing: Source + Reaction + Music
+        # Audio Mixing: Source + Reaction + Music (skipped for preview renders)
         audio_clips = []
-        if reaction.audio:
+        if not profile.audio:
+            print("🔇 Preview profile - skipping audio mix")
+        elif reaction.audio:
             print("✅ Added Reaction Audio")
             audio_clips.append(reaction.audio)
             
-        if main_video.audio:
+        if profile.audio and main_video.audio:
             print("✅ Added Source Video Audio")
             audio_clips.append(main_video.audio)
         
-        if music_path and os.path.exists(music_path):
+        if profile.audio and music_path and os.path.exists(music_path):
             music = AudioFileClip(music_path).subclip(0, duration)
             music = music.volumex(Config.MUSIC_VOLUME)
             audio_clips.append(music)
@@ -313,10 +389,16 @@ def process_video(source_video, reaction_video, music_path, voiceover_path, outp
         if audio_clips:
             final_video = final_video.set_audio(CompositeAudioClip(audio_clips))
         
+        # Run-private temp files; outputs are renamed into place once complete
         print("💾 Exporting final video...")
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        workspace = get_workspace()
+        with workspace.in_use(source_video, music_path), workspace.scratch() as scratch, \
+                workspace.publish(outputs) as staged:
+            export_video(final_video, staged, fps=profile.fps, audio=profile.audio, threads=4,
+                         temp_folder=scratch)
         
-        final_video.write_videofile(output_path, fps=30, codec='libx264', audio_codec='aac', preset='medium', threads=4)
+        if profile.contact_sheet:
+            write_contact_sheet(final_video, os.path.splitext(output_path)[0] + "_sheet.png")
         
         main_video.close()
         reaction.close()
@@ -329,6 +411,105 @@ def process_video(source_video, reaction_video, music_path, voiceover_path, outp
         print(f"❌ Processing error: {str(e)}")
         return None
 
+# ==================== RENDER PLANNING ====================
+def plan_render(source_video, reaction_video, music_path, output_path, source_info=None, template_cache=None,
+                name=None):
+    """
+    Render graph of process_video for these inputs, from container metadata only.
+    source_info: metadata for a source that isn't downloaded yet (see assumed_source).
+    """
+    profile = get_profile(Config.RENDER_PROFILE)
+    canvas_w, canvas_h = profile.width, profile.height
+    reaction = probe_media(reaction_video)
+    source = source_info or probe_media(source_video)
+    duration = min(source["duration"], reaction["duration"], Config.MAX_VIDEO_DURATION)
+    _, reaction_y, reaction_w, reaction_h = Config.REACTION_ZONE.to_pixels(canvas_w, canvas_h)
+    _, main_y, main_w, main_h = Config.MAIN_VIDEO_ZONE.to_pixels(canvas_w, canvas_h)
+    main_fit = fit_size(*source["size"], main_w, main_h, Config.MAIN_VIDEO_ZONE.fit)
+    reaction_fit = fit_size(*reaction["size"], reaction_w, reaction_h, Config.REACTION_ZONE.fit)
+    # A template the worker already holds in its TemplateCache costs no decode
+    cached = template_cache is not None and any(key[0] == reaction_video for key in template_cache.entries)
+    scale = canvas_w / Config.CANVAS_WIDTH
+    text_w, text_h = canvas_w - int(100 * scale), int(65 * scale * 3)  # ~3 caption lines
+    layers = [
+        layer("background", None, None, (canvas_w, canvas_h), kind="static"),
+        layer("main", source_video, source, main_fit[:2], (main_fit[2], main_y + main_fit[3]),
+              ops=["mirror_x", "colorx", "resize"]),
+        layer("reaction", reaction_video, reaction, reaction_fit[:2], (reaction_fit[2], reaction_y + reaction_fit[3]),
+              kind="cached" if cached else "decode", ops=["resize"]),
+        layer("text", None, None, (text_w, text_h), ((canvas_w - text_w) // 2, (canvas_h - text_h) // 2),
+              kind="static"),
+    ]
+    audio = []
+    if reaction["audio"]:
+        audio.append(audio_track("reaction", reaction_video, duration))
+    if source["audio"]:
+        audio.append(audio_track("source", source_video, duration))
+    if music_path:
+        audio.append(audio_track("music", music_path, duration, Config.MUSIC_VOLUME))
+    outputs = [output(spec, (canvas_w, canvas_h)) for spec in default_outputs(output_path, profile)]
+    return make_plan(name or os.path.basename(output_path), profile, duration, layers, audio, outputs,
+                     source_assumed=bool(source.get("assumed")))
+
+def assumed_download():
+    """Metadata of the stream source_format_args() would pick for a typical 9:16 short"""
+    _, _, zone_w, zone_h = Config.MAIN_VIDEO_ZONE.to_pixels(Config.CANVAS_WIDTH, Config.CANVAS_HEIGHT)
+    res = required_resolution(zone_w, zone_h, Config.MAIN_VIDEO_ZONE.fit)
+    return assumed_source(res, round(res / DEFAULT_ASPECT), Config.MAX_VIDEO_DURATION)
+
+def budget_render(plan):
+    """(outputs, max_duration) to render a plan within RENDER_BUDGET_SECONDS - None to drop the job"""
+    plan, cost, action = fit_budget(plan, Config.RENDER_BUDGET_SECONDS, load_calibration(Config.RENDER_CALIBRATION))
+    print(f"🧮 Estimated render: {cost['wall_seconds']}s ({cost['cpu_seconds']} CPU-s), "
+          f"{cost['output_bytes'] / 1e6:.0f} MB out, {cost['peak_memory_mb']} MB peak")
+    if action == "drop":
+        print(f"⛔ Over the {Config.RENDER_BUDGET_SECONDS}s render budget even when downgraded - dropping job")
+        return None
+    if action == "downgrade":
+        print(f"📉 Downgraded to fit the render budget: {', '.join(plan['downgrades'])}")
+    profile = get_profile(Config.RENDER_PROFILE)
+    return apply_downgrades(plan, default_outputs(plan["outputs"][0]["path"], profile)), plan["duration"]
+
+def plan_mode(auto=False):
+    """--plan: print render graphs and cost estimates as JSON (queued jobs, or the next --auto run)"""
+    reaction_video = get_random_file(Config.REACTIONS_FOLDER, [".mp4", ".mov", ".avi"])
+    if not reaction_video:
+        print("❌ No reaction video found! Please add to assets/reactions/")
+        return
+    music_file = get_random_file(Config.MUSIC_FOLDER, [".mp3", ".wav"])
+    plans = []
+    if auto:
+        # The next run takes the oldest stored candidate if there is one, else downloads
+        stored = []
+        if os.path.isdir(Config.CANDIDATE_STORE):
+            stored = sorted((os.path.join(Config.CANDIDATE_STORE, f) for f in os.listdir(Config.CANDIDATE_STORE)
+                             if f.lower().endswith(VIDEO_EXTENSIONS)), key=os.path.getmtime)
+        plans.append(plan_render(stored[0] if stored else None, reaction_video, music_file,
+                                 os.path.join(Config.OUTPUT_FOLDER, "shorts_auto.mp4"),
+                                 source_info=None if stored else assumed_download(), name="auto"))
+    else:
+        queue = JobQueue(Config.QUEUE_DB)
+        jobs = queue.queued(["render"])
+        queue.close()
+        for job in jobs:
+            payload = job["payload"]
+            source = payload.get("source")
+            known = source and os.path.exists(source)
+            try:
+                output_path = job_output_path(payload, os.path.join(Config.OUTPUT_FOLDER, f"shorts_job_{job['id']}.mp4"))
+            except ValueError as e:
+                print(f"⚠️ Job {job['id']} will be dropped: {e}")
+                continue
+            plans.append(plan_render(
+                source if known else None,
+                payload.get("reaction") or reaction_video,
+                payload.get("music") or music_file,
+                output_path,
+                source_info=None if known else assumed_download(),
+                name=f"job {job['id']}"
+            ))
+    print_plan(plans, load_calibration(Config.RENDER_CALIBRATION), Config.RENDER_BUDGET_SECONDS)
+
 # ==================== MAIN WORKFLOWS ====================
 def create_single_video():
     print("\n📝 VIDEO CREATION WORKFLOW\n")
@@ -340,7 +521,7 @@ def create_single_video():
     
     source_video = None
     if video_url:
-        download_path = os.path.join(Config.DOWNLOADS_FOLDER, f"source_{datetime.now().strftime('%H%M%S')}.mp4")
+        download_path = get_workspace().unique_path(Config.DOWNLOADS_FOLDER, "source.mp4")
         source_video = download_video(video_url, download_path)
     else:
         source_video = get_random_file(Config.DOWNLOADS_FOLDER, [".mp4", ".mov", ".mkv", ".webm"])
@@ -359,58 +540,69 @@ def create_single_video():
     # VOICE OVER DISABLED
     voiceover_path = None
     
-    output_filename = f"shorts_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4"
-    output_path = os.path.join(Config.OUTPUT_FOLDER, output_filename)
+    output_path = get_workspace().unique_path(Config.OUTPUT_FOLDER, "shorts.mp4")
     
     result = process_video(source_video, reaction_video, music_file, voiceover_path, output_path)
     
-    if result:
+    if result and Config.RENDER_PROFILE == "preview":
+        print(f"\n👀 Preview Created (not uploaded): {result}")
+    elif result:
         print(f"\n🎉 Video Created: {result}")
         print("\n🚀 AUTO-UPLOADING TO YOUTUBE...")
         title = f"Sentimental Reaction! 😱 #shorts #viral"
         description = f"{commentary}\n\n#shorts #reaction"
         tags = ["shorts", "reaction", "viral"]
-        upload_video(result, title, description, tags)
+        upload_with_warm_client(result, title, description, tags)
+
+BATCH_COMMENTARIES = [
+    "Wait for the end! 😱",
+    "This is so satisfying!",
+    "Reaction to viral video",
+    "You won't believe this!",
+    "Amazing content"
+]
 
 def batch_process():
     print("\n🔄 BATCH PROCESSING MODE\n")
     try:
         num = int(input("How many videos? (1-10): ").strip())
-        commentaries = [
-            "Wait for the end! 😱",
-            "This is so satisfying!",
-            "Reaction to viral video",
-            "You won't believe this!",
-            "Amazing content"
-        ]
         
-        for i in range(num):
-            print(f"\n🎬 Processing Video {i+1}/{num}")
-            commentary = random.choice(commentaries)
-            
-            source_video = get_random_file(Config.DOWNLOADS_FOLDER, [".mp4", ".mov", ".mkv", ".webm"])
-            reaction_video = get_random_file(Config.REACTIONS_FOLDER, [".mp4", ".mov", ".avi"])
-            music_file = get_random_file(Config.MUSIC_FOLDER, [".mp3", ".wav"])
-            
-            if not source_video or not reaction_video:
-                print("❌ Skipped: Missing assets.")
+        # Renders whose upload the remaining daily quota can't cover are not started
+        with upload_scheduler() as scheduler:
+            drain_held_uploads(scheduler)
+            worth = scheduler.renders_worth_starting(num)
+            if worth < num:
+                print(f"⏸️ Quota covers {worth} of {num} uploads today ({scheduler.report()})")
+            num = worth
+        if num == 0:
+            return
+        
+        # Plan every job first, then keep jobs that share a reaction template together
+        jobs = plan_batch(
+            num,
+            lambda: get_random_file(Config.DOWNLOADS_FOLDER, [".mp4", ".mov", ".mkv", ".webm"]),
+            lambda: get_random_file(Config.REACTIONS_FOLDER, [".mp4", ".mov", ".avi"]),
+            lambda: get_random_file(Config.MUSIC_FOLDER, [".mp3", ".wav"]),
+            lambda: random.choice(BATCH_COMMENTARIES),
+        )
+        # Jobs go through the persistent queue, so a crash mid-batch loses nothing
+        queue = JobQueue(Config.QUEUE_DB)
+        for job in jobs:
+            if not job["source"] or not job["reaction"]:
+                print(f"❌ Job {job['index']+1} skipped: Missing assets.")
                 continue
-
-            voiceover_path = None # Disabled
-            
-            output_filename = f"shorts_batch_{i}_{datetime.now().strftime('%H%M%S')}.mp4"
-            output_path = os.path.join(Config.OUTPUT_FOLDER, output_filename)
-            
-            result = process_video(source_video, reaction_video, music_file, voiceover_path, output_path)
-            
-            if result:
-                print("\n🚀 AUTO-UPLOADING TO YOUTUBE...")
-                title = f"Amazing Reaction Video {i+1} 😱 #shorts"
-                description = f"{commentary}\n\n#shorts #viral"
-                tags = ["shorts", "viral", "reaction"]
-                upload_video(result, title, description, tags)
-                
-            print(f"✅ Video {i+1} Done!")
+            queue.enqueue("render", {
+                "source": job["source"],
+                "reaction": job["reaction"],
+                "music": job["music"],
+                "commentary": job["commentary"],
+                "title": f"Amazing Reaction Video {job['index']+1} 😱 #shorts",
+                "upload": True,
+            }, max_attempts=Config.QUEUE_MAX_ATTEMPTS, affinity=job["reaction"])
+        queue.close()
+        print(f"📋 Planned {num} jobs on {len(group_by_template(jobs))} template(s), {Config.BATCH_WORKERS} worker(s)")
+        
+        run_queue(Config.BATCH_WORKERS)
             
     except ValueError:
         print("❌ Invalid number")
@@ -423,7 +615,25 @@ import sys
 # ==================== AUTO MODE (HEADLESS) ====================
 def auto_mode():
     """Run autonomously for GitHub Actions"""
+    if not run_auto():
+        sys.exit(1) # Fail the workflow
+
+def run_auto(warm=None):
+    """
+    One search -> download -> render -> upload run. Returns the video id (or the
+    preview path), None on failure. warm: daemon WarmState reused across runs.
+    """
     print(f"\n{'='*70}\n🤖 AUTO MODE STARTED\n{'='*70}")
+    timer = warm.timer if warm else StageTimer()
+    catalog = warm.catalog if warm else None
+    
+    # Uploads held from earlier runs go first; no point rendering what can't be uploaded today
+    if Config.RENDER_PROFILE != "preview":
+        with upload_scheduler(warm) as scheduler:
+            drain_held_uploads(scheduler)
+            if scheduler.uploads_left() == 0:
+                print(f"⏸️ No upload quota left for a new short ({scheduler.report()})")
+                return None
     
     # 1. Search & Download Content
     queries = ["funny cat", "cute dog", "satisfying video", "viral funny clips"]
@@ -433,39 +643,49 @@ def auto_mode():
     
     print(f"🔍 Searching for Shorts: {query_term}")
     
-    download_path = os.path.join(Config.DOWNLOADS_FOLDER, "auto_video.mp4")
+    workspace = get_workspace()
+    download_path = workspace.unique_path(Config.DOWNLOADS_FOLDER, "auto_video.mp4")
     archive_file = "downloaded_videos.txt"
     
-    cmd = [
-        "yt-dlp",
-        "--extractor-args", "youtube:player_client=android",
-        "--match-filter", "duration < 59",
-        "-o", download_path,
-        "--no-playlist",
-        "--max-downloads", "1",
-        "--force-overwrites",
-        "--download-archive", archive_file,
-        search_url
-    ]
-    subprocess.run(cmd, check=False)
-    
-    if not os.path.exists(download_path):
-        print("❌ Auto-download failed! (Check if video was already in archive or yt-dlp error)")
-        sys.exit(1) # Fail the workflow
+    with timer.stage("download"):
+        fingerprints = warm.fingerprints if warm and warm.fingerprints else \
+            SourceFingerprints(Config.FINGERPRINT_INDEX, Config.FINGERPRINT_RADIUS)
+        if warm:
+            warm.fingerprints = fingerprints
+        downloader = CandidateDownloader(
+            Config.CANDIDATE_STORE, archive_file,
+            workers=Config.CANDIDATE_COUNT,
+            min_duration=Config.MIN_SOURCE_DURATION,
+            extra_args=[*source_format_args(), "--extractor-args", "youtube:player_client=android"],
+            fingerprints=fingerprints,
+            workspace=workspace,
+        )
+        # Leftover valid candidates from earlier runs are used before searching again
+        source = downloader.take_from_store(download_path)
+        if not source:
+            candidates = downloader.search(search_url, Config.CANDIDATE_COUNT)
+            source = downloader.download_first_valid(candidates, download_path)
+    
+    if not source:
+        print("❌ Auto-download failed! (No usable candidate - all archived, filtered or broken)")
+        return None
+    report_bytes_saved(download_path)
+    workspace.track(download_path)
 
     # 2. Get Assets
-    reaction_video = get_random_file(Config.REACTIONS_FOLDER, [".mp4", ".mov", ".avi"])
-    if not reaction_video:
-        print("❌ No reaction videos found! Upload some to assets/reactions/ in your repo.")
-        sys.exit(1)
-        
-    music_file = get_random_file(Config.MUSIC_FOLDER, [".mp3", ".wav"])
-    if not music_file:
-         # Try to download music if missing
-         print("🎵 Music missing, downloading default...")
-         d = SafeMusicDownloader()
-         d.download_music(1, 0)
-         music_file = get_random_file(Config.MUSIC_FOLDER, [".mp3", ".wav"])
+    with timer.stage("assets"):
+        reaction_video = get_random_file(Config.REACTIONS_FOLDER, [".mp4", ".mov", ".avi"], catalog)
+        if not reaction_video:
+            print("❌ No reaction videos found! Upload some to assets/reactions/ in your repo.")
+            return None
+            
+        # Index lookup; only an empty library triggers a download (one new track per source)
+        music = SafeMusicDownloader()
+        music_file = music.library.pick()
+        if not music_file:
+             print("🎵 Music missing, downloading default...")
+             music.download_music(1)
+             music_file = music.library.pick()
     
     # Check music again
     if not music_file:
@@ -473,14 +693,30 @@ def auto_mode():
 
     # 3. Process
     commentary = "Wait for it! This is amazing. 😱 #shorts"
-    output_filename = f"shorts_auto_{datetime.now().strftime('%Y%m%d_%H%M%S')}.mp4"
-    output_path = os.path.join(Config.OUTPUT_FOLDER, output_filename)
+    output_path = workspace.unique_path(Config.OUTPUT_FOLDER, "shorts_auto.mp4")
+    template_cache = warm.template_cache if warm else None
+    try:
+        budget = budget_render(plan_render(download_path, reaction_video, music_file, output_path,
+                                           template_cache=template_cache))
+    except Exception as e:
+        print(f"❌ Could not plan the render: {e}")
+        return None
+    if budget is None:
+        return None
+    outputs, max_duration = budget
     
-    result = process_video(download_path, reaction_video, music_file, None, output_path)
+    with timer.stage("render"):
+        result = process_video(download_path, reaction_video, music_file, None, output_path, outputs=outputs,
+                               template_cache=template_cache, max_duration=max_duration)
     
     if not result:
         print("❌ Video processing failed!")
-        sys.exit(1)
+        return None
+    downloader.record_used()  # Only a source that made it into a short counts as used
+
+    if Config.RENDER_PROFILE == "preview":
+        print(f"\n👀 Preview render only, skipping upload: {result}")
+        return result
 
     # 4. Upload
     print("\n🚀 AUTO-UPLOADING TO YOUTUBE...")
@@ -488,21 +724,228 @@ def auto_mode():
     description = f"{commentary}\n\nSubscribe for more!\n#shorts #reaction #viral"
     tags = ["shorts", "reaction", "viral", "funny"]
     
-    video_id = upload_video(result, title, description, tags)
+    with timer.stage("upload"):
+        video_id = upload_with_warm_client(result, title, description, tags, warm)
     
     if not video_id:
         print("❌ Upload failed!")
-        sys.exit(1)
+        return None
     
-    print("\n✅ Auto Mode Finished")
+    print(f"\n✅ Auto Mode Finished ({timer.summary()})")
+    return video_id
+
+def upload_scheduler(warm=None):
+    """
+    Quota-aware uploads (use as a context manager), building the authenticated
+    client once per daemon instead of once per upload
+    """
+    def send(path, title, description, tags):
+        from youtube_uploader import upload_video, get_authenticated_service
+        if warm is None:
+            return upload_video(path, title, description, tags)
+        if warm.youtube is None:
+            warm.youtube = get_authenticated_service()
+        return upload_video(path, title, description, tags, youtube=warm.youtube)
+    return UploadScheduler(Config.UPLOAD_DB, send, Config.YOUTUBE_DAILY_QUOTA)
+
+def drain_held_uploads(scheduler):
+    """Send uploads held from earlier runs; sent renders may be evicted again"""
+    for path, _ in scheduler.drain():
+        get_workspace().pin(path, False)
+
+def upload_with_warm_client(path, title, description, tags, warm=None):
+    """
+    Upload through the quota scheduler. A render that was held (quota used up,
+    or a failed attempt) is pinned so the disk budget never evicts it first.
+    """
+    workspace = get_workspace()
+    with upload_scheduler(warm) as scheduler, workspace.in_use(path):
+        video_id = scheduler.upload(path, title, description, tags)
+        print(f"📊 {scheduler.report()}")
+    if not video_id:
+        workspace.pin(path)
+    return video_id
+
+# ==================== DAEMON MODE ====================
+def job_output_path(job, default):
+    """
+    Where a job's render goes: its "output" is a plain file name, always put in
+    OUTPUT_FOLDER (jobs arrive over HTTP, so they never choose a path). ValueError otherwise.
+    """
+    name = job.get("output")
+    if not name:
+        return default
+    if not isinstance(name, str) or name in (".", "..") or os.path.basename(name) != name or "\\" in name:
+        raise ValueError(f"Job output must be a file name, not a path: {name!r}")
+    return os.path.join(Config.OUTPUT_FOLDER, name)
+
+def check_render_job(job):
+    """Daemon intake check for "video" jobs (rejected with a 400 / .rejected file)"""
+    if not job.get("source") and not job.get("url"):
+        raise ValueError("Job needs a \"source\" or a \"url\"")
+    job_output_path(job, None)
+
+def run_render_job(job, warm):
+    """
+    Render one job from given files or a URL, e.g. dropped as JSON into the daemon inbox
+    or stored in the job queue:
+    {"url": "...", "source": "downloads/x.mp4", "reaction": null, "music": null,
+     "commentary": "...", "title": "...", "upload": false, "output": "name.mp4"}
+    Missing reaction/music are picked at random like batch mode. Raises JobDropped
+    when even the downgraded render doesn't fit RENDER_BUDGET_SECONDS, or "output" is a path.
+    """
+    try:
+        output_name = job_output_path(job, None)
+    except ValueError as e:
+        raise JobDropped(str(e))  # Retrying won't change it
+    source = job.get("source")
+    if job.get("url"):
+        with warm.timer.stage("download"):
+            name = hashlib.md5(job["url"].encode("utf-8")).hexdigest()[:12]
+            source = download_video(job["url"], os.path.join(Config.DOWNLOADS_FOLDER, f"job_{name}.mp4"))
+    if not source or not os.path.exists(source):
+        print(f"❌ Job source not found: {source or job.get('url')}")
+        return None
+    with warm.timer.stage("assets"):
+        reaction = job.get("reaction") or get_random_file(Config.REACTIONS_FOLDER, [".mp4", ".mov", ".avi"], warm.catalog)
+        music = job.get("music") or get_random_file(Config.MUSIC_FOLDER, [".mp3", ".wav"], warm.catalog)
+    if not reaction:
+        print("❌ No reaction video for job")
+        return None
+
+    output_path = output_name or get_workspace().unique_path(Config.OUTPUT_FOLDER, "shorts_job.mp4")
+    try:
+        budget = budget_render(plan_render(source, reaction, music, output_path, template_cache=warm.template_cache))
+    except Exception as e:
+        print(f"❌ Could not plan the render: {e}")
+        return None
+    if budget is None:
+        raise JobDropped(f"over the {Config.RENDER_BUDGET_SECONDS}s render budget")  # Retrying won't make it fit
+    outputs, max_duration = budget
+    with warm.timer.stage("render"):
+        result = process_video(source, reaction, music, None, output_path, outputs=outputs,
+                               template_cache=warm.template_cache, max_duration=max_duration)
+    if not result or not job.get("upload") or Config.RENDER_PROFILE == "preview":
+        return result
+
+    commentary = job.get("commentary") or random.choice(BATCH_COMMENTARIES)
+    print("\n🚀 AUTO-UPLOADING TO YOUTUBE...")
+    with warm.timer.stage("upload"):
+        return upload_with_warm_client(result, job.get("title") or "Amazing Reaction! 😱 #shorts",
+                                       f"{commentary}\n\n#shorts #viral", ["shorts", "viral", "reaction"], warm)
+
+def new_template_cache(workers):
+    """TemplateCache within TEMPLATE_CACHE_MB and this worker's part of the free memory"""
+    budget = cache_budget_mb(Config.TEMPLATE_CACHE_MB, Config.TEMPLATE_CACHE_RAM_SHARE, workers)
+    return TemplateCache(budget, Config.MAX_VIDEO_DURATION, Config.TEMPLATE_CACHE_TEMPLATES)
+
+def daemon_mode(port=None):
+    """Stay resident: run auto mode on a timer and serve dropped / posted jobs with warm caches"""
+    warm = WarmState(template_cache=new_template_cache(workers=1))
+    daemon = ShortsDaemon(
+        {"auto": lambda job, warm: run_auto(warm), "video": run_render_job},
+        validators={"video": check_render_job},
+        interval=Config.DAEMON_INTERVAL_HOURS * 3600,
+        warm=warm,
+        inbox=Config.DAEMON_INBOX,
+        port=port,
+    )
+    daemon.serve_forever()
+
+# ==================== JOB QUEUE ====================
+_worker_warm = None
+
+def run_queued_job(payload):
+    """Job queue handler for "render" jobs; caches stay warm for the life of the worker process"""
+    global _worker_warm
+    if _worker_warm is None:
+        _worker_warm = WarmState(template_cache=new_template_cache(Config.BATCH_WORKERS))
+    return run_render_job(payload, _worker_warm)
+
+def queue_worker_report():
+    return _worker_warm.template_cache.report() if _worker_warm else {}
+
+# Config values main() sets from the command line. --workers processes are spawned with a fresh
+# Config, so these are handed to them explicitly (run_workers initializer).
+CLI_SETTINGS = ("RENDER_PROFILE", "PROXY_RENDITIONS", "BATCH_WORKERS")
+
+def cli_settings():
+    return {name: getattr(Config, name) for name in CLI_SETTINGS}
+
+def apply_settings(settings):
+    for name, value in settings.items():
+        setattr(Config, name, value)
+
+def run_queue(workers=1):
+    """Drain the job queue with `workers` processes (jobs sharing a template stick to one worker)"""
+    with upload_scheduler() as scheduler:
+        drain_held_uploads(scheduler)
+    stats = run_workers(Config.QUEUE_DB, {"render": run_queued_job}, workers,
+                        initializer=apply_settings, initargs=(cli_settings(),),
+                        lease_seconds=Config.QUEUE_LEASE_SECONDS, affinity_key="reaction",
+                        on_exit=queue_worker_report)
+    report = merge_reports(stats)
+    print(f"\n📋 Queue drained: {report.get('done', 0)} done, {report.get('failed', 0)} failed")
+    if report.get("templates_cached"):
+        print(f"🗂️ Template decode: {report['decode_seconds']}s paid, "
+              f"~{report['decode_seconds_saved']}s saved vs naive order ({report['cache_hits']} cache hits)")
+    return report
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--auto", action="store_true", help="Run in headless auto mode")
+    parser.add_argument("--preview", action="store_true", help="Fast 540x960 ultrafast render without audio (no upload)")
+    parser.add_argument("--proxy", action="append", choices=["720p", "480p"], default=[],
+                        help="Also encode a small proxy from the same render pass (repeatable)")
+    parser.add_argument("--workers", type=int, default=Config.BATCH_WORKERS,
+                        help="Batch render processes (jobs sharing a template stay on one worker)")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Stay resident: run auto mode on a timer and take jobs from the inbox / HTTP")
+    parser.add_argument("--port", type=int, default=Config.DAEMON_PORT,
+                        help="Daemon health/jobs port on 127.0.0.1 (0 = no HTTP endpoint)")
+    parser.add_argument("--enqueue", metavar="FILE",
+                        help="Add jobs from a URL list or JSONL file to the job queue")
+    parser.add_argument("--priority", type=int, default=0, help="Priority for --enqueue jobs (higher runs first)")
+    parser.add_argument("--upload", action="store_true", help="Upload --enqueue jobs once rendered")
+    parser.add_argument("--work", action="store_true", help="Run queued jobs with --workers processes")
+    parser.add_argument("--queue-status", action="store_true", help="Show job counts and recent jobs")
+    parser.add_argument("--plan", action="store_true",
+                        help="Dry run: print render graph + cost estimate of queued jobs (or the next run with --auto)")
+    parser.add_argument("--profile", nargs="?", const=Config.PROFILE_FOLDER, metavar="DIR",
+                        help="Write a cProfile dump, collapsed stacks and per-frame timing report for this run")
     args = parser.parse_args()
     
+    if args.preview:
+        Config.RENDER_PROFILE = "preview"
+    Config.PROXY_RENDITIONS = args.proxy
+    Config.BATCH_WORKERS = args.workers
+    
+    if args.profile:
+        with RenderProfiler(args.profile, "workflow"):
+            run(args)
+    else:
+        run(args)
+
+def run(args):
+    """Dispatch the parsed command line"""
     create_project_structure()
     
+    if args.plan:
+        plan_mode(args.auto)
+        return
+    if args.enqueue:
+        enqueue_file(Config.QUEUE_DB, args.enqueue, args.priority, args.upload, Config.QUEUE_MAX_ATTEMPTS)
+    if args.queue_status:
+        print_status(Config.QUEUE_DB)
+    if args.work:
+        run_queue(Config.BATCH_WORKERS)
+    if args.enqueue or args.queue_status or args.work:
+        return
+    
+    if args.daemon:
+        daemon_mode(args.port)
+        return
+    
     if args.auto:
         auto_mode()
         return
@@ -517,7 +960,7 @@ def main():
     
     if choice == "1":
         d = SafeMusicDownloader()
-        d.download_music(3, 0)
+        d.download_music(3)
     elif choice == "2":
         create_single_video()
     elif choice == "3":
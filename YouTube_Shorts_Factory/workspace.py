@@ -0,0 +1,303 @@
+"""
+Size-budgeted workspace for downloads/, temp/ and output/.
+Batch runs used to keep every source and rendered short forever, while fixed
+names like auto_video.mp4 or voiceover.mp3 were overwritten in place and broke
+concurrent runs. Here every run gets its own scratch directory and unique file
+names, outputs are encoded under a .partial name and renamed into place only
+once complete, and a small SQLite ledger tracks the size and last use of every
+artifact. Usage is a running sum kept in the ledger (the folders are scanned
+once, when the ledger is created); when it goes over the budget the least
+recently used artifacts are deleted, skipping pinned ones and anything a live
+run holds a lease on. Several processes can share one ledger.
+"""
+
+import os
+import copy
+import time
+import shutil
+import socket
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL,
+    pinned INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS artifacts_lru ON artifacts (pinned, last_used);
+CREATE TABLE IF NOT EXISTS leases (
+    path TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (path, owner)
+);
+"""
+
+SCRATCH_PREFIX = "run_"
+PARTIAL_TAG = ".partial-"
+IGNORED_NAMES = ("README.txt",)
+MB = 1024 * 1024
+
+
+def new_run_id(clock=time.time):
+    """Sortable id unique across concurrent processes, e.g. 20260118_143012_4711_9f3a"""
+    stamp = time.strftime("%Y%m%d_%H%M%S", time.localtime(clock()))
+    return f"{stamp}_{os.getpid()}_{os.urandom(2).hex()}"
+
+
+def path_size(path):
+    """Bytes used by a file, or by everything below a directory"""
+    if os.path.isdir(path):
+        total = 0
+        for folder, _, names in os.walk(path):
+            for name in names:
+                try:
+                    total += os.path.getsize(os.path.join(folder, name))
+                except OSError:
+                    pass
+        return total
+    return os.path.getsize(path)
+
+
+def owner_alive(owner):
+    """False only if owner ("host:pid") is a process on this host that has exited"""
+    host, _, pid = owner.rpartition(":")
+    if host != socket.gethostname() or os.name == "nt":  # os.kill(pid, 0) terminates on Windows
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, ValueError):
+        pass
+    return True
+
+
+class Workspace:
+    """Ledger of the artifacts under a few folders, kept under budget_mb by LRU eviction"""
+
+    def __init__(self, ledger, roots, budget_mb=None, scratch_root="temp", lease_seconds=3 * 3600,
+                 clock=time.time):
+        self.ledger = ledger
+        self.roots = [os.path.abspath(root) for root in roots]
+        self.budget = int(budget_mb * MB) if budget_mb else None
+        self.scratch_root = scratch_root
+        self.lease_seconds = lease_seconds
+        self.clock = clock
+        self.pid = os.getpid()
+        self.run_id = new_run_id(clock)
+        self.owner = f"{socket.gethostname()}:{self.pid}"
+        self._counter = 0
+        self._holds = {}  # path -> open in_use() blocks in this process
+        self._lock = threading.Lock()
+        created = not os.path.exists(ledger)
+        os.makedirs(os.path.dirname(os.path.abspath(ledger)), exist_ok=True)
+        self._db = sqlite3.connect(ledger, timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        if created:
+            self.rescan()
+        self.sweep_scratch()
+
+    def close(self):
+        self._db.close()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params)
+
+    # ---------- names ----------
+    def _next(self):
+        with self._lock:
+            self._counter += 1
+            return self._counter
+
+    def unique_path(self, folder, name):
+        """folder/name with this run's id in it, e.g. downloads/auto_video_<run>_1.mp4"""
+        root, ext = os.path.splitext(name)
+        return os.path.join(folder, f"{root}_{self.run_id}_{self._next()}{ext}")
+
+    # ---------- tracking ----------
+    def track(self, path, pinned=None):
+        """Record (or refresh) the size of an artifact and mark it as just used"""
+        key = os.path.abspath(path)
+        try:
+            size = path_size(key)
+        except OSError:
+            self.forget(key)
+            return 0
+        self._execute(
+            "INSERT INTO artifacts (path, size, last_used, pinned) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(path) DO UPDATE SET size = excluded.size, last_used = excluded.last_used" +
+            (", pinned = excluded.pinned" if pinned is not None else ""),
+            (key, size, self.clock(), int(bool(pinned))),
+        )
+        return size
+
+    def touch(self, path):
+        self._execute("UPDATE artifacts SET last_used = ? WHERE path = ?", (self.clock(), os.path.abspath(path)))
+
+    def forget(self, path):
+        self._execute("DELETE FROM artifacts WHERE path = ?", (os.path.abspath(path),))
+
+    def pin(self, path, pinned=True):
+        """Pinned artifacts are never evicted (tracked first if needed)"""
+        if self._execute("UPDATE artifacts SET pinned = ? WHERE path = ?",
+                         (int(pinned), os.path.abspath(path))).rowcount == 0 and os.path.exists(path):
+            self.track(path, pinned=pinned)
+
+    def usage(self):
+        return self._execute("SELECT COALESCE(SUM(size), 0) FROM artifacts").fetchone()[0]
+
+    def rescan(self):
+        """Adopt every existing file under the roots (run once, when the ledger is created)"""
+        scratch = os.path.abspath(self.scratch_root)
+        rows = []
+        for root in self.roots:
+            for folder, dirs, names in os.walk(root):
+                if os.path.abspath(folder) == scratch:
+                    dirs[:] = [d for d in dirs if not d.startswith(SCRATCH_PREFIX)]
+                for name in names:
+                    path = os.path.join(folder, name)
+                    if name in IGNORED_NAMES or PARTIAL_TAG in name or os.path.abspath(path) == os.path.abspath(self.ledger):
+                        continue
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    rows.append((os.path.abspath(path), stat.st_size, stat.st_mtime))
+        with self._lock:
+            self._db.executemany("INSERT OR IGNORE INTO artifacts (path, size, last_used) VALUES (?, ?, ?)", rows)
+        return len(rows)
+
+    # ---------- leases ----------
+    @contextmanager
+    def in_use(self, *paths):
+        """Hold a lease on paths for the duration of the block: they are not evicted meanwhile"""
+        keys = [os.path.abspath(path) for path in paths if path]
+        expires = self.clock() + self.lease_seconds
+        with self._lock:
+            # Nested leases on one path (a run + its render) share a row; the last release drops it
+            for key in keys:
+                self._holds[key] = self._holds.get(key, 0) + 1
+            self._db.executemany("INSERT OR REPLACE INTO leases (path, owner, expires) VALUES (?, ?, ?)",
+                                 [(key, self.owner, expires) for key in keys])
+        for key in keys:
+            self.touch(key)
+        try:
+            yield
+        finally:
+            with self._lock:
+                released = []
+                for key in keys:
+                    self._holds[key] -= 1
+                    if not self._holds[key]:
+                        del self._holds[key]
+                        released.append((key, self.owner))
+                self._db.executemany("DELETE FROM leases WHERE path = ? AND owner = ?", released)
+            for key in keys:
+                self.touch(key)
+
+    def leased(self):
+        """Paths with a lease that has not expired and whose owner is still running"""
+        rows = self._execute("SELECT path, owner FROM leases WHERE expires >= ?", (self.clock(),)).fetchall()
+        return {path for path, owner in rows if owner == self.owner or owner_alive(owner)}
+
+    # ---------- scratch + outputs ----------
+    @contextmanager
+    def scratch(self):
+        """Private temp directory for one run, removed afterwards (and by sweep_scratch if the run dies)"""
+        path = os.path.join(self.scratch_root, f"{SCRATCH_PREFIX}{self.run_id}_{self._next()}")
+        # Lease first: a concurrent sweep_scratch must never see the directory unleased
+        with self.in_use(path):
+            try:
+                os.makedirs(path, exist_ok=True)
+                yield path
+            finally:
+                shutil.rmtree(path, ignore_errors=True)
+
+    def sweep_scratch(self):
+        """Remove scratch directories left behind by runs that crashed"""
+        if not os.path.isdir(self.scratch_root):
+            return 0
+        leased = self.leased()
+        removed = 0
+        for name in os.listdir(self.scratch_root):
+            path = os.path.join(self.scratch_root, name)
+            if name.startswith(SCRATCH_PREFIX) and os.path.isdir(path) and os.path.abspath(path) not in leased:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+        self._execute("DELETE FROM leases WHERE expires < ?", (self.clock(),))
+        return removed
+
+    @contextmanager
+    def publish(self, outputs):
+        """
+        Yield copies of `outputs` (anything with a .path) pointing at .partial names
+        next to the real ones; on success they are renamed into place and tracked,
+        on failure deleted. Readers never see a half-written file.
+        """
+        staged = []
+        for spec in outputs:
+            spec = copy.copy(spec)
+            root, ext = os.path.splitext(spec.path)
+            spec.path = f"{root}{PARTIAL_TAG}{self.run_id}{ext}"
+            staged.append(spec)
+        try:
+            yield staged
+        except BaseException:
+            for spec in staged:
+                if os.path.exists(spec.path):
+                    os.remove(spec.path)
+            raise
+        for spec, final in zip(staged, outputs):
+            if os.path.exists(spec.path):
+                os.replace(spec.path, final.path)
+                self.track(final.path)
+        self.enforce(keep=[spec.path for spec in outputs])
+
+    # ---------- eviction ----------
+    def enforce(self, keep=()):
+        """Delete least recently used artifacts until usage fits the budget; returns the evicted paths"""
+        if self.budget is None:
+            return []
+        usage = self.usage()
+        if usage <= self.budget:
+            return []
+        protected = self.leased() | {os.path.abspath(path) for path in keep}
+        evicted = []
+        for path, size in self._execute(
+                "SELECT path, size FROM artifacts WHERE pinned = 0 ORDER BY last_used").fetchall():
+            if usage <= self.budget:
+                break
+            if path in protected:
+                continue
+            try:
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+                evicted.append(path)
+            except FileNotFoundError:
+                pass  # Already gone (moved, or evicted by another process)
+            except OSError as e:
+                print(f"⚠️ Could not evict {path}: {e}")
+                continue
+            self.forget(path)
+            usage -= size
+        if evicted:
+            print(f"🧹 Evicted {len(evicted)} artifact(s), workspace now {usage / MB:.0f} MB "
+                  f"of {self.budget / MB:.0f} MB")
+        if usage > self.budget:
+            print(f"⚠️ Workspace still over budget ({usage / MB:.0f} MB) - the rest is pinned or in use")
+        return evicted
+
+    def report(self):
+        pinned = self._execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM artifacts WHERE pinned = 1").fetchone()
+        total = self._execute("SELECT COUNT(*) FROM artifacts").fetchone()[0]
+        budget = f"{self.budget / MB:.0f} MB" if self.budget else "unlimited"
+        return (f"{total} artifact(s), {self.usage() / MB:.0f} MB of {budget} "
+                f"({pinned[0]} pinned, {pinned[1] / MB:.0f} MB)")
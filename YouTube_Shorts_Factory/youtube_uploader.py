@@ -6,6 +6,8 @@ from googleapiclient.http import MediaFileUpload
 from google_auth_oauthlib.flow import InstalledAppFlow
 from google.auth.transport.requests import Request
 
+from upload_scheduler import QuotaExceeded
+
 # Scopes required for uploading
 SCOPES = ['https://www.googleapis.com/auth/youtube.upload']
 
@@ -33,14 +35,17 @@ def get_authenticated_service():
 
     return build('youtube', 'v3', credentials=creds)
 
-def upload_video(video_path, title, description, tags, category_id="23", privacy_status="public"):
-    """Upload a video to YouTube"""
+def upload_video(video_path, title, description, tags, category_id="23", privacy_status="public", youtube=None):
+    """
+    Upload a video to YouTube (youtube: an already authenticated service to reuse).
+    Returns the video id, or None on failure; raises QuotaExceeded when the daily quota is used up.
+    """
     try:
         if not os.path.exists(video_path):
             print(f"❌ Video file not found: {video_path}")
             return None
 
-        youtube = get_authenticated_service()
+        youtube = youtube or get_authenticated_service()
         if not youtube:
             return None
 
@@ -78,6 +83,9 @@ def upload_video(video_path, title, description, tags, category_id="23", privacy
         return response['id']
 
     except Exception as e:
+        if b"quotaExceeded" in (getattr(e, "content", None) or b""):
+            print("❌ Upload refused: daily YouTube API quota exceeded")
+            raise QuotaExceeded(str(e))
         print(f"❌ Upload Failed: {str(e)}")
         return None
 
@@ -0,0 +1,127 @@
+"""
+Perceptual source fingerprint benchmark.
+1. Accuracy (needs ffmpeg): a synthetic source and a "re-upload" of it
+   (downscaled, brightened, cropped, trimmed, re-encoded at low quality) must
+   match; an unrelated source must not.
+2. Lookup latency: a SourceFingerprints-sized index with --sources stored
+   sources (8 frame hashes each) is queried with unrelated and near-duplicate
+   videos; p50/p99 per video lookup are compared with a numpy linear scan.
+Exits 1 on a failed check.
+
+Usage: python benchmarks/bench_fingerprints.py [--sources 100000] [--queries 300]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import numpy as np
+from video_fingerprint import SourceFingerprints, video_phash, hamming, popcount
+from video_export import get_ffmpeg_binary
+
+FRAMES = 8
+
+
+def check(condition, message):
+    if not condition:
+        print(f"❌ {message}")
+        sys.exit(1)
+    print(f"✅ {message}")
+
+
+def ffmpeg(*args):
+    subprocess.run([get_ffmpeg_binary(), "-y", "-v", "error", *args], check=True)
+
+
+def check_accuracy(folder):
+    original = os.path.join(folder, "original.mp4")
+    reupload = os.path.join(folder, "reupload.mp4")
+    other = os.path.join(folder, "other.mp4")
+    ffmpeg("-f", "lavfi", "-i", "mandelbrot=size=720x1280:rate=30", "-t", "8",
+           "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", original)
+    ffmpeg("-ss", "0.3", "-i", original, "-vf", "crop=iw-24:ih-40,scale=540:960,eq=brightness=0.06",
+           "-c:v", "libx264", "-crf", "36", "-preset", "ultrafast", reupload)
+    ffmpeg("-f", "lavfi", "-i", "life=size=720x1280:rate=30:mold=10:ratio=0.3:death_color=#203040", "-t", "8",
+           "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", other)
+
+    index = SourceFingerprints(os.path.join(folder, "fingerprints.jsonl"))
+    duplicate, hashes = index.find_duplicate(original)
+    check(duplicate is None and len(hashes) == FRAMES, "first source is new")
+    index.add("original", hashes)
+
+    a, b = video_phash(original), video_phash(reupload)
+    print(f"📊 Frame distance original vs re-upload: {[hamming(x, y) for x, y in zip(a, b)]}")
+    check(index.find_duplicate(reupload)[0] == "original", "re-upload is recognised as a near-duplicate")
+    check(index.find_duplicate(other)[0] is None, "unrelated source is not")
+    reloaded = SourceFingerprints(index.path)
+    check(reloaded.match(b) == "original" and reloaded.sources == 1, "index survives a reload")
+
+
+def check_latency(folder, sources, queries):
+    rng = random.Random(11)
+    path = os.path.join(folder, "large.jsonl")
+    stored = [[rng.getrandbits(64) for _ in range(FRAMES)] for _ in range(sources)]
+    with open(path, "w", encoding="utf-8") as f:
+        for n, hashes in enumerate(stored):
+            f.write('{"key": "v%d", "hashes": [%s]}\n' % (n, ", ".join(f'"{h:016x}"' for h in hashes)))
+
+    start = time.perf_counter()
+    index = SourceFingerprints(path)
+    print(f"⏱️ Loaded {index.sources} sources ({len(index.index)} frame hashes) in {time.perf_counter() - start:.1f}s")
+
+    def flip(value, bits):
+        for position in rng.sample(range(64), bits):
+            value ^= 1 << position
+        return value
+
+    misses = [[rng.getrandbits(64) for _ in range(FRAMES)] for _ in range(queries)]
+    targets = [rng.randrange(sources) for _ in range(queries)]
+    hits = [[flip(h, rng.randint(0, 8)) for h in stored[t]] for t in targets]
+
+    def timed(videos):
+        latencies, results = [], []
+        for hashes in videos:
+            start = time.perf_counter()
+            results.append(index.match(hashes))
+            latencies.append((time.perf_counter() - start) * 1000)
+        return np.percentile(latencies, [50, 99]), results
+
+    (miss50, miss99), miss_results = timed(misses)
+    (hit50, hit99), hit_results = timed(hits)
+
+    # Baseline: vectorised Hamming scan over every stored hash
+    table = np.array(index.index.hashes, dtype=np.uint64)
+    scan = []
+    for hashes in misses[:20]:
+        start = time.perf_counter()
+        for value in hashes:
+            np.flatnonzero(popcount(table ^ np.uint64(value)) <= index.index.radius)
+        scan.append((time.perf_counter() - start) * 1000)
+
+    print(f"⏱️ Per-video lookup ({FRAMES} frame hashes) at {sources} sources:")
+    print(f"   multi-index, unrelated      : p50 {miss50:.2f} ms, p99 {miss99:.2f} ms")
+    print(f"   multi-index, near-duplicate : p50 {hit50:.2f} ms, p99 {hit99:.2f} ms")
+    print(f"   numpy linear scan           : p50 {np.percentile(scan, 50):.2f} ms")
+    check(all(r is None for r in miss_results), "no false matches among unrelated queries")
+    check(all(r == f"v{t}" for r, t in zip(hit_results, targets)), "every near-duplicate (<= 8 bits/frame) is found")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sources", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=300)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as folder:
+        check_accuracy(folder)
+        check_latency(folder, args.sources, args.queries)
+    print("✅ Fingerprint checks passed")
+
+
+if __name__ == "__main__":
+    main()
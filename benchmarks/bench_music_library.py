@@ -0,0 +1,163 @@
+"""
+Music library checks (offline).
+1. Credit extraction: the precompiled per-phrase patterns vs the old eight
+   re.findall calls over the same descriptions (identical lines, time per pass).
+2. Duplicate threshold: bit error rates of altered copies (re-encoded,
+   quieter, EQ'd, low-passed, shifted) vs pairs of unrelated tracks; the
+   threshold must sit between the two with a margin on both sides.
+3. Audio dedup: a re-encoded, quieter, time-shifted copy of a track must be
+   rejected as a duplicate while a different track is kept, and the index
+   must survive a reload. Exits 1 on a failed check.
+
+Usage: python benchmarks/bench_music_library.py [--descriptions 5000]
+"""
+
+import os
+import re
+import sys
+import itertools
+import time
+import random
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "YouTube_Shorts_Factory"))
+from music_library import DUPLICATE_THRESHOLD, MusicLibrary, find_credits, fingerprint_distance, audio_fingerprint
+from video_export import get_ffmpeg_binary
+
+OLD_PATTERNS = [
+    r"Music provided by.*", r"Track:.*", r"Artist:.*", r"Download.*",
+    r"Stream.*", r"License.*", r"Creative Commons.*", r"Attribution.*"
+]
+
+CREDIT_LINES = [
+    "Track: {n} - Skyline", "Artist: Producer {n}", "Music provided by NoCopyrightSounds",
+    "Download / Stream: https://ncs.io/{n}", "License: CC BY 3.0", "Creative Commons Attribution 3.0",
+]
+FILLER = ["Follow us on socials!", "Thanks for listening :)", "Subscribe for more chill beats", "#lofi #beats"]
+
+
+def check(condition, message):
+    if not condition:
+        print(f"❌ {message}")
+        sys.exit(1)
+    print(f"✅ {message}")
+
+
+def make_descriptions(count):
+    rng = random.Random(7)
+    descriptions = []
+    for n in range(count):
+        lines = [rng.choice(FILLER) for _ in range(rng.randint(5, 30))]
+        for line in rng.sample(CREDIT_LINES, 3):
+            lines.insert(rng.randrange(len(lines)), line.format(n=n))
+        descriptions.append("\n".join(lines))
+    return descriptions
+
+
+def bench_credits(count):
+    descriptions = make_descriptions(count)
+
+    start = time.perf_counter()
+    old = []
+    for text in descriptions:
+        found = []
+        for pattern in OLD_PATTERNS:
+            found.extend(re.findall(pattern, text, re.IGNORECASE | re.MULTILINE))
+        old.append(found)
+    old_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    new = [find_credits(text) for text in descriptions]
+    new_seconds = time.perf_counter() - start
+
+    print(f"⏱️ Credits over {count} descriptions: re.findall {old_seconds * 1000:.1f} ms, "
+          f"precompiled {new_seconds * 1000:.1f} ms ({old_seconds / new_seconds:.1f}x)")
+    check(new == old, "same credit lines in the same order as the old scans")
+
+
+def make_track(path, seed, step, seconds=40):
+    subprocess.run([
+        get_ffmpeg_binary(), "-y", "-v", "error",
+        "-f", "lavfi", "-i", f"anoisesrc=d={seconds}:c=pink:seed={seed}:a=0.3",
+        "-f", "lavfi", "-i", f"aevalsrc=0.3*sin(2*PI*(300+{step}*mod(floor(t*3)\\,7))*t):d={seconds}",
+        "-filter_complex", "amix=inputs=2", "-b:a", "192k", path,
+    ], check=True)
+
+
+ALTERATIONS = {
+    "96k, quieter, 1.3s shift": (["-ss", "1.3"], ["-af", "volume=0.6", "-b:a", "96k"]),
+    "64k": ([], ["-b:a", "64k"]),
+    "low-passed": ([], ["-af", "lowpass=4000"]),
+    "EQ'd": ([], ["-af", "bass=g=6,treble=g=-6"]),
+    "0.37s shift": (["-ss", "0.37"], []),
+}
+
+
+def check_threshold(folder, tracks=6, altered=3):
+    paths = []
+    for i in range(tracks):
+        paths.append(os.path.join(folder, f"t{i}.mp3"))
+        make_track(paths[-1], i + 1, 120 + 10 * i)
+    prints = [audio_fingerprint(path) for path in paths]
+    copies = []
+    for i, path in enumerate(paths[:altered]):
+        for n, (before, after) in enumerate(ALTERATIONS.values()):
+            copy = os.path.join(folder, f"t{i}_{n}.m4a")
+            subprocess.run([get_ffmpeg_binary(), "-y", "-v", "error", *before, "-i", path, *after, copy], check=True)
+            copies.append(fingerprint_distance(prints[i], audio_fingerprint(copy)))
+    unrelated = [fingerprint_distance(a, b) for a, b in itertools.combinations(prints, 2)]
+    print(f"📊 Bit error rate: altered copies <= {max(copies):.2f}, unrelated tracks >= {min(unrelated):.2f} "
+          f"(median {sorted(unrelated)[len(unrelated) // 2]:.2f}), threshold {DUPLICATE_THRESHOLD}")
+    check(max(copies) + 0.04 < DUPLICATE_THRESHOLD < min(unrelated) - 0.1,
+          "duplicate threshold sits well clear of both altered copies and unrelated tracks")
+
+
+def check_dedup(folder):
+    music = os.path.join(folder, "music")
+    os.makedirs(music)
+    a, b = os.path.join(folder, "a.mp3"), os.path.join(folder, "b.mp3")
+    make_track(a, 1, 150)
+    make_track(b, 2, 170)
+    reupload = os.path.join(folder, "a_reupload.m4a")
+    subprocess.run([get_ffmpeg_binary(), "-y", "-v", "error", "-ss", "1.3", "-i", a,
+                    "-af", "volume=0.6", "-b:a", "96k", reupload], check=True)
+
+    fa, fb, fr = audio_fingerprint(a), audio_fingerprint(b), audio_fingerprint(reupload)
+    print(f"📊 Bit error rate: re-upload {fingerprint_distance(fa, fr):.2f}, different track {fingerprint_distance(fa, fb):.2f}")
+
+    library = MusicLibrary(music, os.path.join(folder, "credits"))
+    description = "Track: Skyline\nArtist: Someone\nLicense: CC BY"
+    for key, src in (("idA", a), ("idReup", reupload), ("idB", b)):
+        target = os.path.join(music, os.path.basename(src))
+        os.replace(src, target)
+        library.add_track(key, target, {"title": key, "description": description}, "test")
+    library.save()
+
+    check(library.stats["added"] == 2 and library.stats["duplicate_audio"] == 1, "re-upload is rejected as a duplicate")
+    check(not os.path.exists(os.path.join(music, "a_reupload.m4a")), "duplicate file is removed")
+    reloaded = MusicLibrary(music, os.path.join(folder, "credits"))
+    check(reloaded.tracks["idReup"]["duplicate_of"] == "idA", "index survives a reload")
+    check(reloaded.tracks["idA"]["credits"] == "Track: Skyline\nArtist: Someone\nLicense: CC BY", "credits are indexed")
+    start = time.perf_counter()
+    picks = {reloaded.pick() for _ in range(50)}
+    print(f"⏱️ 50 index picks in {(time.perf_counter() - start) * 1000:.1f} ms")
+    check(picks <= {os.path.join(music, "a.mp3"), os.path.join(music, "b.mp3")}, "pick only returns indexed, kept tracks")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--descriptions", type=int, default=5000)
+    args = parser.parse_args()
+    bench_credits(args.descriptions)
+    with tempfile.TemporaryDirectory() as folder:
+        check_threshold(folder)
+    with tempfile.TemporaryDirectory() as folder:
+        check_dedup(folder)
+    print("✅ Music library checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Render cost calibration for the dry-run planner (--plan).
+Measures on this machine what render_planner.estimate() multiplies plans by:
+decode, transform and composite nanoseconds per pixel, x264 CPU time and
+bits per pixel for each preset, and the audio mix cost per track second.
+Writes them as render_calibration.json (root and factory), then renders a
+synthetic template-mode short for real and compares its wall time and size
+with the estimate. Exits 1 if the estimate is off by more than --tolerance.
+
+Usage: python benchmarks/bench_render_cost.py [--seconds 4] [--tolerance 0.5] [--no-write]
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import resource
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import numpy as np
+from frame_transform import TransformChain
+from render_layout import get_profile
+from render_planner import (PRESET_ORDER, DEFAULT_CALIBRATION, layer, audio_track, output, make_plan,
+                            load_calibration, estimate)
+from video_export import OutputSpec, export_video, get_ffmpeg_binary
+
+FPS = 30
+
+
+def make_media(folder, seconds):
+    """Synthetic H.264 source (1280x720, moving test pattern), 1080x1920 template with audio, music"""
+    ffmpeg = get_ffmpeg_binary()
+    source = os.path.join(folder, "source.mp4")
+    template = os.path.join(folder, "template.mp4")
+    music = os.path.join(folder, "music.mp3")
+    subprocess.run([ffmpeg, "-y", "-v", "error", "-f", "lavfi", "-i", f"testsrc2=size=1280x720:rate={FPS}:d={seconds}",
+                    "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p", source], check=True)
+    subprocess.run([ffmpeg, "-y", "-v", "error", "-f", "lavfi", "-i", f"testsrc2=size=1080x1920:rate={FPS}:d={seconds}",
+                    "-f", "lavfi", "-i", f"sine=frequency=330:duration={seconds}",
+                    "-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest",
+                    template], check=True)
+    subprocess.run([ffmpeg, "-y", "-v", "error", "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+                    "-c:a", "libmp3lame", music], check=True)
+    return source, template, music
+
+
+def children_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def measure_decode(path):
+    from moviepy.editor import VideoFileClip
+    clip = VideoFileClip(path, audio=False)
+    start = time.perf_counter()
+    frames = [frame for frame in clip.iter_frames(fps=FPS, dtype="uint8")]
+    elapsed = time.perf_counter() - start
+    clip.close()
+    h, w = frames[0].shape[:2]
+    return elapsed * 1e9 / (len(frames) * w * h), frames
+
+
+def measure_transform(frames):
+    """Template mode's source chains: cover fill (upscale + crop) and contained foreground (downscale)"""
+    h, w = frames[0].shape[:2]
+    base = TransformChain(w, h).mirror_x().colorx(1.1)
+    chains = [
+        (base.resize((1902, 1070)).crop(x1=411, y1=0, width=1080, height=1070).colorx(0.3), 1902 * 1070),
+        (base.resize((1080, 608)), 1080 * 608),
+    ]
+    elapsed = px = 0
+    for chain, resized_px in chains:
+        transform = chain.compile()
+        transform(frames[0])  # Filter weights are built on first use
+        start = time.perf_counter()
+        for frame in frames:
+            transform(frame)
+        elapsed += time.perf_counter() - start
+        px += len(frames) * (w * h + resized_px)
+    return elapsed * 1e9 / px
+
+
+def measure_composite(seconds):
+    from moviepy.editor import VideoClip, CompositeVideoClip
+    rng = np.random.default_rng(3)
+    base = rng.integers(0, 255, (1920, 1080, 3), dtype=np.uint8)
+    top = rng.integers(0, 255, (1070, 1080, 3), dtype=np.uint8)
+    layers = [VideoClip(lambda t: base, duration=seconds),
+              VideoClip(lambda t: top, duration=seconds).set_position((0, 850))]
+    clip = CompositeVideoClip(layers)
+    times = np.arange(0, seconds, 1 / FPS)
+    start = time.perf_counter()
+    for t in times:
+        clip.get_frame(t)
+    return (time.perf_counter() - start) * 1e9 / (len(times) * (1080 * 1920 + 1080 * 1070))
+
+
+def measure_encode(folder, frames, preset):
+    """(x264 CPU ns per output pixel, bits per pixel) for one preset on decoded test frames"""
+    h, w = frames[0].shape[:2]
+    path = os.path.join(folder, f"encode_{preset}.mp4")
+    cmd = [get_ffmpeg_binary(), "-y", "-v", "error", "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{w}x{h}",
+           "-r", str(FPS), "-i", "-", "-c:v", "libx264", "-preset", preset, "-pix_fmt", "yuv420p", path]
+    before = children_cpu()
+    process = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+    for frame in frames:
+        process.stdin.write(frame.tobytes())
+    process.stdin.close()
+    process.wait()
+    px = len(frames) * w * h
+    return (children_cpu() - before) * 1e9 / px, os.path.getsize(path) * 8 / px
+
+
+def measure_audio(template, music, seconds):
+    from moviepy.editor import AudioFileClip, CompositeAudioClip
+    mix = CompositeAudioClip([AudioFileClip(template), AudioFileClip(music).volumex(0.1)])
+    start = time.perf_counter()
+    for _ in mix.iter_chunks(fps=44100, chunksize=2000, quantize=True, nbytes=2):
+        pass
+    return (time.perf_counter() - start) / (2 * seconds)
+
+
+def build_short(source, template, music):
+    """The template-mode layer graph: template, darkened cover fill and contained source in the black zone"""
+    from moviepy.editor import VideoFileClip, AudioFileClip, CompositeVideoClip, CompositeAudioClip
+    template_clip = VideoFileClip(template)
+    source_clip = VideoFileClip(source, audio=False)
+    chain = TransformChain.for_clip(source_clip).mirror_x().colorx(1.1)
+    bg = chain.resize((1902, 1070)).crop(x1=411, y1=0, width=1080, height=1070).colorx(0.3)
+    fg = chain.resize((1080, 608))
+    video = CompositeVideoClip([
+        template_clip,
+        bg.apply(source_clip, "bg_fill").set_position((0, 850)),
+        fg.apply(source_clip, "source").set_position((0, 850 + 231)),
+    ])
+    return video.set_audio(CompositeAudioClip([template_clip.audio, AudioFileClip(music).volumex(0.1)]))
+
+
+def plan_short(source, template, music, seconds, path):
+    """What plan_render() describes for build_short()"""
+    info = {"size": [1080, 1920]}
+    src = {"size": [1280, 720]}
+    return make_plan("validation", get_profile("final"), seconds, [
+        layer("template", template, info, (1080, 1920)),
+        layer("bg_fill", source, src, (1080, 1070), (0, 850), ops=["mirror_x", "colorx", "resize", "crop", "colorx"],
+              resized=(1902, 1070)),
+        layer("source", source, src, (1080, 608), (0, 1081), kind="shared", ops=["mirror_x", "colorx", "resize"]),
+    ], [audio_track("template", template, seconds), audio_track("music", music, seconds, 0.1)],
+        [output(OutputSpec(path, preset="medium"), (1080, 1920))])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=4)
+    parser.add_argument("--tolerance", type=float, default=0.5, help="Allowed relative error of the estimate")
+    parser.add_argument("--no-write", action="store_true", help="Print the table, don't write render_calibration.json")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        source, template, music = make_media(folder, args.seconds)
+        table = json.loads(json.dumps(DEFAULT_CALIBRATION))
+        table["decode_ns_per_px"], source_frames = measure_decode(source)
+        table["transform_ns_per_px"] = measure_transform(source_frames[::4])
+        table["composite_ns_per_px"] = measure_composite(min(args.seconds, 2))
+        del source_frames
+        # Encoders see composited shorts, not raw sources: calibrate on rendered frames
+        short = build_short(source, template, music)
+        frames = [short.get_frame(t) for t in np.arange(0, min(args.seconds, 2), 1 / FPS)]
+        short.close()
+        for preset in PRESET_ORDER:
+            cpu, bits = measure_encode(folder, frames, preset)
+            table["encode_ns_per_px"][preset] = cpu
+            table["bits_per_px"][preset] = bits
+        table["audio_seconds_per_track_second"] = measure_audio(template, music, args.seconds)
+        table["cores"] = os.cpu_count() or 1
+        table["measured_on"] = f"{socket.gethostname()} {time.strftime('%Y-%m-%d')}"
+        table = json.loads(json.dumps(table), parse_float=lambda v: round(float(v), 4))
+
+        print("📏 Calibration:")
+        print(json.dumps(table, indent=2))
+        if not args.no_write:
+            for path in (os.path.join(ROOT, "render_calibration.json"),
+                         os.path.join(ROOT, "YouTube_Shorts_Factory", "render_calibration.json")):
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump(table, f, indent=2)
+                print(f"💾 Wrote {path}")
+
+        del frames
+        # Validate: render the same graph for real and compare with the plan's estimate
+        path = os.path.join(folder, "short.mp4")
+        short = build_short(source, template, music)
+        start = time.perf_counter()
+        export_video(short, [OutputSpec(path, preset="medium")], fps=FPS, threads=4, temp_folder=folder)
+        elapsed = time.perf_counter() - start
+        short.close()
+        size = os.path.getsize(path)
+        plan = plan_short(source, template, music, args.seconds, path)
+        print(f"\n⏱️ Real render : {elapsed:.1f}s, {size / 1e6:.2f} MB")
+        for label, calibration in (("defaults", load_calibration(None)), ("calibrated", table)):
+            cost = estimate(plan, calibration)
+            time_error = abs(cost["wall_seconds"] - elapsed) / elapsed
+            size_error = abs(cost["output_bytes"] - size) / size
+            print(f"🧮 {label:<11}: {cost['wall_seconds']}s, {cost['output_bytes'] / 1e6:.2f} MB "
+                  f"(off by {time_error:.0%} / {size_error:.0%})")
+        if time_error > args.tolerance or size_error > args.tolerance:
+            print(f"❌ Estimate off by more than {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Cold-start check for both entry points.
+Runs `python -X importtime -c "import <entry point>"` in fresh processes, takes
+the median cumulative import time, and fails (exit 1) when it goes over the
+threshold / saved baseline or when a heavy subsystem (moviepy, edge_tts,
+yt_dlp, the Google API client) gets imported at startup again.
+
+Usage: python benchmarks/bench_startup.py [--runs 5] [--threshold-ms 500]
+                                          [--baseline benchmarks/startup_baseline.json] [--save]
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY_POINTS = {
+    "viral_video_bot": ROOT,
+    "workflow": os.path.join(ROOT, "YouTube_Shorts_Factory"),
+}
+
+# Only the stage that uses them may load these
+HEAVY_MODULES = ["moviepy", "edge_tts", "yt_dlp", "googleapiclient", "google_auth_oauthlib", "youtube_uploader"]
+
+
+def import_profile(module, cwd):
+    """(total_ms, {top-level package: cumulative ms}) for one cold import"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=cwd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    packages = {}
+    total = None
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        top = name.split(".")[0]
+        packages[top] = max(packages.get(top, 0), int(cumulative) / 1000)
+        if name == module:
+            total = int(cumulative) / 1000
+    return total, packages
+
+
+def measure(module, cwd, runs):
+    totals = []
+    packages = {}
+    for _ in range(runs):
+        total, packages = import_profile(module, cwd)
+        totals.append(total)
+    return statistics.median(totals), packages
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5, help="Cold imports per entry point (median is used)")
+    parser.add_argument("--threshold-ms", type=float, default=500, help="Hard ceiling per entry point")
+    parser.add_argument("--baseline", default=os.path.join(ROOT, "benchmarks", "startup_baseline.json"))
+    parser.add_argument("--tolerance", type=float, default=1.5, help="Allowed slowdown vs the saved baseline")
+    parser.add_argument("--save", action="store_true", help="Write the measured times as the new baseline")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    failed = False
+    results = {}
+    for module, cwd in ENTRY_POINTS.items():
+        median_ms, packages = measure(module, cwd, args.runs)
+        results[module] = round(median_ms, 1)
+        slowest = sorted((item for item in packages.items() if item[0] != module), key=lambda item: -item[1])[:3]
+        print(f"⏱️ {module}: {median_ms:.0f} ms  (largest: " +
+              ", ".join(f"{name} {ms:.0f} ms" for name, ms in slowest) + ")")
+
+        leaked = [name for name in HEAVY_MODULES if name in packages]
+        if leaked:
+            print(f"❌ {module} imports {', '.join(leaked)} at startup")
+            failed = True
+        limit = args.threshold_ms
+        if module in baseline:
+            limit = min(limit, baseline[module] * args.tolerance)
+        if median_ms > limit:
+            print(f"❌ {module} startup regressed: {median_ms:.0f} ms > {limit:.0f} ms")
+            failed = True
+
+    if args.save:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Baseline saved to {args.baseline}")
+
+    if failed:
+        sys.exit(1)
+    print("✅ Startup within budget")
+
+
+if __name__ == "__main__":
+    main()
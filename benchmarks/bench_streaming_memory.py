@@ -0,0 +1,87 @@
+"""
+Peak-memory check for the streaming render mode.
+Builds a synthetic long, high-resolution source + template with ffmpeg, renders
+it in a child process with Config.MEMORY_CEILING_MB set, and fails (exit 1) if
+the child's peak RSS goes over the ceiling.
+
+Usage: python benchmarks/bench_streaming_memory.py [--ceiling 700] [--duration 20] [--compare]
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from video_export import get_ffmpeg_binary
+
+CHILD = r"""
+import json, sys
+sys.path.insert(0, {root!r})
+import viral_video_bot as bot
+from frame_ring import peak_rss_mb
+bot.Config.MEMORY_CEILING_MB = {ceiling}
+bot.Config.TEMP_FOLDER = {temp!r}
+result = bot.process_video({source!r}, {template!r}, None, None, {output!r})
+print("@@" + json.dumps({{"ok": bool(result), "peak_mb": peak_rss_mb(), "children_mb": peak_rss_mb(children=True)}}))
+"""
+
+
+def make_inputs(folder, duration):
+    ffmpeg = get_ffmpeg_binary()
+    source = os.path.join(folder, "source_4k.mp4")
+    template = os.path.join(folder, "template.mp4")
+    print(f"🛠️ Generating {duration}s 3840x2160 source + 1080x1920 template...")
+    subprocess.run([ffmpeg, "-y", "-loglevel", "error", "-f", "lavfi",
+                    "-i", f"testsrc2=size=3840x2160:rate=30:duration={duration}",
+                    "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", source], check=True)
+    subprocess.run([ffmpeg, "-y", "-loglevel", "error", "-f", "lavfi",
+                    "-i", f"testsrc=size=1080x1920:rate=30:duration={duration}",
+                    "-f", "lavfi", "-i", f"sine=frequency=440:duration={duration}",
+                    "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", "-c:a", "aac",
+                    "-shortest", template], check=True)
+    return source, template
+
+
+def render(source, template, folder, ceiling):
+    code = CHILD.format(root=ROOT, ceiling=ceiling, temp=folder, source=source, template=template,
+                        output=os.path.join(folder, f"out_{ceiling}.mp4"))
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    for line in proc.stdout.splitlines():
+        if line.startswith("@@"):
+            return json.loads(line[2:])
+    raise RuntimeError(f"Render failed:\n{proc.stdout[-2000:]}\n{proc.stderr[-2000:]}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--ceiling", type=int, default=700, help="Memory ceiling in MB")
+    parser.add_argument("--duration", type=int, default=20, help="Synthetic input length in seconds")
+    parser.add_argument("--compare", action="store_true", help="Also render without streaming mode")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        source, template = make_inputs(folder, args.duration)
+
+        if args.compare:
+            baseline = render(source, template, folder, None)
+            print(f"📊 Default mode:   peak RSS {baseline['peak_mb']:.0f} MB (ffmpeg {baseline['children_mb']:.0f} MB)")
+
+        streamed = render(source, template, folder, args.ceiling)
+        print(f"📊 Streaming mode: peak RSS {streamed['peak_mb']:.0f} MB (ffmpeg {streamed['children_mb']:.0f} MB), "
+              f"ceiling {args.ceiling} MB")
+
+    if not streamed["ok"]:
+        print("❌ Streaming render failed")
+        sys.exit(1)
+    if streamed["peak_mb"] > args.ceiling:
+        print("❌ Peak RSS over the ceiling")
+        sys.exit(1)
+    print("✅ Peak RSS within ceiling")
+
+
+if __name__ == "__main__":
+    main()
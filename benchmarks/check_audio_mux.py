@@ -0,0 +1,123 @@
+"""
+Parallel audio render + stream-copy mux check (needs ffmpeg, no assets).
+A synthetic clip flashes white on the frames where its audio plays a tone
+burst. It is exported with the audio mixed first (old path) and with the audio
+rendered on a worker thread during the video encode; both the master and a
+480p proxy of the parallel export are decoded and must have the expected
+duration and every burst within one frame of its flash. Exits 1 on a failed
+check.
+
+Usage: python benchmarks/check_audio_mux.py [--seconds 6] [--tracks 4]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import numpy as np
+from video_export import OutputSpec, export_video, get_ffmpeg_binary
+
+FPS = 30
+RATE = 44100
+SIZE = (720, 1280)
+
+
+def check(condition, message):
+    if not condition:
+        print(f"❌ {message}")
+        sys.exit(1)
+    print(f"✅ {message}")
+
+
+def build(seconds, tracks):
+    """Flash frames + matching tone bursts, mixed with `tracks` quiet beds like template/voiceover/music"""
+    from moviepy.editor import VideoClip, AudioClip, CompositeAudioClip
+    flashes = np.arange(1.0, seconds - 0.5, 1.3)
+    flash_frames = {int(round(f * FPS)) for f in flashes}
+    dark = np.full((SIZE[1], SIZE[0], 3), 16, dtype=np.uint8)
+    white = np.full_like(dark, 235)
+    video = VideoClip(lambda t: white if int(round(t * FPS)) in flash_frames else dark, duration=seconds)
+
+    def bursts(t):
+        t = np.asarray(t, dtype=float)
+        on = np.zeros(t.shape, dtype=bool)
+        for f in flashes:
+            on |= (t >= f) & (t < f + 0.1)
+        s = 0.6 * np.sin(2 * np.pi * 880 * t) * on
+        return np.stack([s, s], axis=-1)
+
+    def bed(freq):
+        return lambda t: np.stack([0.02 * np.sin(2 * np.pi * freq * np.asarray(t, dtype=float))] * 2, axis=-1)
+
+    layers = [AudioClip(bursts, duration=seconds, fps=RATE)]
+    layers += [AudioClip(bed(110 * (i + 1)), duration=seconds, fps=RATE).volumex(0.3) for i in range(tracks - 1)]
+    return video.set_audio(CompositeAudioClip(layers)), flashes
+
+
+def decode(path):
+    ffmpeg = get_ffmpeg_binary()
+    video = subprocess.run([ffmpeg, "-v", "error", "-i", path, "-vf", "scale=16:16", "-f", "rawvideo",
+                            "-pix_fmt", "gray", "-"], capture_output=True, check=True).stdout
+    audio = subprocess.run([ffmpeg, "-v", "error", "-i", path, "-ac", "1", "-ar", str(RATE), "-f", "s16le", "-"],
+                           capture_output=True, check=True).stdout
+    frames = np.frombuffer(video, dtype=np.uint8).reshape(-1, 256).mean(axis=1)
+    samples = np.abs(np.frombuffer(audio, dtype=np.int16).astype(np.float32)) / 32768
+    return frames, samples
+
+
+def onsets(levels, threshold, step):
+    above = levels > threshold
+    rising = np.flatnonzero(above[1:] & ~above[:-1]) + 1
+    return rising * step
+
+
+def check_output(path, seconds, flashes, label):
+    frames, samples = decode(path)
+    video_s, audio_s = len(frames) / FPS, len(samples) / RATE
+    check(abs(video_s - seconds) <= 1.0 / FPS and abs(audio_s - video_s) <= 0.05,
+          f"{label}: duration video {video_s:.3f}s, audio {audio_s:.3f}s (expected {seconds}s)")
+    flash_t = onsets(frames, 128, 1.0 / FPS)
+    window = RATE // 1000  # 1 ms envelope
+    envelope = samples[:len(samples) // window * window].reshape(-1, window).max(axis=1)
+    burst_t = onsets(envelope, 0.3, window / RATE)
+    check(len(flash_t) == len(burst_t) == len(flashes), f"{label}: {len(flashes)} flashes and bursts found")
+    drift = np.abs(flash_t - burst_t)
+    check(drift.max() <= 1.0 / FPS, f"{label}: audio in sync (worst offset {drift.max() * 1000:.1f} ms)")
+
+
+def export(folder, seconds, tracks, parallel):
+    clip, flashes = build(seconds, tracks)
+    master = os.path.join(folder, f"{'parallel' if parallel else 'serial'}.mp4")
+    outputs = [OutputSpec(master, preset="ultrafast"), OutputSpec.rendition(master, "480p", preset="ultrafast")]
+    start = time.perf_counter()
+    export_video(clip, outputs, fps=FPS, threads=2, temp_folder=folder, parallel_audio=parallel,
+                 audio_buffersize=RATE)
+    return time.perf_counter() - start, outputs, flashes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=6)
+    parser.add_argument("--tracks", type=int, default=4, help="Audio layers in the mix")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        serial_s, _, _ = export(folder, args.seconds, args.tracks, parallel=False)
+        parallel_s, outputs, flashes = export(folder, args.seconds, args.tracks, parallel=True)
+        print(f"⏱️ {args.seconds:g}s export, master + 480p, {args.tracks}-layer mix: "
+              f"audio first {serial_s:.2f}s, parallel audio + mux {parallel_s:.2f}s "
+              f"({serial_s / parallel_s:.2f}x on {os.cpu_count()} core(s))")
+        for spec in outputs:
+            check_output(spec.path, args.seconds, flashes, os.path.basename(spec.path))
+        leftovers = [f for f in os.listdir(folder) if "_audio" in f or "_video" in f]
+        check(not leftovers, "temporary audio/video tracks are removed")
+    print("✅ Audio mux checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Best-window check (needs ffmpeg, no network).
+Builds a long synthetic source that is static and quiet except for one
+30 s burst of motion and louder audio, then checks that the analyser puts
+the chosen window over the burst, how long the analysis takes (video and
+audio decodes separately, the sparse audio decode against a full one), that
+the cached curves are reused, that a file with keyframes too sparse to
+sample falls back to a 2 fps decode, that a video-only source is scored on
+motion alone and that a rejected -fps_mode falls back to -vsync.
+Exits 1 on a failed check.
+
+Usage: python benchmarks/check_clip_window.py [--minutes 10] [--window 58]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import clip_window
+from clip_window import SourceWindows, activity, best_window, _decode_video, _decode_audio, _frames
+from video_export import get_ffmpeg_binary
+
+
+def check(condition, message):
+    if not condition:
+        print(f"❌ {message}")
+        sys.exit(1)
+    print(f"✅ {message}")
+
+
+def make_source(path, seconds, burst, gop=60, audio=True):
+    """Grey 360p video with quiet noise; a moving test pattern and louder noise during `burst`"""
+    start, end = burst
+    if not audio:
+        subprocess.run([
+            get_ffmpeg_binary(), "-y", "-v", "error",
+            "-f", "lavfi", "-i", f"color=gray:s=640x360:r=30:d={seconds}",
+            "-f", "lavfi", "-i", f"testsrc2=s=320x180:r=30:d={seconds}",
+            "-filter_complex", f"[0][1]overlay=x=160:y=90:enable='between(t,{start},{end})'",
+            "-c:v", "libx264", "-preset", "ultrafast", "-g", str(gop), path], check=True)
+        return
+    subprocess.run([
+        get_ffmpeg_binary(), "-y", "-v", "error",
+        "-f", "lavfi", "-i", f"color=gray:s=640x360:r=30:d={seconds}",
+        "-f", "lavfi", "-i", f"testsrc2=s=320x180:r=30:d={seconds}",
+        "-f", "lavfi", "-i", f"anoisesrc=d={seconds}:a=0.02:r=44100",
+        "-filter_complex",
+        f"[0][1]overlay=x=160:y=90:enable='between(t,{start},{end})'[v];"
+        f"[2]volume='if(between(t,{start},{end}),10,1)':eval=frame[a]",
+        "-map", "[v]", "-map", "[a]", "-c:v", "libx264", "-preset", "ultrafast", "-g", str(gop),
+        "-c:a", "aac", path], check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--minutes", type=float, default=10)
+    parser.add_argument("--window", type=float, default=58)
+    args = parser.parse_args()
+    seconds = int(args.minutes * 60)
+    burst = (seconds // 2, seconds // 2 + 30)
+
+    with tempfile.TemporaryDirectory() as folder:
+        source = os.path.join(folder, "long.mp4")
+        print(f"🎞️ Building a {args.minutes:g} min source (burst at {burst[0]}-{burst[1]}s)...")
+        make_source(source, seconds, burst)
+
+        start = time.perf_counter()
+        frames, _ = _frames(*_decode_video(source, keyframes_only=True))
+        video_s = time.perf_counter() - start
+        start = time.perf_counter()
+        _decode_audio(source).communicate()
+        audio_s = time.perf_counter() - start
+        start = time.perf_counter()
+        _decode_audio(source, keep=1).communicate()
+        full_audio_s = time.perf_counter() - start
+        print(f"⏱️ Keyframe video decode: {video_s * 1000:.0f} ms ({len(frames)} frames), "
+              f"audio decode: {audio_s * 1000:.0f} ms (every packet: {full_audio_s * 1000:.0f} ms)")
+
+        windows = SourceWindows(os.path.join(folder, "source_windows.json"))
+        start = time.perf_counter()
+        begin, end = windows.window(source, args.window, seconds)
+        analysis_s = time.perf_counter() - start
+        print(f"⏱️ Analysis of {args.minutes:g} min: {analysis_s * 1000:.0f} ms on {os.cpu_count()} core(s)")
+        check(begin <= burst[0] and end >= burst[1] if args.window >= 30 else burst[0] <= begin < burst[1],
+              f"window {begin:.0f}-{end:.0f}s covers the burst")
+        check(analysis_s < video_s + audio_s + 0.25, "analysis costs no more than the two decimated decodes")
+
+        start = time.perf_counter()
+        again = SourceWindows(os.path.join(folder, "source_windows.json")).window(source, 20, seconds)
+        cached_s = time.perf_counter() - start
+        check(burst[0] <= again[0] < burst[1] and cached_s < 0.05,
+              f"cached curves reused for another length ({cached_s * 1000:.1f} ms)")
+        check(windows.window(source, seconds, seconds) == (0, seconds), "a source no longer than the cut is left alone")
+
+        # One keyframe only: too sparse to sample, so every frame is decoded at 2 fps instead
+        sparse = os.path.join(folder, "sparse.mp4")
+        make_source(sparse, 90, (40, 60), gop=10000)
+        motion, audio = activity(sparse)
+        check(38 <= best_window(motion, audio, 20) <= 42, "sparse-keyframe source falls back to a 2 fps decode")
+
+        # Template-mode downloads have no audio stream: motion alone picks the window
+        silent = os.path.join(folder, "silent.mp4")
+        make_source(silent, 90, (40, 60), audio=False)
+        motion, audio = activity(silent)
+        check(audio is None and 38 <= best_window(motion, audio, 20) <= 42, "video-only source is scored on motion alone")
+
+        # ffmpeg < 5.1 rejects -fps_mode: the sampler retries with -vsync passthrough
+        clip_window._passthrough = ["-fps_mode", "not-a-mode"]
+        motion, audio = activity(sparse)
+        check(clip_window._passthrough[0] == "-vsync" and 38 <= best_window(motion, audio, 20) <= 42,
+              "a rejected -fps_mode falls back to -vsync passthrough")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Fake-clock check for the factory daemon (no rendering, no network).
+Drives ShortsDaemon.tick() with a manual clock and asserts timer firing and
+missed-run skipping, drop-directory intake, stage timings and queue depth in
+/health, the HTTP job endpoint (a body that isn't a JSON object, a job
+without a source or url, or whose "output" is a path, not a file name, is
+rejected on intake with a 400), and graceful shutdown spilling queued jobs
+back to the inbox. Exits 1 on the first failed check.
+
+Usage: python benchmarks/check_daemon.py
+"""
+
+import os
+import sys
+import json
+import socket
+import tempfile
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "YouTube_Shorts_Factory"))
+from shorts_daemon import ShortsDaemon, StageTimer, WarmState
+from workflow import check_render_job
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+def check(condition, message):
+    if not condition:
+        print(f"❌ {message}")
+        sys.exit(1)
+    print(f"✅ {message}")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main():
+    clock = FakeClock(1000.0)
+    calls = []
+
+    def auto(job, warm):
+        with warm.timer.stage("download"):
+            clock.advance(3)
+        with warm.timer.stage("render"):
+            clock.advance(20)
+        calls.append(("auto", job.get("origin")))
+        return "video-id"
+
+    def video(job, warm):
+        calls.append(("video", job.get("source")))
+        if job.get("fail"):
+            raise SystemExit(1)
+        return job["source"]
+
+    with tempfile.TemporaryDirectory() as inbox:
+        warm = WarmState()
+        warm.timer = StageTimer(clock)
+        daemon = ShortsDaemon({"auto": auto, "video": video}, interval=100, warm=warm,
+                              inbox=inbox, clock=clock, validators={"video": check_render_job})
+
+        # Timer
+        daemon.tick()
+        check(calls == [("auto", "timer")], "timer fires on start")
+        clock.advance(50)
+        check(daemon.tick() is None, "nothing runs before the interval elapses")
+        clock.advance(30)  # 1000 + 23 + 50 + 30 = 1103 >= 1100
+        daemon.tick()
+        check(len(calls) == 2, "timer fires again after the interval")
+        clock.advance(1000)
+        daemon.tick()
+        check(daemon.tick() is None and len(calls) == 3, "missed runs are skipped, not replayed")
+        check(daemon.next_run > clock(), "next run is scheduled in the future")
+
+        # Drop directory
+        with open(os.path.join(inbox, "a.json"), "w") as f:
+            json.dump({"type": "video", "source": "a.mp4"}, f)
+        with open(os.path.join(inbox, "b.json"), "w") as f:
+            f.write("{not json")
+        daemon.tick()
+        check(calls[-1] == ("video", "a.mp4"), "dropped job file is run")
+        check(os.path.exists(os.path.join(inbox, "b.json.rejected")), "bad job file is set aside")
+        check(not os.path.exists(os.path.join(inbox, "a.json")), "consumed job file is removed")
+
+        # Failure accounting via the CLI exit path
+        daemon.submit({"type": "video", "source": "c.mp4", "fail": True})
+        last = daemon.tick()
+        check(not last["ok"] and last["error"] == "exit 1", "SystemExit in a handler is recorded, not fatal")
+
+        # Health
+        daemon.submit({"type": "video", "source": "d.mp4"})
+        health = daemon.health()
+        check(health["queue_depth"] == 1, "health reports queue depth")
+        check(health["failures"] == 1 and health["runs"] == 5, "health counts runs and failures")
+        daemon.tick()
+        clock.advance(100)
+        daemon.tick()  # timer fires the auto job, which records stage timings
+        stages = daemon.health()["last_run"]["stages"]
+        check(stages == {"download": 3.0, "render": 20.0}, "health reports the last run's stage timings")
+
+        # HTTP endpoint + graceful shutdown
+        daemon.port = free_port()
+        daemon._start_http()
+        base = f"http://127.0.0.1:{daemon.port}"
+        request = urllib.request.Request(f"{base}/jobs", data=json.dumps({"type": "video", "source": "e.mp4"}).encode(),
+                                         method="POST")
+        with urllib.request.urlopen(request) as response:
+            check(response.status == 202, "POST /jobs queues a job")
+        with urllib.request.urlopen(f"{base}/health") as response:
+            check(json.load(response)["queue_depth"] == 1, "GET /health sees the posted job")
+        try:
+            urllib.request.urlopen(urllib.request.Request(f"{base}/jobs", data=b'{"type": "nope"}', method="POST"))
+            check(False, "unknown job type is rejected")
+        except urllib.error.HTTPError as e:
+            check(e.code == 400, "unknown job type is rejected")
+        for body in (b"[]", b'"video"', b"3", b'{"type": "video"}'):
+            try:
+                urllib.request.urlopen(urllib.request.Request(f"{base}/jobs", data=body, method="POST"))
+                check(False, f"body {body!r} is rejected")
+            except urllib.error.HTTPError as e:
+                check(e.code == 400, f"body {body!r} is rejected")
+        for output in ("../escape.mp4", "/tmp/escape.mp4", "sub/escape.mp4", ".."):
+            try:
+                urllib.request.urlopen(urllib.request.Request(
+                    f"{base}/jobs", data=json.dumps({"type": "video", "source": "x.mp4", "output": output}).encode(),
+                    method="POST"))
+                check(False, f"output {output!r} is rejected")
+            except urllib.error.HTTPError as e:
+                check(e.code == 400, f"output {output!r} is rejected")
+        with open(os.path.join(inbox, "f.json"), "w") as f:
+            json.dump({"type": "video", "source": "f.mp4", "output": "../f.mp4"}, f)
+        daemon.poll_inbox()
+        check(os.path.exists(os.path.join(inbox, "f.json.rejected")), "dropped job with a path output is set aside")
+        request = urllib.request.Request(f"{base}/jobs", method="POST", data=json.dumps(
+            {"type": "video", "source": "g.mp4", "output": "g.mp4"}).encode())
+        with urllib.request.urlopen(request) as response:
+            check(response.status == 202 and daemon.jobs.qsize() == 2, "a plain output file name is accepted")
+
+        daemon.shutdown()
+        spilled = [f for f in os.listdir(inbox) if f.startswith("requeued_")]
+        check(len(spilled) == 2, "queued jobs are written back to the inbox on shutdown")
+
+        restarted = ShortsDaemon({"auto": auto, "video": video}, interval=100, inbox=inbox, clock=clock,
+                                 run_on_start=False)
+        restarted.tick()
+        check(calls[-1] == ("video", "e.mp4"), "restarted daemon picks the spilled job up")
+
+    print("✅ Daemon checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Checks for the persistent job queue (no rendering).
+Several worker processes drain one SQLite file and every job must run exactly
+once; a fake clock covers lease expiry / takeover, retry backoff, attempt
+limits, priorities and template affinity. Exits 1 on the first failed check.
+
+Usage: python benchmarks/check_job_queue.py [--jobs 200] [--workers 4]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from job_queue import JobQueue, JobDropped, read_jobs_file, run_workers, run_worker
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def check(condition, message):
+    if not condition:
+        print(f"❌ {message}")
+        sys.exit(1)
+    print(f"✅ {message}")
+
+
+def record_job(payload):
+    """Worker handler: append the job number to a shared log (O_APPEND writes are atomic)"""
+    with open(payload["log"], "a") as f:
+        f.write(f"{payload['n']} {os.getpid()}\n")
+    time.sleep(0.002)
+    return f"ok {payload['n']}"
+
+
+# Stands in for a bot's Config: main() changes it, spawned workers start from the defaults
+SETTINGS = {"profile": "final"}
+
+
+def apply_settings(values):
+    SETTINGS.update(values)
+
+
+def settings_job(payload):
+    return SETTINGS["profile"]
+
+
+def check_worker_settings(folder, workers):
+    db = os.path.join(folder, "settings.db")
+    queue = JobQueue(db)
+    for n in range(workers * 2):
+        queue.enqueue("render", {"n": n})
+    queue.close()
+    SETTINGS["profile"] = "preview"
+    try:
+        run_workers(db, {"render": settings_job}, workers, initializer=apply_settings, initargs=(dict(SETTINGS),),
+                    poll_seconds=0.05)
+    finally:
+        SETTINGS["profile"] = "final"
+    queue = JobQueue(db)
+    results = {job["result"] for job in queue.jobs(limit=workers * 2)}
+    queue.close()
+    check(results == {"preview"}, f"spawned workers see the settings main() changed ({sorted(results)})")
+
+
+def check_concurrent_workers(folder, num_jobs, workers):
+    db = os.path.join(folder, "concurrent.db")
+    log = os.path.join(folder, "runs.log")
+    queue = JobQueue(db)
+    for n in range(num_jobs):
+        queue.enqueue("render", {"n": n, "log": log})
+    queue.close()
+
+    start = time.perf_counter()
+    stats = run_workers(db, {"render": record_job}, workers, poll_seconds=0.05)
+    elapsed = time.perf_counter() - start
+
+    with open(log) as f:
+        runs = [line.split() for line in f]
+    numbers = sorted(int(n) for n, _ in runs)
+    pids = {pid for _, pid in runs}
+    print(f"⏱️ {num_jobs} jobs on {workers} worker process(es) in {elapsed:.2f}s ({len(pids)} pids took jobs)")
+    check(numbers == list(range(num_jobs)), "every job ran exactly once across worker processes")
+    check(sum(s["done"] for s in stats) == num_jobs, "worker stats add up")
+    queue = JobQueue(db)
+    check(queue.counts()["done"] == num_jobs, "all jobs are marked done")
+    queue.close()
+
+
+def check_leases_and_retries(folder):
+    clock = FakeClock()
+    queue = JobQueue(os.path.join(folder, "leases.db"), clock=clock, retry_delay=10)
+
+    low = queue.enqueue("render", {"n": "low"})
+    high = queue.enqueue("render", {"n": "high"}, priority=5)
+    job = queue.claim("w1", lease_seconds=60)
+    check(job["id"] == high, "higher priority is claimed first")
+    check(queue.claim("w2", lease_seconds=60)["id"] == low, "then the remaining job")
+    check(queue.claim("w3") is None, "leased jobs are not handed out twice")
+
+    clock.now += 61
+    taken = queue.claim("w3", lease_seconds=60)
+    check(taken["id"] == high and taken["attempts"] == 2, "expired lease is taken over by another worker")
+    check(not queue.complete(high, "w1"), "the old owner can no longer complete it")
+    check(queue.heartbeat(high, "w3"), "the new owner can renew the lease")
+    check(queue.complete(high, "w3", "done"), "the new owner completes it")
+
+    state = queue.fail(low, "w2", "boom")
+    check(state == "queued", "a failed attempt is requeued")
+    check(queue.claim("w2") is None, "retry waits for its backoff")
+    clock.now += 10
+    retry = queue.claim("w2")
+    check(retry["id"] == low and retry["attempts"] == 2, "retry runs after the backoff")
+    queue.fail(low, "w2", "boom")
+    clock.now += 20
+    queue.claim("w2")
+    check(queue.fail(low, "w2", "boom") == "failed", "job fails for good after max_attempts")
+    check(queue.counts() == {"queued": 0, "running": 0, "done": 1, "failed": 1}, "counts by state")
+    check(queue.retry_failed() == 1 and queue.counts()["queued"] == 1, "failed jobs can be retried")
+    dropped = queue.enqueue("render", {"n": "dropped"}, priority=9)
+    queue.claim("w2")
+    check(queue.fail(dropped, "w2", "over budget", retry=False) == "failed", "a job can fail without retries")
+
+    a1 = queue.enqueue("render", {"reaction": "a"}, affinity="a")
+    b1 = queue.enqueue("render", {"reaction": "b"}, affinity="b")
+    a2 = queue.enqueue("render", {"reaction": "a"}, affinity="a")
+    queue.claim("w4")  # the retried job
+    check(queue.claim("w4", affinity="b")["id"] == b1, "affinity prefers the worker's current template")
+    check(queue.claim("w4", affinity="a")["id"] == a1, "affinity keeps a template's jobs together")
+    check(queue.claim("w4", affinity="a")["id"] == a2, "...until they run out")
+    queue.close()
+
+
+def drop_job(payload):
+    raise JobDropped("over the render budget")
+
+
+def check_dropped_jobs(folder):
+    db = os.path.join(folder, "dropped.db")
+    queue = JobQueue(db)
+    job_id = queue.enqueue("render", {"n": 1})
+    queue.close()
+    stats = run_worker(db, {"render": drop_job}, poll_seconds=0.01)
+    queue = JobQueue(db)
+    job = [row for row in queue.jobs() if row["id"] == job_id][0]
+    check(stats["failed"] == 1 and stats["retried"] == 0 and job["attempts"] == 1 and job["state"] == "failed",
+          f"a JobDropped handler fails its job without retrying ({job['error']})")
+    queue.close()
+
+
+def check_job_files(folder):
+    urls = os.path.join(folder, "urls.txt")
+    with open(urls, "w") as f:
+        f.write("# comment\nhttps://example.com/a\n\nhttps://example.com/b\n")
+    rows = os.path.join(folder, "jobs.jsonl")
+    with open(rows, "w") as f:
+        f.write('{"source": "x.mp4", "priority": 3, "upload": true}\n{"url": "https://example.com/c", "max_attempts": 1}\n')
+    check([p["url"] for _, p, _ in read_jobs_file(urls)] == ["https://example.com/a", "https://example.com/b"],
+          "URL list is parsed")
+    parsed = read_jobs_file(rows)
+    check(parsed[0] == ("render", {"source": "x.mp4", "upload": True}, {"priority": 3})
+          and parsed[1][2] == {"max_attempts": 1}, "JSONL rows split into payload and queue options")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        check_leases_and_retries(folder)
+        check_job_files(folder)
+        check_dropped_jobs(folder)
+        check_concurrent_workers(folder, args.jobs, args.workers)
+        if args.workers > 1:
+            check_worker_settings(folder, args.workers)
+    print("✅ Job queue checks passed")
+
+
+if __name__ == "__main__":
+    main()
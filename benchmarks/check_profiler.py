@@ -0,0 +1,96 @@
+"""
+Render profiler checks on a synthetic composite (needs ffmpeg, no assets).
+1. Off: no timer is wrapped around any clip, transform or pipe write, and
+   the render time is compared with an on-run.
+2. On: the .prof dump loads with pstats, the collapsed-stack file has
+   "stack count" lines, and the frame report has p50/p95/p99 for every
+   stage of the frame loop. Exits 1 on a failed check.
+
+Usage: python benchmarks/check_profiler.py [--seconds 3]
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import pstats
+import argparse
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import numpy as np
+import render_profiler
+from render_profiler import RenderProfiler, instrument
+from frame_transform import TransformChain
+from video_export import OutputSpec, export_video
+
+STAGES = ("frame", "composite", "fetch:base", "fetch:overlay", "transform:overlay", "pipe_write")
+
+
+def check(condition, message):
+    if not condition:
+        print(f"❌ {message}")
+        sys.exit(1)
+    print(f"✅ {message}")
+
+
+def build(seconds):
+    from moviepy.editor import ColorClip, VideoClip, CompositeVideoClip
+    rng = np.random.default_rng(3)
+    noise = rng.integers(0, 255, (360, 640, 3), dtype=np.uint8)
+    base = ColorClip((540, 960), color=(20, 20, 20), duration=seconds)
+    source = VideoClip(lambda t: np.roll(noise, int(t * 90), axis=1), duration=seconds)
+    chain = TransformChain.for_clip(source).mirror_x().resize((480, 270)).colorx(1.1)
+    overlay = chain.apply(source, "overlay").set_position((30, 300))
+    composite = CompositeVideoClip([base, overlay])
+    untouched = (base.make_frame, overlay.make_frame, composite.make_frame)
+    instrument(composite, {"base": base, "overlay": overlay})
+    return composite, (base, overlay, composite), untouched
+
+
+def render(folder, seconds, tag):
+    composite, clips, untouched = build(seconds)
+    start = time.perf_counter()
+    export_video(composite, [OutputSpec(os.path.join(folder, f"{tag}.mp4"), preset="ultrafast")],
+                 fps=30, audio=False, temp_folder=folder)
+    return time.perf_counter() - start, clips, untouched
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        off_seconds, clips, untouched = render(folder, args.seconds, "off")
+        check(render_profiler.active() is None, "no profiler is active by default")
+        check(all(clip.make_frame is fn for clip, fn in zip(clips, untouched)),
+              "profiling off leaves the clips' frame functions untouched")
+
+        profiles = os.path.join(folder, "profiles")
+        with RenderProfiler(profiles, "check"):
+            on_seconds, _, _ = render(folder, args.seconds, "on")
+        print(f"⏱️ Render {args.seconds:g}s @30fps: off {off_seconds:.2f}s, on {on_seconds:.2f}s "
+              f"({(on_seconds / off_seconds - 1) * 100:+.0f}% with cProfile + sampler + timers)")
+
+        prof = glob.glob(os.path.join(profiles, "check_*.prof"))
+        check(len(prof) == 1 and pstats.Stats(prof[0]).total_calls > 0, "cProfile dump loads with pstats")
+        with open(glob.glob(os.path.join(profiles, "check_*.collapsed"))[0]) as f:
+            lines = f.read().splitlines()
+        check(lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+              and any(line.startswith("MainThread;") for line in lines), "collapsed stacks are flamegraph input")
+        with open(glob.glob(os.path.join(profiles, "check_*_frames.json"))[0]) as f:
+            report = json.load(f)
+        frames = int(args.seconds * 30)
+        check(report["frames"] == frames, f"every frame is timed ({report['frames']}/{frames})")
+        check(all(stage in report["stages"] for stage in STAGES), "report covers fetch, transform, composite and pipe write")
+        stage = report["stages"]["frame"]
+        check(stage["p50_ms"] <= stage["p95_ms"] <= stage["p99_ms"] <= stage["max_ms"]
+              and sum(stage["histogram_ms"].values()) == stage["count"], "percentiles and histogram are consistent")
+    print("✅ Profiler checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Read-ahead decoder checks on synthetic clips (needs ffmpeg, no assets).
+1. Correctness: a lossless clip whose pixels encode the frame number is read
+   through ReadAheadReader and through MoviePy's own reader with the same
+   access pattern (sequential, repeated t, short skips, backward and long
+   seeks, past the end) and must return the same frame every time; closing
+   must stop the decode thread. Exits 1 on a failed check.
+2. Speed: a 1080x1920 clip is read sequentially with simulated compositing
+   work per frame, with and without read-ahead.
+
+Usage: python benchmarks/check_read_ahead.py [--seconds 4] [--work-ms 25]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+import warnings
+import threading
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import numpy as np
+from read_ahead import ReadAheadReader, read_ahead
+from video_export import get_ffmpeg_binary
+
+FPS = 30
+
+
+def check(condition, message):
+    if not condition:
+        print(f"❌ {message}")
+        sys.exit(1)
+    print(f"✅ {message}")
+
+
+def make_numbered_clip(path, frames):
+    """Lossless clip: frame i has red = i % 256, green = i // 256 everywhere"""
+    cmd = [get_ffmpeg_binary(), "-y", "-v", "error", "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", "64x48",
+           "-r", str(FPS), "-i", "-", "-c:v", "ffv1", "-pix_fmt", "bgr0", path]
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    for i in range(frames):
+        frame[..., 0], frame[..., 1] = i % 256, i // 256
+        proc.stdin.write(frame.tobytes())
+    proc.stdin.close()
+    proc.wait()
+
+
+def number(frame):
+    return int(frame[0, 0, 0]) + 256 * int(frame[0, 0, 1])
+
+
+def read_ahead_threads():
+    return sum(1 for thread in threading.enumerate() if thread.name == "read-ahead")
+
+
+def check_correctness(folder):
+    from moviepy.video.io.ffmpeg_reader import FFMPEG_VideoReader
+    path = os.path.join(folder, "numbered.mkv")
+    total = 400
+    make_numbered_clip(path, total)
+
+    sequential = [i / FPS for i in range(total)]
+    pattern = (sequential[:50] + [50 / FPS] * 3 + [60 / FPS, 75 / FPS, 76 / FPS]  # repeat + short skips
+               + [10 / FPS, 11 / FPS]                                            # backwards
+               + [300 / FPS, 301 / FPS]                                          # more than 100 ahead
+               + sequential[350:] + [(total + 5) / FPS, (total + 20) / FPS]      # run past the end
+               + [0, 1 / FPS])                                                   # back to the start
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        plain = FFMPEG_VideoReader(path)
+        expected = [number(plain.get_frame(t)) for t in pattern]
+        plain.close()
+        wrapped = ReadAheadReader(FFMPEG_VideoReader(path), depth=4)
+        got = [number(wrapped.get_frame(t)) for t in pattern]
+
+    check(expected[:50] == list(range(50)), "reference reader returns numbered frames")
+    mismatches = [(t, e, g) for t, e, g in zip(pattern, expected, got) if e != g]
+    check(not mismatches, f"same frames as MoviePy's reader over {len(pattern)} reads"
+          + (f" (t, expected, got: {mismatches[:3]})" if mismatches else ""))
+    check(got[-4:-2] == [total - 1, total - 1], "reads past the end repeat the last frame")
+    check(read_ahead_threads() == 1, "one decode thread per reader")
+    wrapped.close()
+    check(read_ahead_threads() == 0, "close() stops the decode thread")
+    check(wrapped.fps == FPS and wrapped.size == [64, 48], "reader attributes are passed through")
+
+    from moviepy.editor import VideoFileClip
+    clip = read_ahead(VideoFileClip(path), depth=3).subclip(1, 2)
+    check(number(clip.get_frame(0)) == FPS and number(clip.get_frame(0.5)) == FPS + 15,
+          "works through subclip() on a VideoFileClip")
+    clip.close()
+
+
+def check_speed(folder, seconds, work_ms):
+    from moviepy.video.io.ffmpeg_reader import FFMPEG_VideoReader
+    path = os.path.join(folder, "tall.mp4")
+    subprocess.run([get_ffmpeg_binary(), "-y", "-v", "error", "-f", "lavfi",
+                    "-i", f"testsrc2=size=1080x1920:rate={FPS}:duration={seconds}",
+                    "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", path], check=True)
+    frames = int(seconds * FPS)
+
+    def run(reader):
+        stall = 0.0
+        start = time.perf_counter()
+        for i in range(frames):
+            fetch = time.perf_counter()
+            reader.get_frame(i / FPS)
+            stall += time.perf_counter() - fetch
+            deadline = time.perf_counter() + work_ms / 1000
+            while time.perf_counter() < deadline:  # compositor busy (GIL released like numpy work)
+                time.sleep(0.001)
+        reader.close()
+        return time.perf_counter() - start, stall
+
+    plain_s, plain_stall = run(FFMPEG_VideoReader(path))
+    ahead_s, ahead_stall = run(ReadAheadReader(FFMPEG_VideoReader(path), depth=4))
+    print(f"⏱️ {frames} frames 1080x1920 with {work_ms} ms of work each:")
+    print(f"   synchronous decode: {plain_s:.2f}s total, {plain_stall:.2f}s waiting for frames")
+    print(f"   read-ahead (4)    : {ahead_s:.2f}s total, {ahead_stall:.2f}s waiting for frames "
+          f"({plain_s / ahead_s:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=4)
+    parser.add_argument("--work-ms", type=float, default=25)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as folder:
+        check_correctness(folder)
+        check_speed(folder, args.seconds, args.work_ms)
+    print("✅ Read-ahead checks passed")
+
+
+if __name__ == "__main__":
+    main()
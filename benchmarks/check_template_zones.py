@@ -0,0 +1,83 @@
+"""
+Content-zone detection check (needs ffmpeg).
+Synthetic 1080x1920 templates (moving picture on top, black placement area
+elsewhere) must yield their black rectangle within 1% of the canvas, a
+template without a black area must fall back, and a second lookup must come
+from the index without decoding anything. Exits 1 on a failed check.
+
+Usage: python benchmarks/check_template_zones.py
+"""
+
+import os
+import sys
+import time
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import template_zones
+from template_zones import TemplateZones
+from render_layout import Zone
+from video_export import get_ffmpeg_binary
+
+# name: black box (x, y, w, h) on a 1080x1920 template, None = no black area
+TEMPLATES = {
+    "bottom_band": (0, 850, 1080, 1070),
+    "low_band": (0, 1100, 1080, 820),
+    "inset_box": (90, 700, 900, 1000),
+    "no_black": None,
+}
+TOLERANCE = 0.01
+
+
+def check(condition, message):
+    if not condition:
+        print(f"❌ {message}")
+        sys.exit(1)
+    print(f"✅ {message}")
+
+
+def make_template(path, box):
+    vf = "format=yuv420p"
+    if box:
+        vf = f"drawbox=x={box[0]}:y={box[1]}:w={box[2]}:h={box[3]}:color=black:t=fill," + vf
+    subprocess.run([get_ffmpeg_binary(), "-y", "-v", "error", "-f", "lavfi",
+                    "-i", "testsrc2=size=1080x1920:rate=30", "-t", "6", "-vf", vf,
+                    "-c:v", "libx264", "-preset", "ultrafast", "-crf", "30", path], check=True)
+
+
+def main():
+    fallback = Zone(0, 0.44, 1, 0.56)
+    with tempfile.TemporaryDirectory() as folder:
+        index_path = os.path.join(folder, "template_index.json")
+        zones = TemplateZones(index_path)
+        for name, box in TEMPLATES.items():
+            path = os.path.join(folder, f"{name}.mp4")
+            make_template(path, box)
+            start = time.perf_counter()
+            zone = zones.zone(path, fallback)
+            elapsed = (time.perf_counter() - start) * 1000
+            if box is None:
+                check(zone is fallback, f"{name}: no black area -> fallback zone ({elapsed:.0f} ms)")
+                continue
+            expected = Zone.from_pixels(*box, 1080, 1920)
+            error = max(abs(a - b) for a, b in zip((zone.x, zone.y, zone.w, zone.h),
+                                                    (expected.x, expected.y, expected.w, expected.h)))
+            print(f"📐 {name}: {zone.to_pixels(1080, 1920)} vs {box}")
+            check(error <= TOLERANCE, f"{name}: zone within {error * 100:.2f}% of the canvas ({elapsed:.0f} ms)")
+
+        # Fresh instance, detection disabled: everything must come from the index file
+        def no_decode(*args, **kwargs):
+            raise AssertionError("template decoded again")
+        template_zones.detect_zone = no_decode
+        cached = TemplateZones(index_path)
+        start = time.perf_counter()
+        for name in TEMPLATES:
+            cached.zone(os.path.join(folder, f"{name}.mp4"), fallback)
+        check(True, f"cached lookups read the index only "
+                    f"({(time.perf_counter() - start) * 1e6 / len(TEMPLATES):.0f} us per template)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Streaming voiceover check (needs ffmpeg, no network).
+A local stand-in for edge_tts.Communicate streams a pre-encoded MP3 in small
+chunks at a fixed "network" rate. The streamed voiceover must decode to the
+same PCM as the file round trip (save MP3, decode
+the file as AudioFileClip does), the first
+samples must be readable long before synthesis ends, and a short exported
+with the voiceover in its mix must carry it at the right time.
+Exits 1 on a failed check.
+
+Usage: python benchmarks/check_tts_stream.py [--seconds 6] [--chunk-ms 40]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import numpy as np
+from tts_stream import VoiceoverStream, SAMPLE_RATE
+from video_export import OutputSpec, export_video, get_ffmpeg_binary
+
+
+class FakeCommunicate:
+    """edge_tts.Communicate stand-in: audio chunks + word boundaries, paced like a network stream"""
+
+    def __init__(self, mp3, chunk_bytes, delay):
+        self.mp3 = mp3
+        self.chunk_bytes = chunk_bytes
+        self.delay = delay
+
+    def __call__(self, text, voice):
+        return self
+
+    async def stream(self):
+        for offset in range(0, len(self.mp3), self.chunk_bytes):
+            await asyncio.sleep(self.delay)
+            yield {"type": "WordBoundary", "offset": offset, "text": "word"}
+            yield {"type": "audio", "data": self.mp3[offset:offset + self.chunk_bytes]}
+
+
+def check(condition, message):
+    if not condition:
+        print(f"❌ {message}")
+        sys.exit(1)
+    print(f"✅ {message}")
+
+
+def make_speech_mp3(path, seconds):
+    """Speech-like test signal: 220 Hz tone gated on/off every 0.25 s"""
+    subprocess.run([get_ffmpeg_binary(), "-y", "-v", "error", "-f", "lavfi",
+                    "-i", f"sine=frequency=220:sample_rate=24000:duration={seconds}",
+                    "-af", "volume='if(lt(mod(t,0.5),0.25),1,0)':eval=frame",
+                    "-c:a", "libmp3lame", "-b:a", "48k", path], check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=6)
+    parser.add_argument("--chunk-ms", type=int, default=40, help="Delay between streamed chunks")
+    args = parser.parse_args()
+
+    from moviepy.editor import ColorClip, CompositeAudioClip
+    with tempfile.TemporaryDirectory() as folder:
+        mp3_path = os.path.join(folder, "voiceover.mp3")
+        make_speech_mp3(mp3_path, args.seconds)
+        with open(mp3_path, "rb") as f:
+            mp3 = f.read()
+        # ~ 48 kbit/s: 6 KB per second of speech, sent in 1/4 s chunks
+        fake = FakeCommunicate(mp3, 1500, args.chunk_ms / 1000)
+
+        start = time.perf_counter()
+        stream = VoiceoverStream("hello", "en-IN-NeerjaNeural", communicate=fake).start()
+        stream.samples_at(np.array([0.0]))
+        first = time.perf_counter() - start
+        duration = stream.wait()
+        total = time.perf_counter() - start
+        print(f"⏱️ First samples after {first * 1000:.0f} ms, synthesis finished after {total * 1000:.0f} ms")
+        check(first < total / 4, "voiceover readable long before synthesis finishes")
+        check(abs(duration - args.seconds) < 0.1, f"streamed voiceover is {duration:.2f}s long")
+
+        t = np.arange(int(args.seconds * SAMPLE_RATE) - 2000) / SAMPLE_RATE
+        streamed = stream.samples_at(t)
+        raw = subprocess.run([get_ffmpeg_binary(), "-v", "error", "-i", mp3_path, "-f", "s16le", "-ac", "2",
+                              "-ar", str(SAMPLE_RATE), "-"], capture_output=True, check=True).stdout
+        reference = np.frombuffer(raw, dtype=np.int16).reshape(-1, 2)[:len(t)].astype(np.float32) / 32768
+        error = np.abs(streamed - reference).max()
+        check(error < 1e-3, f"same PCM as the MP3 file round trip (max difference {error:.5f})")
+
+        # End to end: the voiceover clip in a CompositeAudioClip, exported with the parallel audio path
+        output = os.path.join(folder, "short.mp4")
+        seconds = min(args.seconds, 4)
+        video = ColorClip((360, 640), color=(0, 0, 0), duration=seconds)
+        stream = VoiceoverStream("hello", "en-IN-NeerjaNeural", communicate=fake).start()
+        video = video.set_audio(CompositeAudioClip([stream.clip(seconds)]))
+        export_video(video, [OutputSpec(output, preset="ultrafast")], fps=30, temp_folder=folder)
+        raw = subprocess.run([get_ffmpeg_binary(), "-v", "error", "-i", output, "-f", "s16le", "-ac", "1",
+                              "-ar", "8000", "-"], capture_output=True, check=True).stdout
+        pcm = np.abs(np.frombuffer(raw, dtype=np.int16).astype(np.float32) / 32768)
+        gate = pcm[:len(pcm) // 2000 * 2000].reshape(-1, 2000).mean(axis=1)  # 0.25 s windows
+        expected = np.tile([1, 0], len(gate))[:len(gate)]
+        check(len(gate) >= seconds * 4 - 1 and np.all((gate > 0.02) == expected.astype(bool)),
+              "exported short carries the voiceover on the right 0.25 s windows")
+
+
+if __name__ == "__main__":
+    main()
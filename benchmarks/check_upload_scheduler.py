@@ -0,0 +1,156 @@
+"""
+Checks for the quota-aware upload scheduler (no network).
+A local stand-in for the YouTube API keeps its own quota ledger and refuses
+inserts once it is used up; a fake clock walks across the midnight Pacific
+reset. Asserts the batch planning numbers, holding and draining, quota
+refusals from other clients, retries of failed uploads, concurrent drains,
+reclaiming an upload whose process died mid-send, and persistence of the
+bucket. Exits 1 on the first failed check.
+
+Usage: python benchmarks/check_upload_scheduler.py
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from upload_scheduler import UploadScheduler, QuotaExceeded, COSTS, RETRY_SECONDS, SENDING_SECONDS
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class FakeYouTube:
+    """Stand-in API: charges videos.insert per call against its own daily quota"""
+
+    def __init__(self, clock, bucket_day, quota=10000):
+        self.clock = clock
+        self.bucket_day = bucket_day
+        self.quota = quota
+        self.used = {}
+        self.videos = []
+        self.fail_next = 0
+
+    def upload(self, path, title, description, tags):
+        day = self.bucket_day(self.clock())
+        if self.used.get(day, 0) + COSTS["videos.insert"] > self.quota:
+            raise QuotaExceeded("quotaExceeded")
+        self.used[day] = self.used.get(day, 0) + COSTS["videos.insert"]
+        if self.fail_next:
+            self.fail_next -= 1
+            return None
+        self.videos.append(title)
+        return f"vid{len(self.videos)}"
+
+
+def check(condition, message):
+    if not condition:
+        print(f"❌ {message}")
+        sys.exit(1)
+    print(f"✅ {message}")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as folder:
+        db = os.path.join(folder, "uploads.db")
+        renders = []
+        for i in range(10):
+            renders.append(os.path.join(folder, f"short_{i}.mp4"))
+            open(renders[-1], "wb").close()
+
+        # 2026-01-18 09:00 PST
+        clock = FakeClock(datetime.fromisoformat("2026-01-18T17:00:00+00:00").timestamp())
+        scheduler = UploadScheduler(db, None, clock=clock)
+        api = FakeYouTube(clock, scheduler.bucket.day)
+        scheduler.send = api.upload
+
+        check(scheduler.renders_worth_starting(10) == 6, "a batch of 10 is cut to the 6 uploads a day's quota covers")
+        ids = [scheduler.upload(path, f"short {i}", "", []) for i, path in enumerate(renders[:8])]
+        check(all(ids[:6]) and ids[6:] == [None, None], "6 uploads sent, the 7th and 8th held")
+        check(len(api.videos) == 6 and api.used[scheduler.bucket.day()] == 9600, "stand-in API never refused a call")
+        check(scheduler.renders_worth_starting(5) == 0, "no more renders worth starting today")
+        reset = datetime.fromtimestamp(scheduler.bucket.next_reset(), scheduler.bucket.zone)
+        check((reset.hour, reset.minute, reset.day) == (0, 0, 19), f"bucket resets at midnight Pacific ({reset})")
+        check(scheduler.drain() == [], "nothing drains before the reset")
+        scheduler.close()
+
+        # Next window, fresh process: held uploads go first, in order
+        clock.now = scheduler.bucket.next_reset() + 60
+        scheduler = UploadScheduler(db, api.upload, clock=clock)
+        sent = scheduler.drain()
+        check([path for path, _ in sent] == renders[6:8], "held uploads drained in order after the reset")
+        check(scheduler.uploads_left() == 4, "bucket persisted: 2 of 6 used in the new window")
+
+        # Another client on the same project eats the quota: the API refuses, we hold and stop
+        api.used[scheduler.bucket.day()] = api.quota
+        check(scheduler.upload(renders[8], "short 8", "", []) is None and scheduler.held() == 1,
+              "API quota refusal holds the upload")
+        check(scheduler.uploads_left() == 0, "refusal empties the local bucket for the rest of the day")
+
+        # A failed (non-quota) upload is retried after RETRY_SECONDS, at most max_attempts times
+        clock.now = scheduler.bucket.next_reset() + 60
+        api.fail_next = 1
+        check([path for path, _ in scheduler.drain()] == [], "failed attempt keeps the upload held")
+        clock.advance(RETRY_SECONDS + 1)
+        check([path for path, _ in scheduler.drain()] == [renders[8]], "retried and sent after the retry delay")
+        api.fail_next = 3
+        check(scheduler.upload(renders[9], "short 9", "", []) is None, "failed upload held for retry")
+        for _ in range(2):
+            clock.advance(RETRY_SECONDS + 1)
+            scheduler.drain()
+        row = scheduler._db.execute("SELECT state, attempts FROM uploads WHERE path = ?", (renders[9],)).fetchone()
+        check(row == ("failed", 3), "given up after 3 attempts")
+
+        # An upload waiting out a retry doesn't hold new uploads back as if the quota were gone
+        clock.now = scheduler.bucket.next_reset() + 60
+        api.fail_next = 1
+        check(scheduler.upload(renders[0], "retry me", "", []) is None, "failed upload held for retry")
+        check(scheduler.upload(renders[1], "fresh", "", []) is not None, "next upload still goes out right away")
+
+        # Two processes draining at once: the one that claimed a row sends it, the other skips it
+        clock.advance(RETRY_SECONDS + 1)
+        other = UploadScheduler(db, api.upload, clock=clock)
+        during = []
+
+        def upload_while_other_drains(*args):
+            during.extend(other.drain())
+            return api.upload(*args)
+
+        scheduler.send = upload_while_other_drains
+        sent = scheduler.drain()
+        check(len(sent) == 1 and during == [] and api.videos.count("retry me") == 1,
+              "a held upload being sent is not sent again by a concurrent drain")
+        scheduler.send = api.upload
+        other.close()
+
+        # A process dies between claiming an upload and recording the result: the row stays
+        # 'sending' until its claim goes stale, then it is held again and sent by a later drain
+        api.fail_next = 1
+        check(scheduler.upload(renders[2], "crashed", "", []) is None, "failed upload held for retry")
+        clock.advance(RETRY_SECONDS + 1)
+        crashed = UploadScheduler(db, api.upload, clock=clock)
+        check(crashed._claim() is not None, "upload claimed by a process that then dies")
+        crashed.close()
+        check(scheduler.drain() == [] and scheduler.held() == 0, "a fresh claim is left to its owner")
+        clock.advance(SENDING_SECONDS + 1)
+        sent = scheduler.drain()
+        row = scheduler._db.execute("SELECT state, attempts FROM uploads WHERE path = ?", (renders[2],)).fetchone()
+        check([path for path, _ in sent] == [renders[2]] and row == ("done", 2),
+              "a stale claim is reclaimed and sent (counted as an attempt)")
+        print(f"📊 {scheduler.report()}")
+        scheduler.close()
+
+
+if __name__ == "__main__":
+    main()
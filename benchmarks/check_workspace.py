@@ -0,0 +1,165 @@
+"""
+Checks for the size-budgeted workspace (no rendering).
+A fake clock drives LRU order; asserts that pinned and leased artifacts survive
+eviction (including a lease held by another process), that publish() renames
+outputs into place only on success, that scratch directories are private and
+swept after a crash, and that usage comes from the ledger, not a rescan.
+Exits 1 on the first failed check.
+
+Usage: python benchmarks/check_workspace.py
+"""
+
+import os
+import sys
+import time
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from workspace import Workspace, MB
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class Spec:
+    def __init__(self, path):
+        self.path = path
+
+
+def check(condition, message):
+    if not condition:
+        print(f"❌ {message}")
+        sys.exit(1)
+    print(f"✅ {message}")
+
+
+def write(path, mb):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"\0" * int(mb * MB))
+    return path
+
+
+def open_workspace(folder, clock, budget_mb=10):
+    roots = [os.path.join(folder, name) for name in ("downloads", "temp", "output")]
+    return Workspace(os.path.join(folder, "workspace.db"), roots, budget_mb,
+                     scratch_root=roots[1], lease_seconds=60, clock=clock)
+
+
+def check_adopt_and_incremental(folder):
+    clock = FakeClock()
+    old = write(os.path.join(folder, "downloads", "old.mp4"), 2)
+    write(os.path.join(folder, "output", "README.txt"), 0.001)
+    workspace = open_workspace(folder, clock)
+    check(workspace.usage() == 2 * MB, "existing files adopted once when the ledger is created")
+    write(os.path.join(folder, "downloads", "untracked.mp4"), 1)
+    workspace.close()
+    workspace = open_workspace(folder, clock)
+    check(workspace.usage() == 2 * MB, "reopening reads usage from the ledger instead of rescanning")
+    os.remove(os.path.join(folder, "downloads", "untracked.mp4"))
+    workspace.forget(old)
+    os.remove(old)
+    return workspace
+
+
+def check_lru_eviction(folder, workspace):
+    clock = workspace.clock
+    paths = []
+    for i in range(4):
+        clock.advance(10)
+        paths.append(workspace.unique_path(os.path.join(folder, "downloads"), "source.mp4"))
+        write(paths[-1], 3)
+        workspace.track(paths[-1])
+    check(len(set(paths)) == 4 and all(workspace.run_id in p for p in paths), "unique per-run file names")
+    clock.advance(10)
+    workspace.touch(paths[0])  # paths[1] is now least recently used
+    workspace.pin(paths[2])
+    evicted = workspace.enforce()
+    check(evicted == [os.path.abspath(paths[1])], "least recently used artifact evicted first")
+    check(workspace.usage() <= 10 * MB, "usage back under the budget")
+
+    clock.advance(10)
+    big = write(os.path.join(folder, "output", "big.mp4"), 4)
+    workspace.track(big)
+    with workspace.in_use(paths[3]):
+        with workspace.in_use(paths[3]):
+            pass  # Nested release keeps the outer lease
+        evicted = workspace.enforce()
+    check(os.path.exists(paths[3]), "leased artifact survives eviction (nested leases)")
+    check(os.path.exists(paths[2]), "pinned artifact survives eviction")
+    check(evicted == [os.path.abspath(paths[0])], "oldest unprotected artifact evicted instead, newer kept")
+    workspace.pin(paths[2], False)
+    workspace.forget(big)
+    os.remove(big)
+
+
+def check_foreign_lease(folder, workspace):
+    held = write(os.path.join(folder, "downloads", "held.mp4"), 12)
+    workspace.track(held)
+    code = (f"import sys, time; sys.path.insert(0, {ROOT!r}); from workspace import Workspace; "
+            f"w = Workspace({os.path.join(folder, 'workspace.db')!r}, [], None, "
+            f"scratch_root={os.path.join(folder, 'temp')!r}); "
+            f"lease = w.in_use({held!r}); lease.__enter__(); print('held', flush=True); time.sleep(30)")
+    child = subprocess.Popen([sys.executable, "-c", code], stdout=subprocess.PIPE, text=True)
+    child.stdout.readline()
+    workspace.clock.now = time.time()  # The other process leased on the real clock
+    workspace.enforce()
+    check(os.path.exists(held), "artifact leased by another live process is not evicted")
+    child.kill()
+    child.wait()
+    workspace.enforce()
+    check(not os.path.exists(held), "lease of a dead process no longer protects the artifact")
+
+
+def check_publish_and_scratch(folder, workspace):
+    final = os.path.join(folder, "output", "short.mp4")
+    with workspace.publish([Spec(final)]) as staged:
+        check(staged[0].path != final and staged[0].path.endswith(".mp4"), "outputs staged under a .partial name")
+        write(staged[0].path, 1)
+        check(not os.path.exists(final), "final name absent while encoding")
+    check(os.path.exists(final) and not os.path.exists(staged[0].path), "renamed into place on success")
+
+    failed = os.path.join(folder, "output", "failed.mp4")
+    try:
+        with workspace.publish([Spec(failed)]) as staged:
+            write(staged[0].path, 1)
+            raise RuntimeError("encoder died")
+    except RuntimeError:
+        pass
+    check(not os.path.exists(failed) and not os.path.exists(staged[0].path), "failed output leaves nothing behind")
+
+    with workspace.scratch() as first, workspace.scratch() as second:
+        check(first != second and os.path.isdir(first), "each scratch directory is private")
+        check(os.path.abspath(first) in workspace.leased(), "scratch directory is leased")
+        open_workspace(folder, workspace.clock).close()  # Another run starting sweeps scratch
+        check(os.path.isdir(first) and os.path.isdir(second), "live scratch survives another run's sweep")
+    check(not os.path.exists(first), "scratch removed after the run")
+
+    crashed = os.path.join(folder, "temp", "run_crashed_1")
+    write(os.path.join(crashed, "audio.wav"), 1)
+    open_workspace(folder, workspace.clock).close()
+    check(not os.path.exists(crashed), "scratch of a crashed run swept on start")
+
+
+def main():
+    with tempfile.TemporaryDirectory() as folder:
+        workspace = check_adopt_and_incremental(folder)
+        check_lru_eviction(folder, workspace)
+        check_foreign_lease(folder, workspace)
+        check_publish_and_scratch(folder, workspace)
+        print(f"📊 {workspace.report()}")
+        workspace.close()
+
+
+if __name__ == "__main__":
+    main()
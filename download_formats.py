@@ -0,0 +1,97 @@
+"""
+Layout-aware yt-dlp format selection.
+The source only ever ends up inside one zone of the canvas, so there is no
+point downloading more pixels than that zone can show. These helpers turn a
+zone into yt-dlp -f/-S arguments (smallest stream that still covers it,
+H.264 preferred because it decodes fastest in software, video-only when the
+pipeline throws the source audio away) and log the bytes saved per download.
+"""
+
+import os
+import json
+import math
+
+# Standard stream heights (the "res" yt-dlp sorts on is the smaller dimension)
+RESOLUTION_LADDER = [144, 240, 360, 480, 720, 1080, 1440, 2160]
+
+# Shorts are 9:16, which is what auto mode searches for
+DEFAULT_ASPECT = 9 / 16
+
+
+def required_resolution(zone_w, zone_h, fit="contain", aspect=DEFAULT_ASPECT):
+    """Smallest ladder 'res' (min dimension) whose stream fills the zone at 1:1 or better"""
+    zone_ratio = zone_w / zone_h
+    fit_width = aspect > zone_ratio if fit == "contain" else aspect <= zone_ratio
+    if fit_width:
+        needed_w, needed_h = zone_w, zone_w / aspect
+    else:
+        needed_w, needed_h = zone_h * aspect, zone_h
+    needed = math.ceil(min(needed_w, needed_h))
+    for res in RESOLUTION_LADDER:
+        if res >= needed:
+            return res
+    return RESOLUTION_LADDER[-1]
+
+
+def format_args(zone_w, zone_h, fit="contain", need_audio=True, aspect=DEFAULT_ASPECT):
+    """yt-dlp CLI arguments selecting the cheapest stream that still covers the zone"""
+    res = required_resolution(zone_w, zone_h, fit, aspect)
+    if need_audio:
+        fmt = "bv*+ba/b"
+        sort = f"res:{res},vcodec:h264,acodec:aac"
+    else:
+        # Source audio is discarded later - don't download it at all
+        fmt = "bv/bv*/b"
+        sort = f"res:{res},vcodec:h264"
+    return ["-f", fmt, "-S", sort, "--merge-output-format", "mp4", "--write-info-json"]
+
+
+def info_json_path(output_path):
+    return os.path.splitext(output_path)[0] + ".info.json"
+
+
+def _format_bytes(fmt, duration):
+    size = fmt.get("filesize") or fmt.get("filesize_approx")
+    if not size and fmt.get("tbr") and duration:
+        size = fmt["tbr"] * 1000 / 8 * duration
+    return size or 0
+
+
+def legacy_bytes(info, max_height=None):
+    """Size the old `best` / `best[height<=N]` selector would have downloaded"""
+    duration = info.get("duration") or 0
+    combined = [
+        f for f in info.get("formats") or []
+        if f.get("vcodec") not in (None, "none") and f.get("acodec") not in (None, "none")
+        and (max_height is None or (f.get("height") or 0) <= max_height)
+    ]
+    if not combined:
+        return 0
+    # yt-dlp lists formats worst -> best
+    return _format_bytes(combined[-1], duration)
+
+
+def report_bytes_saved(output_path, max_height=None, keep_info=False):
+    """Print downloaded bytes vs what the old selector would have fetched; returns bytes saved"""
+    info_path = info_json_path(output_path)
+    try:
+        if not os.path.exists(info_path) or not os.path.exists(output_path):
+            return None
+        with open(info_path, "r", encoding="utf-8") as f:
+            info = json.load(f)
+        downloaded = os.path.getsize(output_path)
+        baseline = legacy_bytes(info, max_height)
+        label = f"{info.get('width') or '?'}x{info.get('height') or '?'} {info.get('vcodec') or '?'}"
+        if baseline:
+            saved = baseline - downloaded
+            print(f"📉 Downloaded {downloaded / 1e6:.1f} MB ({label}) vs ~{baseline / 1e6:.1f} MB "
+                  f"with the old format -> saved ~{saved / 1e6:.1f} MB")
+            return saved
+        print(f"📉 Downloaded {downloaded / 1e6:.1f} MB ({label})")
+        return None
+    except Exception as e:
+        print(f"⚠️ Could not compute download savings: {e}")
+        return None
+    finally:
+        if not keep_info and os.path.exists(info_path):
+            os.remove(info_path)
@@ -0,0 +1,179 @@
+"""
+Table-driven frame resizer.
+MoviePy's resize() hands every frame to PIL, which rebuilds its filter
+coefficients each time even though the source and target sizes never
+change inside a clip. Here the separable index/weight tables are built
+once per (src, dst) pair and each frame is resampled with NumPy (or
+scipy.sparse when available) into a preallocated output buffer.
+"""
+
+import math
+import numpy as np
+
+# scipy.sparse is an optional compiled kernel, loaded by the first resizer that uses it
+sparse = None
+
+
+def _load_sparse():
+    global sparse
+    if sparse is None:
+        try:
+            from scipy import sparse as module
+        except ImportError:
+            return None
+        sparse = module
+    return sparse
+
+# ==================== FILTERS ====================
+def _lanczos(x, a=3.0):
+    x = np.abs(x)
+    out = np.sinc(x) * np.sinc(x / a)
+    out[x >= a] = 0.0
+    return out
+
+
+def _triangle(x):
+    return np.maximum(0.0, 1.0 - np.abs(x))
+
+
+# name -> (kernel, support); lanczos matches PIL's ANTIALIAS used by MoviePy
+FILTERS = {
+    "lanczos": (_lanczos, 3.0),
+    "bilinear": (_triangle, 1.0),
+}
+
+
+def build_tables(src_size, dst_size, filter_name="lanczos", src_start=0.0, src_span=None, flip=False):
+    """
+    Build (index, weights) arrays of shape (dst_size, taps) for one axis.
+    Follows PIL's resampling: the filter is stretched by the scale factor when
+    downscaling so every source pixel contributes (antialiasing).
+    src_start/src_span select a crop window of the source axis and flip mirrors it.
+    """
+    kernel, support = FILTERS[filter_name]
+    if src_span is None:
+        src_span = src_size - src_start
+    scale = src_span / dst_size
+    filter_scale = max(scale, 1.0)
+    support = support * filter_scale
+    taps = int(math.ceil(support)) * 2 + 1
+
+    centers = src_start + (np.arange(dst_size) + 0.5) * scale
+    first = np.floor(centers - support + 0.5).astype(np.int64)
+    index = first[:, None] + np.arange(taps)[None, :]
+    weights = kernel((index + 0.5 - centers[:, None]) / filter_scale)
+
+    # Taps outside the source image get no weight (PIL clips the window the same way)
+    outside = (index < 0) | (index >= src_size)
+    weights[outside] = 0.0
+    totals = weights.sum(axis=1, keepdims=True)
+    totals[totals == 0] = 1.0
+    weights /= totals
+    index = np.clip(index, 0, src_size - 1)
+
+    if flip:
+        index = index[::-1]
+        weights = weights[::-1]
+    return np.ascontiguousarray(index), np.ascontiguousarray(weights.astype(np.float32))
+
+# ==================== RESIZER ====================
+class FrameResizer:
+    """
+    Resize HxWxC frames from one fixed size to another.
+    The returned array is a reused buffer - copy it if you need to keep it past the next call.
+    """
+
+    def __init__(self, src_w, src_h, dst_w, dst_h, channels=3, filter_name="lanczos", use_sparse=True,
+                 window=None, flip_x=False):
+        """window=(x, y, w, h) resamples only that part of the source (crop), flip_x mirrors it"""
+        self.src_size = (src_w, src_h)
+        self.dst_size = (dst_w, dst_h)
+        self.channels = channels
+        win_x, win_y, win_w, win_h = window or (0, 0, src_w, src_h)
+        self.x_index, self.x_weights = build_tables(src_w, dst_w, filter_name, win_x, win_w, flip_x)
+        self.y_index, self.y_weights = build_tables(src_h, dst_h, filter_name, win_y, win_h)
+        self._setup(use_sparse)
+
+    def _setup(self, use_sparse):
+        src_w, src_h = self.src_size
+        dst_w, dst_h = self.dst_size
+        c = self.channels
+        self.use_sparse = bool(use_sparse and _load_sparse() is not None)
+
+        if self.use_sparse:
+            self._y_matrix = self._to_sparse(self.y_index, self.y_weights, src_h)
+            # Horizontal pass works on (H, W*C) rows, so expand the weights per channel
+            x_matrix = self._to_sparse(self.x_index, self.x_weights, src_w)
+            self._x_matrix = sparse.kron(x_matrix.T, sparse.identity(c, dtype=np.float32)).tocsc()
+            # Run the cheaper pass order for this pair of sizes
+            vertical_first = self._y_matrix.nnz * src_w + x_matrix.nnz * dst_h
+            horizontal_first = x_matrix.nnz * src_h + self._y_matrix.nnz * dst_w
+            self._vertical_first = vertical_first <= horizontal_first
+            self._flat = np.empty((src_h, src_w * c), dtype=np.float32)
+        else:
+            self._rows = np.empty((dst_h, src_w, c), dtype=np.float32)
+            self._tap = np.empty((dst_h, src_w, c), dtype=np.float32)
+            self._tap_x = np.empty((dst_h, dst_w, c), dtype=np.float32)
+
+        self._acc = np.empty((dst_h, dst_w, c), dtype=np.float32)
+        self._out = np.empty((dst_h, dst_w, c), dtype=np.uint8)
+
+    @staticmethod
+    def _to_sparse(index, weights, src_size):
+        dst_size, taps = index.shape
+        rows = np.repeat(np.arange(dst_size), taps)
+        # Duplicate (row, col) pairs from clamped edge taps are summed by csr_matrix
+        return sparse.csr_matrix(
+            (weights.ravel(), (rows, index.ravel())), shape=(dst_size, src_size), dtype=np.float32
+        )
+
+    def __call__(self, frame):
+        src_w, src_h = self.src_size
+        dst_w, dst_h = self.dst_size
+        if frame.shape[1] != src_w or frame.shape[0] != src_h:
+            raise ValueError(f"Frame is {frame.shape[1]}x{frame.shape[0]}, resizer expects {src_w}x{src_h}")
+
+        if self.use_sparse:
+            self._resample_sparse(frame)
+        else:
+            self._resample_taps(frame)
+
+        np.clip(self._acc, 0, 255, out=self._acc)
+        self._acc += 0.5
+        np.copyto(self._out, self._acc, casting="unsafe")
+        return self._out
+
+    def _resample_sparse(self, frame):
+        dst_w, dst_h = self.dst_size
+        # Frames stay in their natural (H, W*C) layout - no transposes
+        flat = self._flat
+        np.copyto(flat, frame.reshape(flat.shape), casting="unsafe")
+        if self._vertical_first:
+            result = (self._y_matrix @ flat) @ self._x_matrix
+        else:
+            result = self._y_matrix @ (flat @ self._x_matrix)
+        self._acc.reshape(dst_h, -1)[...] = result
+
+    def _resample_taps(self, frame):
+        rows, tap, acc, tap_x = self._rows, self._tap, self._acc, self._tap_x
+        # Vertical pass first - gathering whole rows is a contiguous copy
+        rows.fill(0)
+        for k in range(self.y_index.shape[1]):
+            np.multiply(frame[self.y_index[:, k]], self.y_weights[:, k, None, None], out=tap)
+            rows += tap
+        acc.fill(0)
+        for k in range(self.x_index.shape[1]):
+            np.multiply(rows[:, self.x_index[:, k]], self.x_weights[None, :, k, None], out=tap_x)
+            acc += tap_x
+
+
+def resize_clip(clip, newsize, filter_name="lanczos"):
+    """Drop-in for clip.resize(newsize=(w, h)) using a FrameResizer built once for the clip"""
+    new_w, new_h = int(newsize[0]), int(newsize[1])
+    if (new_w, new_h) == (clip.w, clip.h):
+        return clip
+    if clip.mask is not None:
+        # Masks are rare here (no TextClips in the resized layers) - keep MoviePy's path
+        return clip.resize(newsize=(new_w, new_h))
+    resizer = FrameResizer(clip.w, clip.h, new_w, new_h, filter_name=filter_name)
+    return clip.fl_image(resizer)
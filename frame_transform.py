@@ -0,0 +1,147 @@
+"""
+Fused per-frame transform chain.
+Instead of stacking mirror_x -> colorx -> resize -> crop -> colorx as separate
+fl_image layers (each allocating a new float frame), the pipeline describes
+the chain with a TransformChain and compiles it into a single pass:
+flip + crop + resize are folded into the resize tables and every brightness
+step becomes one 256-entry uint8 lookup table.
+"""
+
+import numpy as np
+
+from frame_resize import FrameResizer
+import render_profiler
+
+
+class TransformChain:
+    """
+    Description of per-frame ops on a clip. Every method returns a new chain,
+    so a shared base (e.g. the anti-copyright effects) can be branched.
+    Coordinates passed to crop()/resize() are in the chain's current output space.
+    """
+
+    def __init__(self, src_w, src_h):
+        self.src_w = src_w
+        self.src_h = src_h
+        self.window = (0.0, 0.0, float(src_w), float(src_h))  # Source area in source pixels
+        self.size = (src_w, src_h)                            # Current output size
+        self.flip_x = False
+        self.gains = []
+
+    @classmethod
+    def for_clip(cls, clip):
+        return cls(clip.w, clip.h)
+
+    @property
+    def w(self):
+        return self.size[0]
+
+    @property
+    def h(self):
+        return self.size[1]
+
+    def _copy(self):
+        chain = TransformChain(self.src_w, self.src_h)
+        chain.window = self.window
+        chain.size = self.size
+        chain.flip_x = self.flip_x
+        chain.gains = list(self.gains)
+        return chain
+
+    # ---------- ops (same meaning as the MoviePy fx they replace) ----------
+    def mirror_x(self):
+        chain = self._copy()
+        chain.flip_x = not self.flip_x
+        return chain
+
+    def colorx(self, factor):
+        chain = self._copy()
+        chain.gains.append(factor)
+        return chain
+
+    def resize(self, newsize):
+        chain = self._copy()
+        chain.size = (int(newsize[0]), int(newsize[1]))
+        return chain
+
+    def crop(self, x1=0, y1=0, width=None, height=None):
+        """Crop in output pixels (integer, like MoviePy's array slicing)"""
+        x1, y1 = int(x1), int(y1)
+        width = int(width if width is not None else self.w - x1)
+        height = int(height if height is not None else self.h - y1)
+        win_x, win_y, win_w, win_h = self.window
+        scale_x = win_w / self.w
+        scale_y = win_h / self.h
+        # A mirrored chain shows the window right-to-left, so crop from the other side
+        left = (self.w - x1 - width) if self.flip_x else x1
+
+        chain = self._copy()
+        chain.window = (win_x + left * scale_x, win_y + y1 * scale_y, width * scale_x, height * scale_y)
+        chain.size = (width, height)
+        return chain
+
+    # ---------- compile ----------
+    def lookup_table(self):
+        """All brightness steps as one uint8 LUT (None if there are none)"""
+        if not self.gains:
+            return None
+        lut = np.arange(256, dtype=np.float64)
+        for factor in self.gains:
+            # colorx clips every step at 255
+            lut = np.minimum(lut * factor, 255)
+        return np.floor(lut + 0.5).astype(np.uint8)
+
+    def compile(self):
+        return FusedTransform(self)
+
+    def apply(self, clip, name=None):
+        """Return clip with the whole chain run as a single fl_image pass (`name` labels its profile timings)"""
+        if self.is_identity():
+            return clip
+        transform = self.compile()
+        profiler = render_profiler.active()
+        if profiler is not None:
+            transform = profiler.timed(transform, f"transform:{name}" if name else "transform")
+        return clip.fl_image(transform)
+
+    def is_identity(self):
+        return (not self.flip_x and not self.gains and self.size == (self.src_w, self.src_h)
+                and self.window == (0.0, 0.0, float(self.src_w), float(self.src_h)))
+
+    def __repr__(self):
+        return (f"TransformChain({self.src_w}x{self.src_h} -> {self.w}x{self.h}, "
+                f"window={tuple(round(v, 2) for v in self.window)}, flip_x={self.flip_x}, gains={self.gains})")
+
+
+class FusedTransform:
+    """Compiled TransformChain: one pass over each decoded frame into a reused uint8 buffer"""
+
+    def __init__(self, chain):
+        self.chain = chain
+        self.flip_x = chain.flip_x
+        self.lut = chain.lookup_table()
+        full_window = (0.0, 0.0, float(chain.src_w), float(chain.src_h))
+        self.resizer = None
+        if chain.size != (chain.src_w, chain.src_h) or chain.window != full_window:
+            self.resizer = FrameResizer(chain.src_w, chain.src_h, chain.w, chain.h,
+                                        window=chain.window, flip_x=chain.flip_x)
+        self._out = np.empty((chain.h, chain.w, 3), dtype=np.uint8)
+
+    def __call__(self, frame, out=None):
+        """Transformed frame (in a reused buffer, or written into `out` when given)"""
+        target = self._out if out is None else out
+        if self.resizer is not None:
+            image = self.resizer(frame)  # Flip + crop are already in the tables
+        else:
+            image = frame[:, ::-1] if self.flip_x else frame
+            if image.dtype != np.uint8:
+                np.copyto(target, image, casting="unsafe")
+                image = target
+
+        if self.lut is not None:
+            np.take(self.lut, image, out=target)
+            return target
+        if out is not None and image is not out:
+            np.copyto(out, image, casting="unsafe")
+            return out
+        return image
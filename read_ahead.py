@@ -0,0 +1,128 @@
+"""
+Read-ahead video decoding.
+MoviePy's FFMPEG_VideoReader only reads from ffmpeg's pipe when a frame is
+asked for, so the render thread waits on the template, the source and every
+other input one after another. ReadAheadReader takes over a clip's reader and
+keeps a small bounded queue of the next frames filled from a background
+thread; sequential rendering then finds its frame already decoded. Frame
+positions, seeks (backwards or more than 100 frames ahead) and end of stream
+behave exactly like the wrapped reader.
+"""
+
+import queue
+import warnings
+import threading
+
+import numpy as np
+
+MAX_SKIP = 100  # Same jump MoviePy still decodes through instead of restarting ffmpeg
+
+
+class ReadAheadReader:
+    """Drop-in replacement for a clip's FFMPEG_VideoReader with `depth` frames decoded ahead"""
+
+    def __init__(self, reader, depth=4):
+        self.reader = reader
+        self.depth = max(1, depth)
+        self.pos = reader.pos
+        self.lastread = reader.lastread
+        self._frames = None
+        self._stop = None
+        self._thread = None
+        self._eof = False
+
+    def __getattr__(self, name):
+        # fps, size, nframes, duration, infos, filename... come from the wrapped reader
+        return getattr(self.reader, name)
+
+    # ---------- reading ----------
+    def get_frame(self, t):
+        """Frame at time t (same position rounding as FFMPEG_VideoReader.get_frame)"""
+        pos = int(self.reader.fps * t + 0.00001) + 1
+        if self.reader.proc is None:
+            self._seek(t, pos)
+        if pos == self.pos:
+            return self.lastread
+        if pos < self.pos or pos > self.pos + MAX_SKIP:
+            self._seek(t, pos)
+            return self.lastread
+        if self._thread is None and not self._eof:
+            self._start(self.pos + 1)
+        while self.pos < pos and not self._eof:
+            frame_pos, frame = self._frames.get()
+            if frame is None:
+                self._eof = True
+                warnings.warn(f"{self.reader.filename}: stream ended at frame {frame_pos - 1}/{self.reader.nframes}, "
+                              "using the last valid frame instead.", UserWarning)
+                break
+            self.pos, self.lastread = frame_pos, frame
+        self.pos = pos
+        return self.lastread
+
+    def _seek(self, t, pos):
+        """Restart ffmpeg at t, read that frame now and decode ahead from the next one"""
+        self._halt()
+        self.reader.initialize(t)
+        self.reader.pos = pos
+        self.lastread = self.reader.read_frame()
+        self.pos = pos
+        self._eof = False
+        self._start(pos + 1)
+
+    # ---------- background decoding ----------
+    def _start(self, next_pos):
+        self._frames = queue.Queue(maxsize=self.depth)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._decode, args=(self.reader.proc, next_pos, self._frames, self._stop),
+                                        name="read-ahead", daemon=True)
+        self._thread.start()
+
+    def _decode(self, proc, pos, frames, stop):
+        w, h = self.reader.size
+        channels = self.reader.depth
+        nbytes = channels * w * h
+        while not stop.is_set():
+            try:
+                data = proc.stdout.read(nbytes)
+            except (OSError, ValueError):  # pipe closed by a seek / close
+                data = b""
+            if len(data) != nbytes:
+                item = (pos, None)
+            else:
+                item = (pos, np.frombuffer(data, dtype=np.uint8).reshape(h, w, channels))
+            while not stop.is_set():
+                try:
+                    frames.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            if item[1] is None:
+                return
+            pos += 1
+
+    def _halt(self):
+        """Stop the decode thread (it may be blocked on a full queue or on the pipe)"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self.reader.close()  # unblocks a pending pipe read
+        while True:
+            try:
+                self._frames.get_nowait()  # and a pending put
+            except queue.Empty:
+                break
+        self._thread.join()
+        self._thread = None
+        self._frames = None
+
+    def close(self):
+        self._halt()
+        self.reader.close()
+
+
+def read_ahead(clip, depth=4):
+    """Give a VideoFileClip a read-ahead reader (in place); other clips and depth 0 are left alone"""
+    reader = getattr(clip, "reader", None)
+    if depth and reader is not None and hasattr(reader, "read_frame") and not isinstance(reader, ReadAheadReader):
+        clip.reader = ReadAheadReader(reader, depth)
+    return clip
@@ -0,0 +1,204 @@
+"""
+Render profiling (--profile).
+One run produces three files in the profile folder:
+- <name>.prof: cProfile of the whole run (pstats / snakeviz)
+- <name>.collapsed: wall-clock stack samples of every thread, in the
+  collapsed format flamegraph.pl and speedscope read ("a;b;c count")
+- <name>_frames.json: per-frame latency histograms (p50/p95/p99) for each
+  stage of the frame loop: fetch per layer, transform, composite, pipe write
+Frame timers are only wrapped around clips while a profiler is running, so a
+normal render executes exactly the same frame loop as before.
+"""
+
+import os
+import sys
+import json
+import time
+import cProfile
+import threading
+
+import numpy as np
+
+# Histogram bucket upper edges in milliseconds (the last bucket is open-ended)
+HISTOGRAM_EDGES_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+_active = None
+
+
+def active():
+    """The profiler running in this process, or None (worker processes don't inherit it)"""
+    if _active is not None and _active.pid == os.getpid():
+        return _active
+    return None
+
+
+def instrument(composite, layers):
+    """Wrap a composite and its named layers ({name: clip}) with frame timers if profiling"""
+    profiler = active()
+    if profiler is None:
+        return composite
+    for name, layer in layers.items():
+        if layer is not None:
+            profiler.wrap_layer(layer, name)
+    profiler.wrap_composite(composite)
+    return composite
+
+
+class RenderProfiler:
+    """cProfile + stack sampler + per-frame stage timers for one run"""
+
+    def __init__(self, folder, name="render", sample_interval=0.01):
+        self.folder = folder
+        self.name = name
+        self.sample_interval = sample_interval  # 100 Hz, like py-spy's default
+        self.samples = {}
+        self.stacks = {}
+        self.pid = None
+        self._local = threading.local()
+        self._stop = threading.Event()
+        self._profile = None
+        self._sampler = None
+        self._started = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def start(self):
+        global _active
+        self.pid = os.getpid()
+        self._started = time.perf_counter()
+        self._profile = cProfile.Profile()
+        self._sampler = threading.Thread(target=self._sample, name="profiler-sampler", daemon=True)
+        _active = self
+        self._sampler.start()
+        self._profile.enable()
+        print(f"⏱️ Profiling this run -> {self.folder}")
+        return self
+
+    def stop(self):
+        """Stop collecting and write the report files; returns the frame report"""
+        global _active
+        self._profile.disable()
+        self._stop.set()
+        self._sampler.join()
+        _active = None
+        return self.write()
+
+    # ---------- frame timers ----------
+    def timed(self, fn, stage):
+        """fn wrapped so every call's duration is recorded under `stage`"""
+        clock = time.perf_counter
+        record = self.samples.setdefault(stage, []).append
+
+        def wrapper(*args, **kwargs):
+            start = clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(clock() - start)
+        return wrapper
+
+    def wrap_layer(self, clip, name):
+        """Time each frame fetch of a composite layer (decode + its transforms)"""
+        clock = time.perf_counter
+        record = self.samples.setdefault(f"fetch:{name}", []).append
+        local = self._local
+        make_frame = clip.make_frame
+
+        def fetch(t):
+            start = clock()
+            frame = make_frame(t)
+            elapsed = clock() - start
+            record(elapsed)
+            local.fetched = getattr(local, "fetched", 0.0) + elapsed
+            return frame
+        clip.make_frame = fetch
+        return clip
+
+    def wrap_composite(self, clip):
+        """Time whole frames; minus the layer fetches inside them that leaves the blit/composite cost"""
+        clock = time.perf_counter
+        record_frame = self.samples.setdefault("frame", []).append
+        record_composite = self.samples.setdefault("composite", []).append
+        local = self._local
+        make_frame = clip.make_frame
+
+        def frame(t):
+            local.fetched = 0.0
+            start = clock()
+            image = make_frame(t)
+            elapsed = clock() - start
+            record_frame(elapsed)
+            record_composite(elapsed - local.fetched)
+            return image
+        clip.make_frame = frame
+        return clip
+
+    # ---------- stack sampler ----------
+    def _sample(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.sample_interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                key = ";".join(part.replace(";", ":") for part in reversed(stack))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+
+    # ---------- report ----------
+    def report(self):
+        stages = {}
+        labels = [f"<{HISTOGRAM_EDGES_MS[0]}"]
+        labels += [f"{lo}-{hi}" for lo, hi in zip(HISTOGRAM_EDGES_MS, HISTOGRAM_EDGES_MS[1:])]
+        labels += [f">={HISTOGRAM_EDGES_MS[-1]}"]
+        for stage, values in sorted(self.samples.items()):
+            if not values:
+                continue
+            ms = np.asarray(values) * 1000
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            counts = np.bincount(np.searchsorted(HISTOGRAM_EDGES_MS, ms, side="right"),
+                                 minlength=len(labels))
+            stages[stage] = {
+                "count": len(ms),
+                "total_s": round(float(ms.sum()) / 1000, 3),
+                "mean_ms": round(float(ms.mean()), 3),
+                "p50_ms": round(float(p50), 3),
+                "p95_ms": round(float(p95), 3),
+                "p99_ms": round(float(p99), 3),
+                "max_ms": round(float(ms.max()), 3),
+                "histogram_ms": dict(zip(labels, counts.tolist())),
+            }
+        return {
+            "name": self.name,
+            "wall_s": round(time.perf_counter() - self._started, 3),
+            "frames": len(self.samples.get("frame", [])),
+            "stages": stages,
+        }
+
+    def write(self):
+        os.makedirs(self.folder, exist_ok=True)
+        base = os.path.join(self.folder, f"{self.name}_{time.strftime('%Y%m%d_%H%M%S')}")
+        self._profile.dump_stats(base + ".prof")
+        with open(base + ".collapsed", "w", encoding="utf-8") as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+        report = self.report()
+        with open(base + "_frames.json", "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+        print(f"\n⏱️ Frame timings ({report['frames']} frames, {report['wall_s']}s wall):")
+        for stage, s in report["stages"].items():
+            print(f"   {stage:<20} p50 {s['p50_ms']:>8.2f}  p95 {s['p95_ms']:>8.2f}  "
+                  f"p99 {s['p99_ms']:>8.2f} ms  ({s['count']} calls, {s['total_s']}s)")
+        print(f"📊 Profile written: {base}.prof, .collapsed, _frames.json")
+        return report
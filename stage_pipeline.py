@@ -0,0 +1,320 @@
+"""
+Multi-process render pipeline for the template layout.
+In the MoviePy render loop, decoding every input, the source transform
+chains and compositing all take turns on one GIL. Here each of them is its own
+process: one ffmpeg-fed decoder per input, one transform process per source
+layer and one compositor, with the main process only writing finished frames
+into the encoder pipe. Frames move between stages in SharedFrameRings: slots
+in one multiprocessing.shared_memory block, so only slot indices travel
+through the queues and every stage reads and writes frames in place. A stage
+blocks while all slots of the ring it writes to are in flight (backpressure),
+and the first stage to fail sets a shared stop event that every other stage
+polls, so an error anywhere shuts the whole graph down.
+
+EXPERIMENTAL: off unless --pipeline is given. It has only been measured on a
+1-core machine, where it renders at 0.90x of the MoviePy loop; keep it off
+until benchmarks/bench_stage_pipeline.py shows a gain on 2, 4 and 8 cores.
+"""
+
+import queue
+import traceback
+import subprocess
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from video_export import get_ffmpeg_binary
+
+POLL_SECONDS = 0.1  # How often a blocked stage checks the stop event
+JOIN_SECONDS = 5    # Grace period for stages to exit before they are terminated
+
+
+class StageError(Exception):
+    """A pipeline stage failed (the message carries its traceback)"""
+
+
+class Stopped(Exception):
+    """Raised inside a stage once the stop event is set"""
+
+
+def _wait(q, stop):
+    while True:
+        try:
+            return q.get(timeout=POLL_SECONDS)
+        except queue.Empty:
+            if stop.is_set():
+                raise Stopped()
+
+
+class SharedFrameRing:
+    """
+    Fixed slots of one frame shape in shared memory, written by one producer
+    and read in place by `consumers` stages. A slot is free again once every
+    consumer has released it. Picklable: a child process re-attaches by name.
+    """
+
+    def __init__(self, shape, slots, ctx, consumers=1):
+        self.shape = tuple(shape)
+        self.slots = max(1, slots)
+        self.consumers = consumers
+        self._shm = shared_memory.SharedMemory(create=True, size=int(np.prod(self.shape)) * self.slots)
+        self.name = self._shm.name
+        self._owner = True
+        self._free = ctx.Queue()
+        self._filled = [ctx.Queue() for _ in range(consumers)]
+        self._released = {}  # Producer side: slot -> consumers done with it so far
+        for index in range(self.slots):
+            for _ in range(consumers):
+                self._free.put(index)
+        self._frames = self._map()
+
+    def _map(self):
+        return np.ndarray((self.slots,) + self.shape, dtype=np.uint8, buffer=self._shm.buf)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_shm"], state["_frames"]
+        state["_owner"] = False
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._shm = shared_memory.SharedMemory(name=self.name)
+        self._frames = self._map()
+
+    @property
+    def nbytes(self):
+        return self._shm.size
+
+    def frame(self, index):
+        """Slot `index` as an array over the shared block (no copy)"""
+        return self._frames[index]
+
+    def acquire(self, stop):
+        """Index of a slot no consumer still holds (blocks while all are in flight)"""
+        while True:
+            index = _wait(self._free, stop)
+            count = self._released.get(index, 0) + 1
+            if count == self.consumers:
+                self._released.pop(index, None)
+                return index
+            self._released[index] = count
+
+    def publish(self, index):
+        for filled in self._filled:
+            filled.put(index)
+
+    def finish(self):
+        """Tell every consumer no more frames are coming"""
+        for filled in self._filled:
+            filled.put(None)
+
+    def get(self, stop, consumer=0):
+        """Next filled slot index for this consumer, or None at the end of the stream"""
+        return _wait(self._filled[consumer], stop)
+
+    def release(self, index):
+        self._free.put(index)
+
+    def close(self):
+        self._frames = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+
+# ==================== STAGES (run in child processes) ====================
+def _run_stage(name, target, args, stop, errors):
+    try:
+        target(*args, stop)
+    except Stopped:
+        pass
+    except BaseException:
+        errors.put(f"{name}: {traceback.format_exc()}")
+        stop.set()
+
+
+def _decode_stage(path, start, fps, count, ring, stop):
+    """ffmpeg decodes, resamples to fps and scales; raw frames are read straight into ring slots"""
+    h, w = ring.shape[:2]
+    cmd = [get_ffmpeg_binary(), "-v", "error", "-nostdin"]
+    if start:
+        cmd += ["-ss", f"{start:.3f}"]
+    # tpad repeats the last frame when the input ends a frame early (rounding of the cut)
+    cmd += ["-i", path, "-an", "-sn", "-dn",
+            "-vf", f"fps={fps},scale={w}:{h}:flags=bicubic,tpad=stop=-1:stop_mode=clone,format=rgb24",
+            "-frames:v", str(count), "-f", "rawvideo", "-pix_fmt", "rgb24", "-"]
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=0)
+    try:
+        for _ in range(count):
+            index = ring.acquire(stop)
+            view = memoryview(ring.frame(index)).cast("B")
+            filled = 0
+            while filled < len(view):
+                read = proc.stdout.readinto(view[filled:])
+                if not read:
+                    proc.wait()
+                    raise IOError(f"ffmpeg decode of {path} ended early: {proc.stderr.read().decode(errors='ignore')}")
+                filled += read
+            ring.publish(index)
+        ring.finish()
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+        proc.wait()
+
+
+def _transform_stage(chain, source, consumer, ring, stop):
+    """One layer's fused transform chain, from the input's decoded slot into the layer's slot"""
+    transform = chain.compile()
+    while True:
+        index = source.get(stop, consumer)
+        if index is None:
+            ring.finish()
+            return
+        out = ring.acquire(stop)
+        transform(source.frame(index), out=ring.frame(out))
+        source.release(index)
+        ring.publish(out)
+
+
+def _blit(canvas, frame, x, y):
+    """Copy `frame` onto `canvas` with its top-left corner at (x, y), clipped to the canvas"""
+    h, w = frame.shape[:2]
+    x0, y0 = max(x, 0), max(y, 0)
+    x1, y1 = min(x + w, canvas.shape[1]), min(y + h, canvas.shape[0])
+    if x1 > x0 and y1 > y0:
+        canvas[y0:y1, x0:x1] = frame[y0 - y:y1 - y, x0 - x:x1 - x]
+
+
+def _composite_stage(base, layers, done, stop):
+    """Blit every layer onto the base frame in its own slot; the writer releases the slot"""
+    while True:
+        index = base.get(stop)
+        if index is None:
+            done.put(None)
+            return
+        canvas = base.frame(index)
+        for ring, (x, y) in layers:
+            layer_index = ring.get(stop)
+            if layer_index is None:
+                raise IOError("a layer ended before the base clip")
+            _blit(canvas, ring.frame(layer_index), x, y)
+            ring.release(layer_index)
+        done.put(index)
+
+
+# ==================== PIPELINE ====================
+class Input:
+    """A video file decoded from `start` seconds (each input is decoded once, whatever uses it)"""
+
+    def __init__(self, path, start=0.0):
+        self.path = path
+        self.start = start
+
+
+class Layer:
+    """An input's frames through a TransformChain, blitted at `position`"""
+
+    def __init__(self, name, source, chain, position):
+        self.name = name
+        self.source = source
+        self.chain = chain
+        self.position = (int(position[0]), int(position[1]))
+
+
+class StagePipeline:
+    """
+    Frame source for export_video: the base input (decoded at canvas size)
+    with `layers` composited on top, rendered by the stage processes.
+    Looks enough like a clip for export_video (size, duration, audio).
+    """
+
+    def __init__(self, size, fps, duration, base, layers, audio=None, slots=4):
+        self.size = (int(size[0]), int(size[1]))
+        self.w, self.h = self.size
+        self.fps = fps
+        self.duration = duration
+        self.base = base
+        self.layers = layers
+        self.audio = audio
+        self.slots = slots
+        self.frames = len(np.arange(0, duration, 1.0 / fps))
+
+    def write_frames(self, pipe):
+        """Run the stages and write every composited frame into `pipe` (raises StageError if a stage fails)"""
+        ctx = multiprocessing.get_context("spawn")  # Stages never inherit the render threads of this process
+        stop, errors, done = ctx.Event(), ctx.Queue(), ctx.Queue()
+        rings, stages = [], []
+
+        def ring(shape, consumers=1):
+            rings.append(SharedFrameRing(shape, self.slots, ctx, consumers))
+            return rings[-1]
+
+        def stage(name, target, *args):
+            stages.append(ctx.Process(target=_run_stage, args=(name, target, args, stop, errors),
+                                      name=name, daemon=True))
+
+        try:
+            base = ring((self.h, self.w, 3))
+            stage("decode base", _decode_stage, self.base.path, self.base.start, self.fps, self.frames, base)
+            inputs = {}
+            for item in self.layers:
+                inputs.setdefault(id(item.source), (item.source, []))[1].append(item)
+            composited = []
+            for source, items in inputs.values():
+                chain = items[0].chain
+                decoded = ring((int(chain.src_h), int(chain.src_w), 3), consumers=len(items))
+                stage(f"decode {len(items)} layer(s)", _decode_stage, source.path, source.start, self.fps,
+                      self.frames, decoded)
+                for consumer, item in enumerate(items):
+                    out = ring((int(item.chain.h), int(item.chain.w), 3))
+                    stage(f"transform {item.name}", _transform_stage, item.chain, decoded, consumer, out)
+                    composited.append((item, out))
+            order = {id(item): i for i, item in enumerate(self.layers)}
+            layer_rings = [(out, item.position) for item, out in sorted(composited, key=lambda c: order[id(c[0])])]
+            stage("composite", _composite_stage, base, layer_rings, done)
+
+            for process in stages:
+                process.start()
+            written = 0
+            while True:
+                index = self._next(done, errors, stages)
+                if index is None:
+                    break
+                pipe.write(memoryview(base.frame(index)).cast("B"))
+                base.release(index)
+                written += 1
+            self._raise_errors(errors)
+            if written != self.frames:
+                raise StageError(f"rendered {written} of {self.frames} frames")
+        finally:
+            stop.set()
+            for process in stages:
+                if process.pid is not None:
+                    process.join(JOIN_SECONDS)
+                    if process.is_alive():
+                        process.terminate()
+                        process.join()
+            for item in rings:
+                item.close()
+
+    def _next(self, done, errors, stages):
+        """Next finished base slot, watching for failed or vanished stages while waiting"""
+        while True:
+            try:
+                return done.get(timeout=POLL_SECONDS)
+            except queue.Empty:
+                self._raise_errors(errors)
+                for process in stages:
+                    if process.exitcode not in (None, 0):
+                        raise StageError(f"{process.name} exited with code {process.exitcode}")
+
+    @staticmethod
+    def _raise_errors(errors):
+        try:
+            message = errors.get_nowait()
+        except queue.Empty:
+            return
+        raise StageError(message)
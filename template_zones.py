@@ -0,0 +1,136 @@
+"""
+Automatic content zones for reaction templates.
+CONTENT_ZONE was hand-measured on one template image and applied to every
+reaction file, so a template with a differently placed black area either hid
+part of the source or showed black bars. Here each template is sampled once:
+a few frames decoded in one ffmpeg pass at a small size, a pixel counts as
+placement area only if it is black in every sample, and row/column
+projections of that mask give the black rectangle. The zone is stored as
+canvas fractions in the template index next to the reaction files, keyed by
+name + size + mtime, so later renders only read the JSON.
+"""
+
+import os
+import json
+import time
+import subprocess
+
+import numpy as np
+
+from render_layout import Zone
+from video_export import get_ffmpeg_binary
+
+ANALYSIS_WIDTH = 216    # Frames are analysed at 216 px wide (1/5 of a 1080 wide template)
+BLACK_LEVEL = 24        # Highest channel value still counted as black (compression noise)
+ROW_SHARE = 0.5         # Rows at least this black are candidates for the band...
+EDGE_SHARE = 0.95       # ...then columns and rows of the rectangle must be this black
+MIN_ZONE_SHARE = 0.05   # Smaller black regions are not a placement area
+
+
+def longest_run(mask):
+    """(start, end) of the longest run of True in a 1-D mask, or None"""
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], mask.astype(np.int8), [0]))))
+    if not len(edges):
+        return None
+    starts, ends = edges[::2], edges[1::2]
+    best = int(np.argmax(ends - starts))
+    return int(starts[best]), int(ends[best])
+
+
+def sample_frames(path, samples=5, width=ANALYSIS_WIDTH):
+    """(samples, h, width, 3) uint8 frames spread evenly over the video, from one decode pass"""
+    from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+    infos = ffmpeg_parse_infos(path)
+    src_w, src_h = infos["video_size"]
+    duration = infos.get("duration") or 0
+    height = max(2, int(round(src_h * width / src_w / 2)) * 2)
+    step = duration / samples if duration > 0 else 1
+    cmd = [get_ffmpeg_binary(), "-v", "error", "-ss", f"{step / 2:.3f}", "-i", path, "-an", "-sn",
+           "-vf", f"fps=1/{step:.4f},scale={width}:{height}:flags=area,format=rgb24",
+           "-frames:v", str(samples), "-f", "rawvideo", "-"]
+    raw = subprocess.run(cmd, capture_output=True, check=False).stdout
+    frame_bytes = width * height * 3
+    frames = np.frombuffer(raw, dtype=np.uint8)[:len(raw) // frame_bytes * frame_bytes]
+    return frames.reshape(-1, height, width, 3), (src_w, src_h)
+
+
+def find_black_zone(frames):
+    """(x, y, w, h) of the black placement rectangle in frame pixels, or None"""
+    if not len(frames):
+        return None
+    dark = (frames.max(axis=3) <= BLACK_LEVEL).all(axis=0)  # black in every sample
+    height, width = dark.shape
+    rows = longest_run(dark.mean(axis=1) >= ROW_SHARE)
+    if rows is None:
+        return None
+    cols = longest_run(dark[rows[0]:rows[1]].mean(axis=0) >= EDGE_SHARE)
+    if cols is None:
+        return None
+    rows = longest_run(dark[:, cols[0]:cols[1]].mean(axis=1) >= EDGE_SHARE)
+    if rows is None:
+        return None
+    x, y, w, h = cols[0], rows[0], cols[1] - cols[0], rows[1] - rows[0]
+    if w * h < MIN_ZONE_SHARE * width * height:
+        return None
+    return x, y, w, h
+
+
+def detect_zone(path, samples=5):
+    """Content zone of a template as canvas fractions, or None if it has no black area"""
+    frames, _ = sample_frames(path, samples)
+    found = find_black_zone(frames)
+    if found is None:
+        return None
+    height, width = frames.shape[1:3]
+    return Zone.from_pixels(*found, width, height)
+
+
+class TemplateZones:
+    """Per-template content zones, analysed once and cached in a JSON index"""
+
+    def __init__(self, index_path, samples=5):
+        self.index_path = index_path
+        self.samples = samples
+        self.entries = {}
+        if os.path.exists(index_path):
+            try:
+                with open(index_path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except ValueError:
+                self.entries = {}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.index_path)), exist_ok=True)
+        tmp = f"{self.index_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.index_path)
+
+    def zone(self, path, fallback=None):
+        """Cached zone for a template (analysed on first use or after the file changed)"""
+        stat = os.stat(path)
+        key = os.path.basename(path)
+        entry = self.entries.get(key)
+        if entry is None or entry.get("bytes") != stat.st_size or entry.get("mtime") != int(stat.st_mtime):
+            start = time.perf_counter()
+            zone = detect_zone(path, self.samples)
+            entry = {
+                "bytes": stat.st_size,
+                "mtime": int(stat.st_mtime),
+                "zone": [round(v, 5) for v in (zone.x, zone.y, zone.w, zone.h)] if zone else None,
+                "analysed": int(time.time()),
+            }
+            self.entries[key] = entry
+            self._save()
+            print(f"📐 Analysed {key} in {(time.perf_counter() - start) * 1000:.0f} ms: "
+                  f"{zone if zone else 'no black area'}")
+        if entry["zone"] is None:
+            return fallback
+        return Zone(*entry["zone"], fit=fallback.fit if fallback else "contain")
+
+    def cached(self, path, fallback=None):
+        """Zone from the index only (never analyses): what a dry run assumes the render will use"""
+        entry = self.entries.get(os.path.basename(path))
+        if entry is None or entry["zone"] is None:
+            return fallback
+        return Zone(*entry["zone"], fit=fallback.fit if fallback else "contain")
@@ -0,0 +1,136 @@
+"""
+Streaming voiceover.
+The voiceover used to be saved by edge-tts to temp/voiceover.mp3 and opened
+again with AudioFileClip once the whole file existed: an extra MP3 round
+trip through disk, and synthesis finished before any video work started.
+Here Communicate.stream() runs on a background thread from the moment the
+commentary is known; each MP3 chunk is piped into an ffmpeg decoder as it
+arrives and the PCM it produces is collected in memory. The mixer reads the
+voiceover through an AudioClip that only waits if it gets ahead of the
+decoded samples, so synthesis overlaps template/source decoding and the
+mix starts without the full voiceover.
+"""
+
+import asyncio
+import subprocess
+import threading
+
+import numpy as np
+
+from video_export import get_ffmpeg_binary
+
+SAMPLE_RATE = 44100
+CHANNELS = 2
+READ_BYTES = 1 << 16
+
+
+class VoiceoverStream:
+    """PCM of a TTS voiceover, filled in by a background thread while it is synthesised"""
+
+    def __init__(self, text, voice, communicate=None, rate=SAMPLE_RATE):
+        self.text = text
+        self.voice = voice
+        self.rate = rate
+        self.error = None
+        self._communicate = communicate  # edge_tts.Communicate-like factory (text, voice) -> has .stream()
+        self._chunks = []
+        self._samples = 0
+        self._pcm = np.zeros((0, CHANNELS), dtype=np.float32)
+        self._pending = b""  # Trailing bytes of an incomplete sample frame
+        self._done = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+    # ---------- producer ----------
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="tts-stream", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        decoder = subprocess.Popen(
+            [get_ffmpeg_binary(), "-v", "error", "-f", "mp3", "-i", "pipe:0",
+             "-f", "s16le", "-ac", str(CHANNELS), "-ar", str(self.rate), "pipe:1"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        reader = threading.Thread(target=self._read_pcm, args=(decoder.stdout,), daemon=True)
+        reader.start()
+        try:
+            asyncio.run(self._feed(decoder.stdin))
+        except Exception as e:
+            self.error = e
+            print(f"❌ TTS error: {e}")
+        finally:
+            try:
+                decoder.stdin.close()
+            except OSError:
+                pass
+            reader.join()
+            decoder.wait()
+            with self._cond:
+                self._done = True
+                self._cond.notify_all()
+
+    async def _feed(self, pipe):
+        if self._communicate is None:
+            import edge_tts
+            self._communicate = edge_tts.Communicate
+        async for chunk in self._communicate(self.text, self.voice).stream():
+            if chunk.get("type") == "audio" and chunk.get("data"):
+                pipe.write(chunk["data"])
+                pipe.flush()
+
+    def _read_pcm(self, pipe):
+        frame = 2 * CHANNELS
+        while True:
+            data = pipe.read1(READ_BYTES) if hasattr(pipe, "read1") else pipe.read(READ_BYTES)
+            if not data:
+                break
+            data = self._pending + data
+            usable = len(data) // frame * frame
+            self._pending = data[usable:]
+            if not usable:
+                continue
+            block = np.frombuffer(data[:usable], dtype=np.int16).reshape(-1, CHANNELS).astype(np.float32) / 32768
+            with self._cond:
+                self._chunks.append(block)
+                self._samples += len(block)
+                self._cond.notify_all()
+
+    # ---------- consumer ----------
+    def _pcm_until(self, needed):
+        """All decoded samples, waiting until there are `needed` of them or the stream ended"""
+        with self._cond:
+            while self._samples < needed and not self._done:
+                self._cond.wait()
+            if self._chunks:
+                self._pcm = np.concatenate([self._pcm] + self._chunks)
+                self._chunks = []
+            return self._pcm
+
+    def wait(self):
+        """Block until synthesis has finished; returns the voiceover duration in seconds"""
+        return len(self._pcm_until(float("inf"))) / self.rate
+
+    def samples_at(self, t):
+        """make_frame for moviepy: (n, 2) samples at times t (silence past the end of the voiceover)"""
+        scalar = np.ndim(t) == 0
+        index = np.round(np.atleast_1d(t) * self.rate).astype(np.int64)
+        pcm = self._pcm_until(int(index.max()) + 1 if len(index) else 0)
+        out = np.zeros((len(index), CHANNELS), dtype=np.float32)
+        valid = (index >= 0) & (index < len(pcm))
+        out[valid] = pcm[index[valid]]
+        return out[0] if scalar else out
+
+    def clip(self, duration):
+        """AudioClip of `duration` seconds reading the voiceover as it is decoded"""
+        from moviepy.audio.AudioClip import AudioClip
+        clip = AudioClip(duration=duration, fps=self.rate)
+        clip.make_frame = self.samples_at
+        clip.nchannels = CHANNELS
+        return clip
+
+
+def start_voiceover(text, voice, communicate=None):
+    """Start synthesising text in the background; pass the result to the mixer as the voiceover"""
+    print(f"🎙️ Streaming voiceover: {text[:50]}...")
+    return VoiceoverStream(text, voice, communicate).start()
@@ -0,0 +1,293 @@
+"""
+Quota-aware upload scheduling.
+Every YouTube Data API call costs quota units (an upload is 1600 of the
+default 10,000 per day) and the quota resets at midnight Pacific Time. A
+batch used to upload as soon as each render finished, so it could run out
+halfway and every later upload failed after its render had been paid for.
+Here the quota is a token bucket in SQLite, shared by every process, that
+refills on the daily boundary. An upload only goes out if its units can be
+taken from the bucket. Otherwise it is held and sent by drain() once the
+next window opens. Callers can ask how many more uploads today's quota
+covers before starting renders. The clock and the upload callable are
+injectable, so all of this runs against a local stand-in API.
+"""
+
+import os
+import json
+import time
+import sqlite3
+from datetime import datetime, timedelta, timezone
+
+# Units per API call (https://developers.google.com/youtube/v3/determine_quota_cost)
+COSTS = {
+    "videos.insert": 1600,
+    "thumbnails.set": 50,
+    "videos.update": 50,
+    "videos.list": 1,
+}
+DAILY_QUOTA = 10000
+QUOTA_TIMEZONE = "America/Los_Angeles"
+RETRY_SECONDS = 1800  # A held upload that failed for another reason is retried after this
+SENDING_SECONDS = 3600  # A claim older than this belongs to a process that died mid-upload
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS quota (
+    day TEXT PRIMARY KEY,
+    used INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS calls (
+    at REAL NOT NULL,
+    day TEXT NOT NULL,
+    call TEXT NOT NULL,
+    units INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS uploads (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT NOT NULL,
+    tags TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'held',
+    not_before REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    video_id TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+"""
+
+
+class QuotaExceeded(Exception):
+    """The API refused a call because the project's daily quota is used up"""
+
+
+def _quota_zone():
+    try:
+        from zoneinfo import ZoneInfo
+        return ZoneInfo(QUOTA_TIMEZONE)
+    except Exception:  # No tz database (e.g. Windows without tzdata): PST all year
+        return timezone(timedelta(hours=-8))
+
+
+class QuotaBucket:
+    """Daily quota units as a persistent token bucket, refilled at midnight Pacific Time"""
+
+    def __init__(self, db, daily_units=DAILY_QUOTA, clock=time.time):
+        self.db = db
+        self.daily_units = daily_units
+        self.clock = clock
+        self.zone = _quota_zone()
+
+    def day(self, now=None):
+        """Quota day a timestamp falls in, e.g. '2026-01-18'"""
+        return datetime.fromtimestamp(self.clock() if now is None else now, self.zone).strftime("%Y-%m-%d")
+
+    def next_reset(self, now=None):
+        """Timestamp the bucket refills at"""
+        local = datetime.fromtimestamp(self.clock() if now is None else now, self.zone)
+        midnight = datetime(local.year, local.month, local.day, tzinfo=self.zone) + timedelta(days=1)
+        return midnight.timestamp()
+
+    def used(self):
+        row = self.db.execute("SELECT used FROM quota WHERE day = ?", (self.day(),)).fetchone()
+        return row[0] if row else 0
+
+    def remaining(self):
+        return max(0, self.daily_units - self.used())
+
+    def take(self, call, units=None):
+        """Take a call's units from today's bucket; False (nothing taken) if they don't fit"""
+        units = COSTS[call] if units is None else units
+        now = self.clock()
+        day = self.day(now)
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.db.execute("SELECT used FROM quota WHERE day = ?", (day,)).fetchone()
+            used = row[0] if row else 0
+            if used + units > self.daily_units:
+                self.db.execute("COMMIT")
+                return False
+            self.db.execute("INSERT INTO quota (day, used) VALUES (?, ?) "
+                            "ON CONFLICT(day) DO UPDATE SET used = used + excluded.used", (day, units))
+            self.db.execute("INSERT INTO calls (at, day, call, units) VALUES (?, ?, ?, ?)", (now, day, call, units))
+            self.db.execute("COMMIT")
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+        return True
+
+    def exhaust(self):
+        """The API says the quota is gone (other clients share the project): empty today's bucket"""
+        self.db.execute("INSERT INTO quota (day, used) VALUES (?, ?) "
+                        "ON CONFLICT(day) DO UPDATE SET used = excluded.used", (self.day(), self.daily_units))
+
+
+class UploadScheduler:
+    """
+    Sends uploads while the bucket covers them and holds the rest for the next window.
+    upload: callable(path, title, description, tags) -> video id or None, raising
+    QuotaExceeded when the API refuses for quota reasons.
+    """
+
+    def __init__(self, path, upload, daily_units=DAILY_QUOTA, clock=time.time, max_attempts=3,
+                 sending_seconds=SENDING_SECONDS):
+        self.path = path
+        self.send = upload
+        self.clock = clock
+        self.max_attempts = max_attempts
+        self.sending_seconds = sending_seconds
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self.bucket = QuotaBucket(self._db, daily_units, clock)
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- planning ----------
+    def held(self, reason=None):
+        """Uploads waiting to be sent (only those held for `reason`, e.g. "quota", if given)"""
+        query, params = "SELECT COUNT(*) FROM uploads WHERE state = 'held'", ()
+        if reason is not None:
+            query, params = query + " AND error = ?", (reason,)
+        return self._db.execute(query, params).fetchone()[0]
+
+    def uploads_left(self):
+        """Uploads today's remaining quota still covers, after the ones already held"""
+        return max(0, self.bucket.remaining() // COSTS["videos.insert"] - self.held())
+
+    def renders_worth_starting(self, wanted):
+        """How many of `wanted` renders can be uploaded before the quota resets"""
+        return min(wanted, self.uploads_left())
+
+    def report(self):
+        reset = datetime.fromtimestamp(self.bucket.next_reset(), self.bucket.zone).strftime("%Y-%m-%d %H:%M %Z")
+        return (f"{self.bucket.remaining()}/{self.bucket.daily_units} quota units left, "
+                f"{self.held()} upload(s) held, resets {reset}")
+
+    # ---------- uploads ----------
+    def upload(self, path, title, description, tags):
+        """
+        Upload now if the quota allows (and no older upload is waiting for quota); returns
+        the video id or None if held. Uploads only waiting out a retry don't hold new ones back.
+        """
+        self._reclaim()
+        if self.held():
+            self.drain()
+        if self.held("quota") == 0:
+            video_id, error = self._send(path, title, description, tags)
+            if video_id:
+                return video_id
+        else:
+            error = "quota"
+        self._hold(path, title, description, tags, error)
+        return None
+
+    def drain(self):
+        """Send held uploads that are due while the quota lasts; returns [(path, video id)] sent"""
+        sent = []
+        self._reclaim()
+        while True:
+            row = self._claim()
+            if row is None:
+                break
+            upload_id, path, title, description, tags = row[0], row[1], row[2], row[3], json.loads(row[4])
+            attempts = row[7]
+            if not os.path.exists(path):
+                self._update(upload_id, "failed", error="file missing")
+                continue
+            video_id, error = self._send(path, title, description, tags)
+            if video_id:
+                self._update(upload_id, "done", video_id=video_id)
+                sent.append((path, video_id))
+            elif error == "quota":
+                self._update(upload_id, "held", error="quota", not_before=self.bucket.next_reset())
+                break
+            elif attempts + 1 >= self.max_attempts:
+                self._update(upload_id, "failed", attempts=attempts + 1, error=error)
+            else:
+                self._update(upload_id, "held", attempts=attempts + 1, error=error,
+                             not_before=self.clock() + RETRY_SECONDS)
+        if sent:
+            print(f"📤 Sent {len(sent)} held upload(s) - {self.report()}")
+        return sent
+
+    def _claim(self):
+        """
+        Oldest due held upload, marked 'sending' so no other process sends it too
+        (the row, or None when nothing is due)
+        """
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            row = self._db.execute(
+                "SELECT * FROM uploads WHERE state = 'held' AND not_before <= ? ORDER BY id LIMIT 1",
+                (self.clock(),)).fetchone()
+            if row is not None:
+                claimed = self._db.execute("UPDATE uploads SET state = 'sending', updated = ? "
+                                           "WHERE id = ? AND state = 'held'", (self.clock(), row[0]))
+                if claimed.rowcount != 1:
+                    row = None
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+        return row
+
+    def _reclaim(self):
+        """
+        Hold again uploads left 'sending' by a process that died mid-upload (claimed more
+        than sending_seconds ago); counted as a failed attempt, as the insert may have gone out
+        """
+        stale = self.clock() - self.sending_seconds
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            failed = self._db.execute(
+                "UPDATE uploads SET state = 'failed', attempts = attempts + 1, error = 'interrupted', updated = ? "
+                "WHERE state = 'sending' AND updated < ? AND attempts + 1 >= ?",
+                (self.clock(), stale, self.max_attempts)).rowcount
+            held = self._db.execute(
+                "UPDATE uploads SET state = 'held', attempts = attempts + 1, error = 'interrupted', "
+                "not_before = ?, updated = ? WHERE state = 'sending' AND updated < ?",
+                (self.clock(), self.clock(), stale)).rowcount
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+        if failed or held:
+            print(f"♻️ Reclaimed {failed + held} interrupted upload(s): {held} held again, {failed} given up")
+        return held
+
+    def _send(self, path, title, description, tags):
+        """(video id, None) or (None, 'quota' | error)"""
+        if not self.bucket.take("videos.insert"):
+            return None, "quota"
+        try:
+            video_id = self.send(path, title, description, tags)
+        except QuotaExceeded:
+            self.bucket.exhaust()
+            return None, "quota"
+        # A failed insert is still billed, so the units stay taken
+        return (video_id, None) if video_id else (None, "upload failed")
+
+    def _hold(self, path, title, description, tags, error):
+        now = self.clock()
+        not_before = self.bucket.next_reset() if error == "quota" else now + RETRY_SECONDS
+        self._db.execute(
+            "INSERT INTO uploads (path, title, description, tags, not_before, attempts, error, created, updated) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (path, title, description, json.dumps(tags), not_before, int(error != "quota"), error, now, now))
+        when = datetime.fromtimestamp(not_before, self.bucket.zone).strftime("%Y-%m-%d %H:%M %Z")
+        print(f"⏸️ Upload held until {when} ({'quota used up' if error == 'quota' else error}): {path}")
+
+    def _update(self, upload_id, state, **fields):
+        fields.update(state=state, updated=self.clock())
+        self._db.execute(f"UPDATE uploads SET {', '.join(f'{k} = ?' for k in fields)} WHERE id = ?",
+                         (*fields.values(), upload_id))
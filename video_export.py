@@ -0,0 +1,313 @@
+"""
+Single-pass multi-rendition export.
+The composite is rendered once and its frames are piped into ONE ffmpeg
+process whose `split` filter fans them out to an encoder per output spec
+(upload master, 720p/480p review proxies, ...). Decode + compositing is
+paid once no matter how many files come out.
+Frames reach ffmpeg through a FrameRing drained by a writer thread, so
+compositing frame N+1 overlaps writing frame N; the writer sends memoryviews,
+never a tobytes() copy. The audio mix is rendered and encoded on its own
+thread meanwhile and stream-copied in at the end.
+"""
+
+import os
+import sys
+import copy
+import threading
+import subprocess
+
+import numpy as np
+
+from frame_ring import FrameRing
+import render_profiler
+
+DEFAULT_RING_SLOTS = 3         # Frame being composited + frame being written + one spare
+PIPE_BUFFER_BYTES = 1 << 20    # Linux pipe-max-size default for unprivileged processes
+
+# Named proxy sizes for 9:16 output (width x height)
+RENDITIONS = {
+    "1080p": (1080, 1920),
+    "720p": (720, 1280),
+    "480p": (480, 854),
+}
+
+
+class OutputSpec:
+    """One encoded output: file, size, codec and quality"""
+
+    def __init__(self, path, width=None, height=None, codec="libx264", crf=None,
+                 preset="medium", container=None, audio=True, audio_codec="aac", audio_bitrate="192k"):
+        self.path = path
+        self.width = width    # None = canvas size
+        self.height = height
+        self.codec = codec
+        self.crf = crf
+        self.preset = preset
+        self.container = container  # None = from file extension
+        self.audio = audio
+        self.audio_codec = audio_codec
+        self.audio_bitrate = audio_bitrate
+
+    @classmethod
+    def rendition(cls, base_path, name, **kwargs):
+        """Proxy spec named after the master file, e.g. shorts_x.mp4 -> shorts_x_720p.mp4"""
+        width, height = RENDITIONS[name]
+        root, ext = os.path.splitext(base_path)
+        kwargs.setdefault("crf", 28)
+        kwargs.setdefault("preset", "veryfast")
+        return cls(f"{root}_{name}{ext or '.mp4'}", width, height, **kwargs)
+
+    def __repr__(self):
+        size = f"{self.width}x{self.height}" if self.width else "canvas"
+        return f"OutputSpec({self.path!r}, {size}, {self.codec}, crf={self.crf})"
+
+
+def get_ffmpeg_binary():
+    try:
+        from moviepy.config import get_setting
+        return get_setting("FFMPEG_BINARY")
+    except Exception:
+        return "ffmpeg"
+
+
+def build_ffmpeg_command(size, fps, outputs, audio_path=None, threads=4):
+    """ffmpeg command reading raw RGB frames on stdin and writing every output spec"""
+    width, height = size
+    cmd = [
+        get_ffmpeg_binary(), "-y", "-loglevel", "error",
+        "-f", "rawvideo", "-vcodec", "rawvideo", "-s", f"{width}x{height}",
+        "-pix_fmt", "rgb24", "-r", f"{fps:.02f}", "-i", "-",
+    ]
+    if audio_path:
+        cmd += ["-i", audio_path]
+
+    # [0:v] split into one branch per output, scaled where the spec asks for it
+    labels = [f"v{i}" for i in range(len(outputs))]
+    graph = [f"[0:v]split={len(outputs)}" + "".join(f"[{label}]" for label in labels)]
+    out_labels = []
+    for i, spec in enumerate(outputs):
+        if spec.width and spec.height and (spec.width, spec.height) != (width, height):
+            graph.append(f"[{labels[i]}]scale={spec.width}:{spec.height}:flags=lanczos[o{i}]")
+            out_labels.append(f"[o{i}]")
+        else:
+            out_labels.append(f"[{labels[i]}]")
+    cmd += ["-filter_complex", ";".join(graph)]
+
+    for spec, label in zip(outputs, out_labels):
+        cmd += ["-map", label, "-c:v", spec.codec, "-pix_fmt", "yuv420p", "-threads", str(threads)]
+        if spec.codec in ("libx264", "libx265"):
+            cmd += ["-preset", spec.preset]
+        if spec.crf is not None:
+            cmd += ["-crf", str(spec.crf)]
+        if audio_path and spec.audio:
+            cmd += ["-map", "1:a", "-c:a", spec.audio_codec, "-b:a", spec.audio_bitrate, "-shortest"]
+        container = spec.container or os.path.splitext(spec.path)[1].lstrip(".").lower()
+        if container in ("mp4", "mov"):
+            cmd += ["-movflags", "+faststart"]
+        if spec.container:
+            cmd += ["-f", spec.container]
+        cmd.append(spec.path)
+    return cmd
+
+
+def grow_pipe(pipe, size=PIPE_BUFFER_BYTES):
+    """Enlarge the kernel buffer of a pipe (Linux only, best effort): fewer writer/ffmpeg wakeups per frame"""
+    try:
+        import fcntl
+        fcntl.fcntl(pipe.fileno(), getattr(fcntl, "F_SETPIPE_SZ", 1031), size)
+        return True
+    except (ImportError, OSError, ValueError):
+        return False
+
+
+def build_mux_command(video_path, audio_path, spec):
+    """ffmpeg command stream-copying an encoded video and audio track into spec.path"""
+    cmd = [
+        get_ffmpeg_binary(), "-y", "-loglevel", "error", "-i", video_path, "-i", audio_path,
+        "-map", "0:v", "-map", "1:a", "-c", "copy", "-shortest",
+    ]
+    container = spec.container or os.path.splitext(spec.path)[1].lstrip(".").lower()
+    if container in ("mp4", "mov"):
+        cmd += ["-movflags", "+faststart"]
+    if spec.container:
+        cmd += ["-f", spec.container]
+    cmd.append(spec.path)
+    return cmd
+
+
+def export_video(clip, outputs, fps=30, audio=True, threads=4, temp_folder="temp",
+                 ring_slots=None, audio_buffersize=2000, parallel_audio=True):
+    """
+    Render `clip` once and encode it to every OutputSpec in `outputs`.
+    ring_slots: frames in flight between the compositor and the writer thread
+    (None = DEFAULT_RING_SLOTS, 0 = write synchronously on the render thread).
+    audio_buffersize: audio samples rendered per block.
+    parallel_audio: mix + encode the audio on a worker thread while the video
+    encodes, then stream-copy mux; False mixes a WAV first and encodes both in one ffmpeg.
+    Returns the list of written paths (raises IOError if ffmpeg fails).
+    """
+    for spec in outputs:
+        os.makedirs(os.path.dirname(spec.path) or ".", exist_ok=True)
+
+    if not (audio and clip.audio is not None and any(spec.audio for spec in outputs)):
+        _encode_video(clip, fps, outputs, None, threads, ring_slots)
+    elif parallel_audio:
+        _export_with_audio_worker(clip, outputs, fps, threads, temp_folder, ring_slots, audio_buffersize)
+    else:
+        os.makedirs(temp_folder, exist_ok=True)
+        root = os.path.splitext(os.path.basename(outputs[0].path))[0]
+        audio_path = os.path.join(temp_folder, f"{root}_audio.wav")
+        print("🎵 Rendering audio mix...")
+        try:
+            clip.audio.write_audiofile(audio_path, fps=44100, codec="pcm_s16le",
+                                       buffersize=audio_buffersize, logger=None)
+            _encode_video(clip, fps, outputs, audio_path, threads, ring_slots)
+        finally:
+            if os.path.exists(audio_path):
+                os.remove(audio_path)
+
+    for spec in outputs:
+        print(f"✅ Wrote {spec.path}")
+    return [spec.path for spec in outputs]
+
+
+def _export_with_audio_worker(clip, outputs, fps, threads, temp_folder, ring_slots, audio_buffersize):
+    """
+    Audio off the critical path: one thread renders the mix straight into each
+    distinct audio encoding while the video-only encode runs, then every output
+    is a stream-copy mux of the two (no re-encode).
+    """
+    os.makedirs(temp_folder, exist_ok=True)
+    root = os.path.splitext(os.path.basename(outputs[0].path))[0]
+    tracks = {}
+    video_outputs = []
+    for i, spec in enumerate(outputs):
+        if not spec.audio:
+            video_outputs.append(spec)
+            continue
+        key = (spec.audio_codec, spec.audio_bitrate)
+        if key not in tracks:
+            ext = ".m4a" if spec.audio_codec == "aac" else ".mka"
+            tracks[key] = os.path.join(temp_folder, f"{root}_audio{len(tracks)}{ext}")
+        video_spec = copy.copy(spec)
+        video_spec.path = os.path.join(temp_folder, f"{root}_video{i}.mkv")
+        video_spec.container = None
+        video_spec.audio = False
+        video_outputs.append(video_spec)
+
+    errors = []
+
+    def render_audio():
+        try:
+            for (codec, bitrate), path in tracks.items():
+                clip.audio.write_audiofile(path, fps=44100, codec=codec, bitrate=bitrate,
+                                           buffersize=audio_buffersize, logger=None)
+        except Exception as e:
+            errors.append(e)
+
+    worker = threading.Thread(target=render_audio, name="audio-render", daemon=True)
+    print("🎵 Rendering audio mix alongside the video...")
+    worker.start()
+    try:
+        _encode_video(clip, fps, video_outputs, None, threads, ring_slots)
+        worker.join()
+        if errors:
+            raise IOError(f"audio render failed: {errors[0]}")
+        for spec, video_spec in zip(outputs, video_outputs):
+            if video_spec is spec:
+                continue
+            audio_path = tracks[(spec.audio_codec, spec.audio_bitrate)]
+            result = subprocess.run(build_mux_command(video_spec.path, audio_path, spec),
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+            if result.returncode != 0:
+                raise IOError(f"ffmpeg mux failed: {result.stderr.decode('utf8', errors='ignore').strip()}")
+    finally:
+        worker.join()
+        temps = list(tracks.values()) + [v.path for s, v in zip(outputs, video_outputs) if v is not s]
+        for path in temps:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def _encode_video(clip, fps, outputs, audio_path, threads, ring_slots):
+    """Pipe the rendered frames into one ffmpeg writing every spec (raises IOError if it fails)"""
+    cmd = build_ffmpeg_command(clip.size, fps, outputs, audio_path, threads)
+    print(f"💾 Encoding {len(outputs)} output(s) from one render pass...")
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                            bufsize=PIPE_BUFFER_BYTES)
+    grow_pipe(proc.stdin)
+    profiler = render_profiler.active()
+    if ring_slots is None:
+        ring_slots = DEFAULT_RING_SLOTS
+    try:
+        if hasattr(clip, "write_frames"):
+            clip.write_frames(proc.stdin)  # Rendered elsewhere, e.g. stage_pipeline.StagePipeline
+        elif ring_slots:
+            _write_frames_ring(clip, fps, proc.stdin, ring_slots, profiler)
+        else:
+            write = proc.stdin.write
+            if profiler is not None:
+                write = profiler.timed(write, "pipe_write")
+            for frame in clip.iter_frames(fps=fps, dtype="uint8"):
+                write(frame.tobytes())
+    except (BrokenPipeError, IOError):
+        pass  # ffmpeg died - its stderr explains why
+    finally:
+        try:
+            proc.stdin.close()
+        except (BrokenPipeError, IOError):
+            pass
+        stderr = proc.stderr.read().decode("utf8", errors="ignore")
+        proc.wait()
+
+    if proc.returncode != 0:
+        raise IOError(f"ffmpeg encode failed: {stderr.strip()}")
+
+
+def _write_frames_ring(clip, fps, pipe, slots, profiler=None):
+    """
+    Composite into a fixed FrameRing while a writer thread drains it into the ffmpeg pipe.
+    A frame only this loop references (the compositor's fresh output) is queued
+    by reference; shared arrays (reader caches, constant clips) are copied into a slot.
+    """
+    ring = FrameRing((clip.h, clip.w, 3), slots)
+    errors = []
+    write, put = pipe.write, ring.put
+    if profiler is not None:
+        write = profiler.timed(write, "pipe_write")
+        put = profiler.timed(put, "ring_put")  # includes waiting for a free slot
+
+    def writer():
+        while True:
+            index = ring.get()
+            if index is None:
+                return
+            try:
+                if not errors:
+                    write(ring.view(index))
+            except (BrokenPipeError, IOError) as e:
+                errors.append(e)
+            finally:
+                ring.release(index)
+
+    thread = threading.Thread(target=writer, name="ffmpeg-writer", daemon=True)
+    thread.start()
+    try:
+        # Same timestamps as clip.iter_frames, without a generator holding on to each frame
+        for t in np.arange(0, clip.duration, 1.0 / fps):
+            if errors:
+                break
+            frame = clip.get_frame(t)
+            if frame.dtype != np.uint8:
+                frame = frame.astype(np.uint8)
+            # getrefcount sees `frame` and its own argument: 2 means no one else holds this array object.
+            # A view (e.g. a slice of a cached frame) shares its base's memory, so it must own its data too
+            owned = (sys.getrefcount(frame) == 2 and frame.flags.owndata and frame.flags.c_contiguous
+                     and frame.shape == ring.shape)
+            put(frame, owned=owned)
+            del frame  # the ring holds it now
+    finally:
+        ring.close()
+        thread.join()
+    if errors:
+        raise errors[0]
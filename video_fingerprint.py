@@ -0,0 +1,211 @@
+"""
+Perceptual source fingerprints.
+The download archive only knows video IDs, so a clip re-uploaded under a new
+ID was downloaded, rendered and uploaded again. Here a source is reduced to
+the 64-bit DCT perceptual hashes of a few frames sampled at 32x32 grayscale
+(survives re-encoding, rescaling, small crops and brightness changes), and
+every hash ever accepted goes into a multi-index hash table: each hash is
+split into four 16-bit chunks, and two hashes within distance r must agree on
+at least one chunk to within r // 4 bits, so a lookup only probes a few
+hundred buckets (binary searches in sorted numpy tables) instead of scanning
+everything. A new source whose sampled
+frames mostly match one stored source is a near-duplicate.
+"""
+
+import os
+import json
+import time
+import subprocess
+from itertools import combinations
+
+import numpy as np
+
+from video_export import get_ffmpeg_binary
+
+HASH_SIZE = 32   # Frames are hashed from a 32x32 grayscale thumbnail
+LOW_FREQ = 8     # 8x8 lowest DCT frequencies -> 64 bits
+CHUNKS = 4       # 16-bit chunks in the multi-index table
+CHUNK_BITS = 64 // CHUNKS
+CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+
+def _dct_matrix(n):
+    k = np.arange(n)[:, None]
+    matrix = np.cos(np.pi * (2 * np.arange(n)[None, :] + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+
+_DCT = _dct_matrix(HASH_SIZE)
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+_BYTE_BITS = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount(values):
+    """Set bits per element of a uint64 array"""
+    if hasattr(np, "bitwise_count"):  # numpy >= 2.0
+        return np.bitwise_count(values)
+    return _BYTE_BITS[values.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def frame_phash(gray):
+    """64-bit pHash of a 32x32 grayscale frame; None for (nearly) flat frames, which match anything"""
+    gray = np.asarray(gray, dtype=np.float64)
+    if gray.std() < 2:
+        return None
+    low = (_DCT @ gray @ _DCT.T)[:LOW_FREQ, :LOW_FREQ].ravel()
+    return int.from_bytes(np.packbits(low > np.median(low)).tobytes(), "big")
+
+
+def video_phash(path, samples=8, duration=None):
+    """pHashes of `samples` frames spread evenly over the video, from one decode pass (flat frames are skipped)"""
+    if duration is None:
+        from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+        duration = ffmpeg_parse_infos(path).get("duration") or 0
+    if duration <= 0:
+        return []
+    step = duration / samples
+    cmd = [get_ffmpeg_binary(), "-v", "error", "-ss", f"{step / 2:.3f}", "-i", path, "-an", "-sn",
+           "-vf", f"fps=1/{step:.4f},scale={HASH_SIZE}:{HASH_SIZE}:flags=area,format=gray",
+           "-frames:v", str(samples), "-f", "rawvideo", "-"]
+    raw = subprocess.run(cmd, capture_output=True, check=False).stdout
+    frames = np.frombuffer(raw, dtype=np.uint8)[:len(raw) // HASH_SIZE ** 2 * HASH_SIZE ** 2]
+    hashes = [frame_phash(frame) for frame in frames.reshape(-1, HASH_SIZE, HASH_SIZE)]
+    return [value for value in hashes if value is not None]
+
+
+# ==================== INDEX ====================
+class HashIndex:
+    """Multi-index hash table over 64-bit hashes for Hamming radius queries"""
+
+    REBUILD_AFTER = 4096  # Hashes added since the last table build are checked directly until then
+
+    def __init__(self, radius=10):
+        self.radius = radius
+        self.hashes = []
+        self.owners = []
+        self._built = 0      # hashes[:_built] are in the sorted tables below
+        self._array = None   # those hashes as uint64
+        self._keys = None    # sorted (chunk << CHUNK_BITS | chunk value) of every built hash, all chunks together
+        self._order = None   # hash index for each entry of _keys
+        # Bit flips to try per chunk: by pigeonhole one chunk is within radius // CHUNKS
+        flips = []
+        for bits in range(radius // CHUNKS + 1):
+            for positions in combinations(range(CHUNK_BITS), bits):
+                flips.append(sum(1 << p for p in positions))
+        self._flips = np.array(flips, dtype=np.uint32)
+        self._chunk_ids = np.arange(CHUNKS, dtype=np.uint32) << CHUNK_BITS
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def add(self, value, owner):
+        self.hashes.append(value)
+        self.owners.append(owner)
+
+    def _chunks(self, values):
+        """(n, CHUNKS) table keys of uint64 hashes"""
+        shifts = (np.arange(CHUNKS, dtype=np.uint64) * CHUNK_BITS)[None, :]
+        chunks = (values[:, None] >> shifts) & np.uint64(CHUNK_MASK)
+        return chunks.astype(np.uint32) | self._chunk_ids
+
+    def _build(self):
+        self._array = np.array(self.hashes, dtype=np.uint64)
+        keys = self._chunks(self._array).ravel()
+        order = np.argsort(keys, kind="stable")
+        self._keys = keys[order]
+        self._order = (order // CHUNKS).astype(np.int32)
+        self._built = len(self.hashes)
+
+    def query(self, value, radius=None):
+        """{owner: best distance} for stored hashes within `radius` bits of value"""
+        radius = self.radius if radius is None else min(radius, self.radius)
+        if len(self.hashes) - self._built > self.REBUILD_AFTER or (self._built == 0 and self.hashes):
+            self._build()
+        found = {}
+        if self._built:
+            # Probe every bucket within radius // CHUNKS bits of each chunk in one searchsorted
+            chunks = self._chunks(np.array([value], dtype=np.uint64))[0]
+            probes = (chunks[:, None] ^ self._flips[None, :]).ravel()
+            lo = np.searchsorted(self._keys, probes, side="left")
+            sizes = np.searchsorted(self._keys, probes, side="right") - lo
+            total = int(sizes.sum())
+            if total:
+                ends = np.cumsum(sizes)
+                positions = np.arange(total) + np.repeat(lo - (ends - sizes), sizes)
+                candidates = self._order[positions]
+                distances = popcount(self._array[candidates] ^ np.uint64(value))
+                close = distances <= radius
+                for i, distance in zip(candidates[close].tolist(), distances[close].tolist()):
+                    owner = self.owners[i]
+                    found[owner] = min(distance, found.get(owner, distance))
+        for i in range(self._built, len(self.hashes)):
+            distance = hamming(self.hashes[i], value)
+            if distance <= radius:
+                owner = self.owners[i]
+                found[owner] = min(distance, found.get(owner, distance))
+        return found
+
+
+class SourceFingerprints:
+    """Persistent near-duplicate index of every source used (JSONL, appended, loaded once)"""
+
+    def __init__(self, path, radius=10, min_share=0.5, samples=8):
+        self.path = path
+        self.samples = samples
+        self.min_share = min_share
+        self.index = HashIndex(radius)
+        self.sources = 0
+        if os.path.exists(path):
+            self._load()
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    continue  # Torn last line from a crash
+                for value in row.get("hashes", []):
+                    self.index.add(int(value, 16), row["key"])
+                self.sources += 1
+
+    def match(self, hashes):
+        """Key of the stored source most of these frame hashes match, or None"""
+        if not hashes:
+            return None
+        votes = {}
+        for value in hashes:
+            for owner in self.index.query(value):
+                votes[owner] = votes.get(owner, 0) + 1
+        needed = max(2, int(np.ceil(len(hashes) * self.min_share))) if len(hashes) > 1 else 1
+        best = max(votes.items(), key=lambda item: item[1], default=(None, 0))
+        return best[0] if best[1] >= needed else None
+
+    def find_duplicate(self, path):
+        """(duplicate key or None, hashes of path) - hashes can be passed to add() afterwards"""
+        start = time.perf_counter()
+        hashes = video_phash(path, self.samples)
+        duplicate = self.match(hashes)
+        print(f"🔎 Fingerprinted {os.path.basename(path)} in {(time.perf_counter() - start) * 1000:.0f} ms "
+              f"against {self.sources} source(s)")
+        return duplicate, hashes
+
+    def add(self, key, hashes):
+        if not hashes:
+            return
+        for value in hashes:
+            self.index.add(value, key)
+        self.sources += 1
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"key": key, "hashes": [f"{value:016x}" for value in hashes],
+                                "added": int(time.time())}) + "\n")
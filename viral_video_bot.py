@@ -6,18 +6,31 @@ Description: Automatically creates reaction shorts with anti-copyright transform
 
 import os
 import random
+import hashlib
 import subprocess
-import asyncio
 from pathlib import Path
-from moviepy.editor import (
-    VideoFileClip, AudioFileClip, CompositeVideoClip, 
-    CompositeAudioClip, TextClip, ColorClip
-)
-from moviepy.video.fx.all import mirror_x, colorx
-import edge_tts
 import argparse
 import sys
-from youtube_uploader import upload_video
+# moviepy, edge_tts and the YouTube client are imported by the stage that needs
+# them, so --help or a run that fails early doesn't pay for loading them
+from render_layout import Zone, fit_size, get_profile, write_contact_sheet
+from frame_resize import resize_clip
+from frame_transform import TransformChain
+from video_export import OutputSpec, export_video
+from frame_ring import ring_slots_for_budget, peak_rss_mb
+from download_formats import format_args, report_bytes_saved, info_json_path, required_resolution, DEFAULT_ASPECT
+from job_queue import JobQueue, JobDropped, enqueue_file, print_status, run_workers
+from render_profiler import RenderProfiler, instrument
+from read_ahead import read_ahead
+from video_fingerprint import SourceFingerprints
+from workspace import Workspace
+from template_zones import TemplateZones
+from clip_window import SourceWindows
+from upload_scheduler import UploadScheduler
+from tts_stream import VoiceoverStream, start_voiceover
+from stage_pipeline import StagePipeline, Input, Layer
+from render_planner import (probe_media, assumed_source, layer, audio_track, output, make_plan,
+                            load_calibration, fit_budget, apply_downgrades, print_plan)
 
 # ==================== CONFIGURATION ====================
 class Config:
@@ -40,6 +53,51 @@ class Config:
     CONTENT_ZONE_Y = 850      # Vertical start of the black area (approx 45% down)
     CONTENT_ZONE_HEIGHT = 1070 # Height of black area (1920 - 850)
     CONTENT_ZONE_WIDTH = 1080  # Full width
+    # Same zone as a fraction of the canvas - used for every render profile
+    CONTENT_ZONE = Zone.from_pixels(0, CONTENT_ZONE_Y, CONTENT_ZONE_WIDTH, CONTENT_ZONE_HEIGHT,
+                                    CANVAS_WIDTH, CANVAS_HEIGHT)
+    # Each template's own black area is detected once and cached here (CONTENT_ZONE is the fallback)
+    TEMPLATE_INDEX = "assets/reactions/template_index.json"
+    
+    # Render profile: "final" (1080x1920) or "preview" (540x960, ultrafast, no audio)
+    RENDER_PROFILE = "final"
+    # Extra proxy files encoded from the same render pass, e.g. ["720p", "480p"]
+    PROXY_RENDITIONS = []
+    
+    # Streaming mode (bounded memory for long / 4K sources) - None = off
+    MEMORY_CEILING_MB = None
+    STREAM_AUDIO_BLOCK = 44100  # Audio samples read per block (1s)
+    READ_AHEAD_FRAMES = 4       # Frames decoded ahead per input clip on a background thread (0 = off)
+    PIPELINE_RENDER = False     # EXPERIMENTAL, keep off: decode, transform and composite in separate processes
+                                # (0.90x on 1 core; no 2/4/8-core numbers yet - see benchmarks/bench_stage_pipeline.py)
+    PIPELINE_SLOTS = 4          # Shared-memory frame slots per stage ring in pipeline mode
+    FINGERPRINT_INDEX = "source_fingerprints.jsonl"  # Perceptual hashes of every source used (re-upload check)
+    FINGERPRINT_RADIUS = 10     # Max differing bits (of 64) for a frame to count as the same
+    AUTO_ATTEMPTS = 3           # Search results auto mode downloads before giving up on re-uploads
+    WINDOW_INDEX = "source_windows.json"  # Per-second motion/audio activity of long sources (best window)
+    
+    # Workspace (downloads/ + temp/ + output/ kept under a disk budget, least recently used first)
+    WORKSPACE_LEDGER = "workspace.db"
+    WORKSPACE_BUDGET_MB = 10240
+    WORKSPACE_LEASE_SECONDS = 3 * 3600  # Files a crashed run was using become evictable after this
+    
+    # Uploads (held for the next quota window once the daily YouTube API quota is used up)
+    UPLOAD_DB = "uploads.db"
+    YOUTUBE_DAILY_QUOTA = 10000
+    
+    # Job queue (--enqueue / --work)
+    QUEUE_DB = "jobs.db"
+    QUEUE_LEASE_SECONDS = 900  # A crashed worker's job is picked up again after this
+    QUEUE_MAX_ATTEMPTS = 3
+    
+    # Render budget (--plan / auto mode): jobs estimated over this are downgraded or dropped
+    RENDER_CALIBRATION = "render_calibration.json"  # Written by benchmarks/bench_render_cost.py
+    RENDER_BUDGET_SECONDS = 1800
+    MAX_VIDEO_DURATION = 60
+    TTS_CHARS_PER_SECOND = 14  # Voiceover length estimate for plans
+    
+    # Profiling (--profile)
+    PROFILE_FOLDER = "profiles"
     
     # Effects
     BRIGHTNESS_FACTOR = 1.1
@@ -70,6 +128,58 @@ def create_folders():
         Path(folder).mkdir(parents=True, exist_ok=True)
     print("✅ Folders created successfully")
 
+_workspace = None
+
+def get_workspace():
+    """This process's Workspace (queue workers each open their own ledger connection)"""
+    global _workspace
+    if _workspace is None or _workspace.pid != os.getpid():
+        _workspace = Workspace(Config.WORKSPACE_LEDGER,
+                               [Config.DOWNLOADS_FOLDER, Config.TEMP_FOLDER, Config.OUTPUT_FOLDER],
+                               Config.WORKSPACE_BUDGET_MB, scratch_root=Config.TEMP_FOLDER,
+                               lease_seconds=Config.WORKSPACE_LEASE_SECONDS)
+    return _workspace
+
+def upload_scheduler():
+    """Quota-aware uploads (use as a context manager)"""
+    def send(path, title, description, tags):
+        from youtube_uploader import upload_video
+        return upload_video(path, title, description, tags)
+    return UploadScheduler(Config.UPLOAD_DB, send, Config.YOUTUBE_DAILY_QUOTA)
+
+def drain_held_uploads(scheduler):
+    """Send uploads held from earlier runs; sent renders may be evicted again"""
+    for path, _ in scheduler.drain():
+        get_workspace().pin(path, False)
+
+def upload_or_pin(path, title, description, tags):
+    """
+    Upload a render through the quota scheduler. One that was held (quota used
+    up, or a failed attempt) is pinned so the disk budget never evicts it first.
+    """
+    workspace = get_workspace()
+    with upload_scheduler() as scheduler, workspace.in_use(path):
+        video_id = scheduler.upload(path, title, description, tags)
+        print(f"📊 {scheduler.report()}")
+    if not video_id:
+        workspace.pin(path)
+    return video_id
+
+def source_format_args():
+    """yt-dlp format args sized for the content zone (template mode drops the source audio)"""
+    _, _, zone_w, zone_h = Config.CONTENT_ZONE.to_pixels(Config.CANVAS_WIDTH, Config.CANVAS_HEIGHT)
+    return format_args(zone_w, zone_h, "contain", need_audio=False)
+
+def source_key(path):
+    """Video ID from the yt-dlp info JSON next to a download, else a content hash of the file"""
+    import json
+    try:
+        with open(info_json_path(path), "r", encoding="utf-8") as f:
+            return json.load(f)["id"]
+    except (OSError, ValueError, KeyError):
+        with open(path, "rb") as f:
+            return hashlib.md5(f.read(1 << 20)).hexdigest()
+
 def download_video(url, output_path):
     """Download video using yt-dlp with no watermark"""
     try:
@@ -78,7 +188,7 @@ def download_video(url, output_path):
         # yt-dlp command using python module to avoid PATH issues
         command = [
             sys.executable, "-m", "yt_dlp",
-            "-f", "best",
+            *source_format_args(),
             "--no-warnings",
             "--no-playlist",
             "-o", output_path,
@@ -89,6 +199,8 @@ def download_video(url, output_path):
         
         if os.path.exists(output_path):
             print(f"✅ Video downloaded: {output_path}")
+            report_bytes_saved(output_path)
+            get_workspace().track(output_path)
             return output_path
         else:
             print("❌ Download failed - file not created")
@@ -119,159 +231,199 @@ def get_random_file(folder, extensions=[".mp4", ".mov", ".avi", ".mp3", ".wav",
         print(f"❌ Error reading folder {folder}: {str(e)}")
         return None
 
-async def generate_voiceover(text, output_path, language="hindi"):
-    """Generate TTS voiceover using edge-tts"""
-    try:
-        print(f"🎙️ Generating voiceover: {text[:50]}...")
-        
-        voice = Config.TTS_VOICE_HINDI if language == "hindi" else Config.TTS_VOICE_ENGLISH
-        
-        communicate = edge_tts.Communicate(text, voice)
-        await communicate.save(output_path)
-        
-        print(f"✅ Voiceover saved: {output_path}")
-        return output_path
-    except Exception as e:
-        print(f"❌ TTS error: {str(e)}")
+def generate_voiceover(text, language="hindi"):
+    """Start streaming a TTS voiceover with edge-tts (decoded in memory while the video loads)"""
+    if not get_profile(Config.RENDER_PROFILE).audio:
         return None
+    voice = Config.TTS_VOICE_HINDI if language == "hindi" else Config.TTS_VOICE_ENGLISH
+    return start_voiceover(text, voice)
 
 # ==================== VIDEO PROCESSING ====================
-def apply_anti_copyright_effects(video_clip):
-    """Apply transformations to avoid copyright detection"""
+def apply_anti_copyright_effects(chain):
+    """Add transformations to avoid copyright detection to a source TransformChain"""
     try:
         print("🎨 Applying anti-copyright effects...")
-        video_clip = mirror_x(video_clip)
-        video_clip = colorx(video_clip, Config.BRIGHTNESS_FACTOR)
+        chain = chain.mirror_x().colorx(Config.BRIGHTNESS_FACTOR)
         print("✅ Effects applied")
-        return video_clip
+        return chain
     except Exception as e:
         print(f"❌ Effects error: {str(e)}")
-        return video_clip
+        return chain
 
-def resize_to_fit_zone(video_clip, zone_width, zone_height):
-    """Resize video to fit INSIDE the boolean zone (like CSS object-fit: contain)"""
+def resize_to_fit_zone(chain, zone_width, zone_height):
+    """Add a resize to fit INSIDE the boolean zone (like CSS object-fit: contain) to a TransformChain"""
     try:
-        # Calculate aspect ratios
-        video_ratio = video_clip.w / video_clip.h
-        zone_ratio = zone_width / zone_height
-        
-        if video_ratio > zone_ratio:
-            # Video is wider than zone - fit to width
-            new_width = zone_width
-            new_height = int(zone_width / video_ratio)
-        else:
-            # Video is taller than zone - fit to height
-            new_height = zone_height
-            new_width = int(zone_height * video_ratio)
-            
-        video_clip = video_clip.resize(newsize=(new_width, new_height))
-        
-        # Center in zone
-        x_offset = (zone_width - new_width) // 2
-        y_offset = (zone_height - new_height) // 2
-        
-        return video_clip, x_offset, y_offset
+        new_width, new_height, x_offset, y_offset = fit_size(
+            chain.w, chain.h, zone_width, zone_height, "contain"
+        )
+        chain = chain.resize((new_width, new_height))
+        return chain, x_offset, y_offset
     except Exception as e:
         print(f"❌ Resize error: {str(e)}")
-        return video_clip, 0, 0
+        return chain, 0, 0
+
+def decode_size_for_zone(video_path, zone_width, zone_height):
+    """(height, width) to decode a source at so it still covers the zone - None if already small enough"""
+    try:
+        from moviepy.video.io.ffmpeg_reader import ffmpeg_parse_infos
+        src_w, src_h = ffmpeg_parse_infos(video_path)["video_size"]
+        cover_w, cover_h, _, _ = fit_size(src_w, src_h, zone_width, zone_height, "cover")
+        if cover_w >= src_w:
+            return None
+        return (cover_h, cover_w)
+    except Exception as e:
+        print(f"⚠️ Could not probe {video_path}: {e}")
+        return None
+
+def report_peak_memory():
+    """Print peak RSS of this process and of its ffmpeg children against the ceiling"""
+    own, children = peak_rss_mb(), peak_rss_mb(children=True)
+    if own is None:
+        return
+    print(f"📊 Peak RSS: {own:.0f} MB (ffmpeg children: {children:.0f} MB), ceiling {Config.MEMORY_CEILING_MB} MB")
+    if own > Config.MEMORY_CEILING_MB:
+        print("⚠️ Peak memory went over the configured ceiling!")
+
+def default_outputs(output_path, profile):
+    """Master at the profile's preset plus the configured proxy renditions"""
+    outputs = [OutputSpec(output_path, preset=profile.preset)]
+    outputs += [OutputSpec.rendition(output_path, name) for name in Config.PROXY_RENDITIONS]
+    return outputs
 
 def process_video(source_video_path, reaction_video_path, music_path, 
-                 voiceover_path, output_path):
-    """Main video processing function"""
+                 voiceover, output_path, profile=None, outputs=None, max_duration=None):
+    """
+    Main video processing function (outputs: list of OutputSpec, all encoded from one render).
+    voiceover: a VoiceoverStream (mixed while it is still being synthesised) or an audio file path.
+    max_duration: shorter cut than MAX_VIDEO_DURATION (set when the render budget downgrades a job).
+    """
     try:
+        from moviepy.editor import VideoFileClip, AudioFileClip, CompositeVideoClip, CompositeAudioClip
+        
+        profile = profile or get_profile(Config.RENDER_PROFILE)
+        if outputs is None:
+            outputs = default_outputs(output_path, profile)
+        output_path = outputs[0].path
+        canvas_w, canvas_h = profile.width, profile.height
+        
         print("\n" + "="*50)
-        print("🎬 Starting video processing (Template Mode)...")
+        print(f"🎬 Starting video processing (Template Mode, {profile.name} {canvas_w}x{canvas_h})...")
         print("="*50)
         
+        # Streaming mode: decode already downscaled, small audio blocks, fixed frame ring
+        streaming = Config.MEMORY_CEILING_MB is not None
+        audio_block = Config.STREAM_AUDIO_BLOCK if streaming else 200000
+        if streaming:
+            print(f"🌊 Streaming mode (memory ceiling {Config.MEMORY_CEILING_MB} MB)")
+        
+        zone = TemplateZones(Config.TEMPLATE_INDEX).zone(reaction_video_path, Config.CONTENT_ZONE)
+        zone_x, zone_y, zone_w, zone_h = zone.to_pixels(canvas_w, canvas_h)
+        
         # 1. Load the Reaction Template (The Base)
         print("📂 Loading reaction template...")
-        template_clip = VideoFileClip(reaction_video_path)
+        template_clip = VideoFileClip(
+            reaction_video_path,
+            target_resolution=(canvas_h, canvas_w) if streaming else None,
+            audio_buffersize=audio_block
+        )
+        read_ahead(template_clip, Config.READ_AHEAD_FRAMES)
         # Resize template to ensure it matches canvas if not already
-        if template_clip.w != Config.CANVAS_WIDTH or template_clip.h != Config.CANVAS_HEIGHT:
-             print(f"⚠️ Resizing template from {template_clip.size} to {Config.CANVAS_WIDTH}x{Config.CANVAS_HEIGHT}")
-             template_clip = template_clip.resize(newsize=(Config.CANVAS_WIDTH, Config.CANVAS_HEIGHT))
+        if template_clip.w != canvas_w or template_clip.h != canvas_h:
+             print(f"⚠️ Resizing template from {template_clip.size} to {canvas_w}x{canvas_h}")
+             template_clip = resize_clip(template_clip, (canvas_w, canvas_h))
         
         # 2. Load and Process Source Video (The Viral Content)
         print("📂 Loading source video...")
-        source_clip = VideoFileClip(source_video_path)
+        if streaming:
+            # Never decode more pixels than the zone's cover fill needs
+            source_clip = VideoFileClip(source_video_path, audio=False,
+                                        target_resolution=decode_size_for_zone(source_video_path, zone_w, zone_h))
+        else:
+            source_clip = VideoFileClip(source_video_path)
+        read_ahead(source_clip, Config.READ_AHEAD_FRAMES)
         
         # Determine duration (Template dictates length usually, or shortest)
-        min_duration = min(template_clip.duration, source_clip.duration, 60)
+        min_duration = min(template_clip.duration, source_clip.duration, max_duration or Config.MAX_VIDEO_DURATION)
         
         # TRIM LOGIC: Keep the END of the template (User Request)
+        start_time = 0
         if template_clip.duration > min_duration:
             start_time = template_clip.duration - min_duration
             template_clip = template_clip.subclip(start_time, template_clip.duration)
         else:
             template_clip = template_clip.subclip(0, min_duration)
             
-        source_clip = source_clip.subclip(0, min_duration)
+        # Long sources contribute their most active stretch, not just their first seconds
+        start, end = SourceWindows(Config.WINDOW_INDEX).window(source_video_path, min_duration, source_clip.duration)
+        source_clip = source_clip.subclip(start, end)
         
         # Apply anti-copyright to source ONLY
-        source_clip = apply_anti_copyright_effects(source_clip)
+        # (described as one TransformChain per layer, run as a single pass per frame)
         source_clip = source_clip.without_audio() # Usually remove source audio for voiceover
+        source_chain = apply_anti_copyright_effects(TransformChain.for_clip(source_clip))
         
         # 3. Position Source Video in the "Black Zone"
         print("📐 Positioning video in black zone...")
         
-        zone_w = Config.CONTENT_ZONE_WIDTH
-        zone_h = Config.CONTENT_ZONE_HEIGHT
-        
         # --- A. Create Background Fill (To hide black bars) ---
         # Resize to COVER the zone (fills gaps)
-        bg_fill = source_clip.resize(height=zone_h)
-        if bg_fill.w < zone_w:
-            bg_fill = source_clip.resize(width=zone_w)
+        cover_w, cover_h, cover_x, cover_y = fit_size(source_chain.w, source_chain.h, zone_w, zone_h, "cover")
+        bg_chain = source_chain.resize((cover_w, cover_h))
         
         # Center crop the background
-        bg_fill = bg_fill.crop(x1=bg_fill.w/2 - zone_w/2, 
-                             x2=bg_fill.w/2 + zone_w/2,
-                             y1=bg_fill.h/2 - zone_h/2, 
-                             y2=bg_fill.h/2 + zone_h/2)
+        bg_chain = bg_chain.crop(x1=-cover_x, y1=-cover_y, width=zone_w, height=zone_h)
                              
         # Darken background to make foreground pop
-        bg_fill = colorx(bg_fill, 0.3) 
-        bg_fill = bg_fill.set_position((0, Config.CONTENT_ZONE_Y))
+        bg_chain = bg_chain.colorx(0.3)
+        bg_fill = bg_chain.apply(source_clip, "bg_fill").set_position((zone_x, zone_y))
 
         # --- B. Create Foreground Video (The main content) ---
         # Resize source to fit in the defined content zone (Contain)
-        source_resized, x_off, y_off = resize_to_fit_zone(
-            source_clip, 
+        source_chain, x_off, y_off = resize_to_fit_zone(
+            source_chain, 
             zone_w, 
             zone_h
         )
+        source_resized = source_chain.apply(source_clip, "source")
         
         # Calculate absolute position on canvas
-        final_x = x_off 
-        final_y = Config.CONTENT_ZONE_Y + y_off
+        final_x = zone_x + x_off 
+        final_y = zone_y + y_off
         source_resized = source_resized.set_position((final_x, final_y))
         
         # 4. Composite
         # Order: Template -> Background Fill -> Foreground Source
+        # The canvas-sized, opaque template is the canvas itself: no black ColorClip under it and
+        # no full-frame template blit or composite mask per frame
         print("🎞️ Compositing final video...")
         final_video = CompositeVideoClip([
             template_clip,
             bg_fill,      # Fills the black hole
             source_resized # Fits perfectly on top
-        ])
+        ], use_bgclip=True)
+        instrument(final_video, {"template": template_clip, "bg_fill": bg_fill, "source": source_resized})
         
-        # 5. Audio Processing
-        print("🎵 Processing audio...")
+        # 5. Audio Processing (skipped for preview renders)
         audio_clips = []
+        if profile.audio:
+            print("🎵 Processing audio...")
+        else:
+            print("🔇 Preview profile - skipping audio mix")
         
         # Keep Template Audio (The user's reaction sounds)? 
         # User didn't specify, but usually yes for reactions.
-        if template_clip.audio:
+        if profile.audio and template_clip.audio:
             audio_clips.append(template_clip.audio)
             
         # Add generated voiceover
-        if voiceover_path and os.path.exists(voiceover_path):
-            voiceover = AudioFileClip(voiceover_path)
-            audio_clips.append(voiceover)
+        if profile.audio and isinstance(voiceover, VoiceoverStream):
+            audio_clips.append(voiceover.clip(min_duration))
+        elif profile.audio and voiceover and os.path.exists(voiceover):
+            audio_clips.append(AudioFileClip(voiceover, buffersize=audio_block))
         
         # Add background music
-        if music_path and os.path.exists(music_path):
-            music = AudioFileClip(music_path).subclip(0, min_duration)
+        if profile.audio and music_path and os.path.exists(music_path):
+            music = AudioFileClip(music_path, buffersize=audio_block).subclip(0, min_duration)
             music = music.volumex(Config.MUSIC_VOLUME)
             audio_clips.append(music)
         
@@ -280,22 +432,44 @@ def process_video(source_video_path, reaction_video_path, music_path,
             final_audio = CompositeAudioClip(audio_clips)
             final_video = final_video.set_audio(final_audio)
         
-        # Export
+        # Pipeline mode: the same layer graph rendered by one process per decode, transform and composite stage
+        rendered = final_video
+        if Config.PIPELINE_RENDER:
+            print(f"🏭 Pipelined render - experimental ({Config.PIPELINE_SLOTS} shared-memory slots per stage)")
+            source_input = Input(source_video_path, start)
+            rendered = StagePipeline(
+                (canvas_w, canvas_h), profile.fps, min_duration,
+                base=Input(reaction_video_path, start_time),
+                layers=[Layer("bg_fill", source_input, bg_chain, (zone_x, zone_y)),
+                        Layer("source", source_input, source_chain, (final_x, final_y))],
+                audio=final_video.audio, slots=Config.PIPELINE_SLOTS)
+        
+        # Export (run-private temp files, outputs renamed into place once complete)
         print("💾 Exporting final video...")
-        final_video.write_videofile(
-            output_path,
-            fps=30,
-            codec='libx264',
-            audio_codec='aac',
-            preset='medium',
-            threads=4
-        )
+        workspace = get_workspace()
+        with workspace.in_use(source_video_path, music_path), workspace.scratch() as scratch, \
+                workspace.publish(outputs) as staged:
+            export_video(
+                rendered,
+                staged,
+                fps=profile.fps,
+                audio=profile.audio,
+                threads=4,
+                temp_folder=scratch,
+                ring_slots=ring_slots_for_budget(Config.MEMORY_CEILING_MB, (canvas_h, canvas_w, 3)) if streaming else None
+            )
+        
+        if profile.contact_sheet:
+            write_contact_sheet(final_video, os.path.splitext(output_path)[0] + "_sheet.png")
         
         # Clean up
         template_clip.close()
         source_clip.close()
         final_video.close()
         
+        if streaming:
+            report_peak_memory()
+        
         print("✅ Video processing completed!")
         print(f"📁 Output saved: {output_path}")
         return output_path
@@ -304,6 +478,109 @@ def process_video(source_video_path, reaction_video_path, music_path,
         print(f"❌ Processing error: {str(e)}")
         return None
 
+# ==================== RENDER PLANNING ====================
+def plan_render(source_video_path, reaction_video_path, music_path, commentary, output_path,
+                source_info=None, name=None):
+    """
+    Render graph of process_video for these inputs, from container metadata only.
+    source_info: metadata for a source that isn't downloaded yet (see assumed_source).
+    """
+    profile = get_profile(Config.RENDER_PROFILE)
+    canvas_w, canvas_h = profile.width, profile.height
+    streaming = Config.MEMORY_CEILING_MB is not None
+    template = probe_media(reaction_video_path)
+    source = source_info or probe_media(source_video_path)
+    duration = min(template["duration"], source["duration"], Config.MAX_VIDEO_DURATION)
+    
+    # Same zone and decode sizes as process_video (cached zone only - a dry run never analyses)
+    zone = TemplateZones(Config.TEMPLATE_INDEX).cached(reaction_video_path, Config.CONTENT_ZONE)
+    zone_x, zone_y, zone_w, zone_h = zone.to_pixels(canvas_w, canvas_h)
+    src_w, src_h = source["size"]
+    decode = None
+    if streaming:
+        cover_w, cover_h, _, _ = fit_size(src_w, src_h, zone_w, zone_h, "cover")
+        decode = (cover_w, cover_h) if cover_w < src_w else None
+    dec_w, dec_h = decode or (src_w, src_h)
+    cover_w, cover_h, _, _ = fit_size(dec_w, dec_h, zone_w, zone_h, "cover")
+    fit_w, fit_h, x_off, y_off = fit_size(dec_w, dec_h, zone_w, zone_h, "contain")
+    template_ops = ["resize"] if tuple(template["size"]) != (canvas_w, canvas_h) else []
+    layers = [
+        layer("template", reaction_video_path, template, (canvas_w, canvas_h),
+              decode_size=(canvas_w, canvas_h) if streaming else None, ops=template_ops),
+        layer("bg_fill", source_video_path, source, (zone_w, zone_h), (zone_x, zone_y), decode_size=decode,
+              ops=["mirror_x", "colorx", "resize", "crop", "colorx"], resized=(cover_w, cover_h)),
+        # Same source clip: its frame is decoded once for both layers
+        layer("source", source_video_path, source, (fit_w, fit_h), (zone_x + x_off, zone_y + y_off),
+              decode_size=decode, kind="shared", ops=["mirror_x", "colorx", "resize"]),
+    ]
+    
+    audio = []
+    if template["audio"]:
+        audio.append(audio_track("template", reaction_video_path, duration))
+    if commentary:
+        audio.append(audio_track("voiceover", None, min(duration, len(commentary) / Config.TTS_CHARS_PER_SECOND)))
+    if music_path:
+        audio.append(audio_track("music", music_path, duration, Config.MUSIC_VOLUME))
+    
+    outputs = [output(spec, (canvas_w, canvas_h)) for spec in default_outputs(output_path, profile)]
+    return make_plan(name or os.path.basename(output_path), profile, duration, layers, audio, outputs,
+                     source_assumed=bool(source.get("assumed")))
+
+def assumed_download():
+    """Metadata of the stream auto mode's format selection would download (9:16, under 59 s)"""
+    _, _, zone_w, zone_h = Config.CONTENT_ZONE.to_pixels(Config.CANVAS_WIDTH, Config.CANVAS_HEIGHT)
+    res = required_resolution(zone_w, zone_h, "contain")
+    return assumed_source(res, round(res / DEFAULT_ASPECT), 59, audio=False)
+
+def budget_render(plan):
+    """(outputs, max_duration) to render a plan within RENDER_BUDGET_SECONDS - None to drop the job"""
+    plan, cost, action = fit_budget(plan, Config.RENDER_BUDGET_SECONDS, load_calibration(Config.RENDER_CALIBRATION))
+    print(f"🧮 Estimated render: {cost['wall_seconds']}s ({cost['cpu_seconds']} CPU-s), "
+          f"{cost['output_bytes'] / 1e6:.0f} MB out, {cost['peak_memory_mb']} MB peak")
+    if action == "drop":
+        print(f"⛔ Over the {Config.RENDER_BUDGET_SECONDS}s render budget even when downgraded - dropping job")
+        return None
+    if action == "downgrade":
+        print(f"📉 Downgraded to fit the render budget: {', '.join(plan['downgrades'])}")
+    profile = get_profile(Config.RENDER_PROFILE)
+    return apply_downgrades(plan, default_outputs(plan["outputs"][0]["path"], profile)), plan["duration"]
+
+def plan_mode(auto=False):
+    """--plan: print render graphs and cost estimates as JSON (queued jobs, or the next --auto run)"""
+    reaction_video = get_random_file(Config.REACTIONS_FOLDER)
+    if not reaction_video:
+        print("❌ No reaction videos found.")
+        return
+    music_file = get_random_file(Config.MUSIC_FOLDER)
+    plans = []
+    if auto:
+        plans.append(plan_render(None, reaction_video, music_file, AUTO_COMMENTARIES[0],
+                                 os.path.join(Config.OUTPUT_FOLDER, "shorts_auto.mp4"),
+                                 source_info=assumed_download(), name="auto"))
+    else:
+        queue = JobQueue(Config.QUEUE_DB)
+        jobs = queue.queued(["render"])
+        queue.close()
+        for job in jobs:
+            payload = job["payload"]
+            source = payload.get("source")
+            known = source and os.path.exists(source)
+            try:
+                output_path = job_output_path(payload, os.path.join(Config.OUTPUT_FOLDER, f"shorts_job_{job['id']}.mp4"))
+            except ValueError as e:
+                print(f"⚠️ Job {job['id']} will be dropped: {e}")
+                continue
+            plans.append(plan_render(
+                source if known else None,
+                payload.get("reaction") or reaction_video,
+                payload.get("music") or music_file,
+                payload.get("commentary"),
+                output_path,
+                source_info=None if known else assumed_download(),
+                name=f"job {job['id']}"
+            ))
+    print_plan(plans, load_calibration(Config.RENDER_CALIBRATION), Config.RENDER_BUDGET_SECONDS)
+
 # ==================== AUTOMATION LOGIC ====================
 AUTO_COMMENTARIES = [
     "OMG look at this! So cute! Wait for it...",
@@ -319,32 +596,58 @@ def auto_mode():
         print("🤖 STARTING AUTO MODE...")
         
         # 1. Acquire Content (Auto-Search)
+        # Uploads held from earlier runs go first; no point rendering what can't be uploaded today
+        if Config.RENDER_PROFILE != "preview":
+            with upload_scheduler() as scheduler:
+                drain_held_uploads(scheduler)
+                if scheduler.uploads_left() == 0:
+                    print(f"⏸️ No upload quota left for a new short ({scheduler.report()}) - skipping this run")
+                    return
+        
         print("🔍 Searching for viral content...")
         # Removed "oddly satisfying pets" as it returns long compilations
         queries = ["funny cat shorts", "cute dog shorts", "funny pets reaction"]
         query = random.choice(queries)
         
         search_query = f"ytsearch20:{query}"
-        download_path = os.path.join(Config.DOWNLOADS_FOLDER, "auto_video.mp4")
+        workspace = get_workspace()
+        download_path = workspace.unique_path(Config.DOWNLOADS_FOLDER, "auto_video.mp4")
         archive_file = "downloaded_videos.txt"
         
         # Custom download for search
         cmd = [
             sys.executable, "-m", "yt_dlp",
+            *source_format_args(),
             "--match-filter", "duration < 59",
             "-o", download_path,
             "--no-playlist",
             "--max-downloads", "1",
-            "--force-overwrites",
             "--download-archive", archive_file,
             search_query
         ]
-        # check=False because yt-dlp returns non-zero when max-downloads is reached
-        subprocess.run(cmd, check=False) 
-        
-        if not os.path.exists(download_path):
-            print("❌ Auto-download failed")
+        # A new ID can still be a re-upload of a clip we already used. Its ID is archived
+        # by then, so the same search moves on to the next result.
+        fingerprints = SourceFingerprints(Config.FINGERPRINT_INDEX, Config.FINGERPRINT_RADIUS)
+        for attempt in range(Config.AUTO_ATTEMPTS):
+            # check=False because yt-dlp returns non-zero when max-downloads is reached
+            subprocess.run(cmd, check=False) 
+            
+            if not os.path.exists(download_path):
+                print("❌ Auto-download failed")
+                return
+            duplicate, hashes = fingerprints.find_duplicate(download_path)
+            if duplicate is None:
+                break
+            print(f"♻️ Downloaded video is a re-upload of {duplicate} - trying the next result")
+            for leftover in (download_path, info_json_path(download_path)):
+                if os.path.exists(leftover):
+                    os.remove(leftover)
+        else:
+            print(f"❌ {Config.AUTO_ATTEMPTS} downloads in a row were re-uploads - skipping this run")
             return
+        key = source_key(download_path)  # Before report_bytes_saved deletes the info json it reads
+        report_bytes_saved(download_path)
+        workspace.track(download_path)
             
         # 1.5 Get Video Metadata (Advanced SEO)
         print("📊 Fetching metadata for Advanced SEO...")
@@ -380,25 +683,34 @@ def auto_mode():
             
         music_file = get_random_file(Config.MUSIC_FOLDER)
         
-        # 3. Commentary
+        # 3. Fit the render into its time budget (downgrade or drop it before any decoding)
         commentary = random.choice(AUTO_COMMENTARIES)
-        voiceover_path = os.path.join(Config.TEMP_FOLDER, "voiceover.mp3")
-        asyncio.run(generate_voiceover(commentary, voiceover_path, "english"))
-        
-        # 4. Process
-        output_filename = f"shorts_auto_{random.randint(1000, 9999)}.mp4"
-        output_path = os.path.join(Config.OUTPUT_FOLDER, output_filename)
+        output_path = workspace.unique_path(Config.OUTPUT_FOLDER, "shorts_auto.mp4")
+        budget = budget_render(plan_render(download_path, reaction_video, music_file, commentary, output_path))
+        if budget is None:
+            return
+        outputs, max_duration = budget
         
+        # 4. Commentary (synthesised while the video loads) + Process
+        voiceover = generate_voiceover(commentary, "english")
         result_path = process_video(
             download_path,
             reaction_video,
             music_file,
-            voiceover_path,
-            output_path
+            voiceover,
+            output_path,
+            outputs=outputs,
+            max_duration=max_duration
         )
         
-        # 5. Upload to YouTube (ADVANCED SEO)
+        # Only a source that made it into a short counts as used
         if result_path:
+            fingerprints.add(key, hashes)
+        
+        # 5. Upload to YouTube (ADVANCED SEO)
+        if result_path and Config.RENDER_PROFILE == "preview":
+            print(f"👀 Preview render only, skipping upload: {result_path}")
+        elif result_path:
             print("🚀 Ready to upload...")
             
             # Smart Title Generation
@@ -420,21 +732,142 @@ def auto_mode():
             combined_tags = list(set(base_tags + source_tags[:10])) # Unique tags
             
             print(f"📝 Title: {final_title}")
-            upload_video(result_path, final_title, description, combined_tags)
+            upload_or_pin(result_path, final_title, description, combined_tags)
             
     except Exception as e:
         print(f"❌ Auto Mode Error: {str(e)}")
 
+# ==================== JOB QUEUE ====================
+def job_output_path(job, default):
+    """
+    Where a job's render goes: its "output" is a plain file name, always put in
+    OUTPUT_FOLDER (a queued job never chooses a path). ValueError otherwise.
+    """
+    name = job.get("output")
+    if not name:
+        return default
+    if not isinstance(name, str) or name in (".", "..") or os.path.basename(name) != name or "\\" in name:
+        raise ValueError(f"Job output must be a file name, not a path: {name!r}")
+    return os.path.join(Config.OUTPUT_FOLDER, name)
+
+def run_queued_job(payload):
+    """
+    Job queue handler for "render" jobs:
+    {"url" | "source", "reaction", "music", "commentary", "language", "title", "upload", "output": "name.mp4"}
+    Missing reaction/music are picked at random; commentary becomes a voiceover.
+    Raises JobDropped when even the downgraded render doesn't fit RENDER_BUDGET_SECONDS, or "output" is a path.
+    """
+    try:
+        output_name = job_output_path(payload, None)
+    except ValueError as e:
+        raise JobDropped(str(e))  # Retrying won't change it
+    source = payload.get("source")
+    if payload.get("url"):
+        name = hashlib.md5(payload["url"].encode("utf-8")).hexdigest()[:12]
+        source = download_video(payload["url"], os.path.join(Config.DOWNLOADS_FOLDER, f"job_{name}.mp4"))
+    if not source or not os.path.exists(source):
+        print(f"❌ Job source not found: {source or payload.get('url')}")
+        return None
+    
+    reaction_video = payload.get("reaction") or get_random_file(Config.REACTIONS_FOLDER)
+    if not reaction_video:
+        print("❌ No reaction videos found.")
+        return None
+    music_file = payload.get("music") or get_random_file(Config.MUSIC_FOLDER)
+    
+    commentary = payload.get("commentary")
+    workspace = get_workspace()
+    output_path = output_name or workspace.unique_path(Config.OUTPUT_FOLDER, "shorts_job.mp4")
+    try:
+        budget = budget_render(plan_render(source, reaction_video, music_file, commentary, output_path))
+    except Exception as e:
+        print(f"❌ Could not plan the render: {e}")
+        return None
+    if budget is None:
+        raise JobDropped(f"over the {Config.RENDER_BUDGET_SECONDS}s render budget")  # Retrying won't make it fit
+    outputs, max_duration = budget
+    voiceover = generate_voiceover(commentary, payload.get("language", "english")) if commentary else None
+    result = process_video(source, reaction_video, music_file, voiceover, output_path,
+                           outputs=outputs, max_duration=max_duration)
+    if not result or not payload.get("upload") or Config.RENDER_PROFILE == "preview":
+        return result
+    
+    title = payload.get("title") or "Funny Pet Reaction 😲 #shorts"
+    description = f"{commentary or random.choice(AUTO_COMMENTARIES)}\n\n#shorts #funny #pets #reaction"
+    return upload_or_pin(result, title, description, ["shorts", "reaction", "funny"])
+
 # ==================== MAIN WORKFLOW ====================
+# Config values main() sets from the command line. --workers processes are spawned with a fresh
+# Config, so these are handed to them explicitly (run_workers initializer).
+CLI_SETTINGS = ("RENDER_PROFILE", "PROXY_RENDITIONS", "MEMORY_CEILING_MB", "PIPELINE_RENDER")
+
+def cli_settings():
+    return {name: getattr(Config, name) for name in CLI_SETTINGS}
+
+def apply_settings(settings):
+    for name, value in settings.items():
+        setattr(Config, name, value)
+
 def main():
     """Main execution function"""
     parser = argparse.ArgumentParser()
     parser.add_argument("--auto", action="store_true", help="Run in fully automated mode")
+    parser.add_argument("--preview", action="store_true", help="Fast 540x960 ultrafast render without audio (no upload)")
+    parser.add_argument("--max-memory", type=int, metavar="MB",
+                        help="Streaming render mode with this peak memory ceiling (long / 4K sources)")
+    parser.add_argument("--proxy", action="append", choices=["720p", "480p"], default=[],
+                        help="Also encode a small proxy from the same render pass (repeatable)")
+    parser.add_argument("--enqueue", metavar="FILE",
+                        help="Add jobs from a URL list or JSONL file to the job queue")
+    parser.add_argument("--priority", type=int, default=0, help="Priority for --enqueue jobs (higher runs first)")
+    parser.add_argument("--upload", action="store_true", help="Upload --enqueue jobs once rendered")
+    parser.add_argument("--work", action="store_true", help="Run queued jobs")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for --work")
+    parser.add_argument("--queue-status", action="store_true", help="Show job counts and recent jobs")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="EXPERIMENTAL: render with decode, transform and composite stages in separate "
+                             "processes (no speedup measured yet; slower on 1 core)")
+    parser.add_argument("--plan", action="store_true",
+                        help="Dry run: print render graph + cost estimate of queued jobs (or the next run with --auto)")
+    parser.add_argument("--profile", nargs="?", const=Config.PROFILE_FOLDER, metavar="DIR",
+                        help="Write a cProfile dump, collapsed stacks and per-frame timing report for this run")
     args = parser.parse_args()
 
+    if args.preview:
+        Config.RENDER_PROFILE = "preview"
+    Config.PROXY_RENDITIONS = args.proxy
+    Config.MEMORY_CEILING_MB = args.max_memory
+    Config.PIPELINE_RENDER = args.pipeline
+
+    if args.profile:
+        with RenderProfiler(args.profile, "viral_video_bot"):
+            run(args)
+    else:
+        run(args)
+
+def run(args):
+    """Dispatch the parsed command line"""
     # Create folders
     create_folders()
 
+    # Job queue commands (no prompts)
+    if args.plan:
+        plan_mode(args.auto)
+        return
+    if args.enqueue:
+        enqueue_file(Config.QUEUE_DB, args.enqueue, args.priority, args.upload, Config.QUEUE_MAX_ATTEMPTS)
+    if args.queue_status:
+        print_status(Config.QUEUE_DB)
+    if args.work:
+        with upload_scheduler() as scheduler:
+            drain_held_uploads(scheduler)
+        stats = run_workers(Config.QUEUE_DB, {"render": run_queued_job}, args.workers,
+                            initializer=apply_settings, initargs=(cli_settings(),),
+                            lease_seconds=Config.QUEUE_LEASE_SECONDS)
+        print(f"\n📋 Queue drained: {sum(s['done'] for s in stats)} done, {sum(s['failed'] for s in stats)} failed")
+    if args.enqueue or args.queue_status or args.work:
+        return
+
     # Dispatch to Auto Mode
     if args.auto:
         auto_mode()
@@ -467,7 +900,7 @@ def main():
     # Download video
     downloaded_video = None
     if video_url:
-        download_path = os.path.join(Config.DOWNLOADS_FOLDER, "source_video.mp4")
+        download_path = get_workspace().unique_path(Config.DOWNLOADS_FOLDER, "source_video.mp4")
         downloaded_video = download_video(video_url, download_path)
         if not downloaded_video:
             print("❌ Download failed. Exiting...")
@@ -493,20 +926,15 @@ def main():
     if music_file:
          print(f"🎵 Selected music: {os.path.basename(music_file)}")
     
-    # Generate voiceover
-    voiceover_path = os.path.join(Config.TEMP_FOLDER, "voiceover.mp3")
+    # Generate voiceover (streamed while the video loads) + process video
     print("\n🎙️ Generating voiceover...")
-    asyncio.run(generate_voiceover(commentary, voiceover_path, language))
-    
-    # Process video
-    output_filename = f"shorts_{random.randint(1000, 9999)}.mp4"
-    output_path = os.path.join(Config.OUTPUT_FOLDER, output_filename)
-    
+    voiceover = generate_voiceover(commentary, language)
+    output_path = get_workspace().unique_path(Config.OUTPUT_FOLDER, "shorts.mp4")
     result = process_video(
         downloaded_video,
         reaction_video,
         music_file,
-        voiceover_path,
+        voiceover,
         output_path
     )
     
@@ -517,12 +945,15 @@ def main():
         print("="*60 + "\n")
         
         # Manual Upload Prompt
+        if Config.RENDER_PROFILE == "preview":
+            print("👀 Preview render only - run without --preview to upload.")
+            return
         upload = input("🚀 Upload to YouTube? (y/n): ").lower()
         if upload == 'y':
             title = input("📝 Title: ")
             desc = input("📝 Description: ")
             tags = ["shorts", "reaction", "funny"]
-            upload_video(result, title, desc, tags)
+            upload_or_pin(result, title, desc, tags)
     else:
         print("\n❌ Video creation failed.")
 